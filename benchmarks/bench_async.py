@@ -0,0 +1,110 @@
+"""Fairness and throughput of many programs sharing one asyncio event loop.
+
+Usage:
+    python benchmarks/bench_async.py [--scripts 1000] [--short 200] [--long 5000] [--quantum 1000]
+
+Runs ``--scripts`` programs (one in ten is long, the rest short) twice:
+one after another on the closure engine, and all at once as AsyncInterpreter
+coroutines in a single event loop. Reports aggregate throughput (loop
+iterations per second), mean completion time of the short programs, the
+longest time a monitor task waited to be scheduled, and Jain's fairness
+index (1.0 = perfectly even) of the progress of the unfinished programs
+at the midpoint of the concurrent run.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import parse_source  # noqa: E402
+from deepulang.aio import AsyncInterpreter  # noqa: E402
+from deepulang.closures import ClosureInterpreter  # noqa: E402
+
+PROGRAM = """\
+let total be 0
+let i be 0
+while i is less than {n} do
+  set total to total + i * 3
+  set i to i + 1
+  say i
+end
+"""
+
+class Progress:
+    """Sink that only remembers how many lines a program has said."""
+    def __init__(self):
+        self.count = 0
+
+    def say(self, value):
+        self.count += 1
+
+    def flush(self):
+        pass
+
+def jain(values):
+    return sum(values) ** 2 / (len(values) * sum(v * v for v in values)) if values else 1.0
+
+def sequential(programs):
+    start = time.perf_counter()
+    done = []
+    for program in programs:
+        ClosureInterpreter(Progress()).interpret(program)
+        done.append(time.perf_counter() - start)
+    return time.perf_counter() - start, done
+
+async def concurrent(programs, quantum, midpoint):
+    sinks = [Progress() for _ in programs]
+    done = [None] * len(programs)
+    start = time.perf_counter()
+
+    async def one(i, program):
+        await AsyncInterpreter(sinks[i], quantum=quantum).run(program)
+        done[i] = time.perf_counter() - start
+
+    stats = {"max_wait": 0.0, "fairness": None}
+
+    async def monitor():
+        last = time.perf_counter()
+        while not all(d is not None for d in done):
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stats["max_wait"] = max(stats["max_wait"], now - last)
+            last = now
+            if stats["fairness"] is None and now - start >= midpoint:
+                running = [s.count for s, d in zip(sinks, done) if d is None]
+                stats["fairness"] = (jain(running), len(running))
+
+    await asyncio.gather(monitor(), *(one(i, p) for i, p in enumerate(programs)))
+    return time.perf_counter() - start, done, stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scripts", type=int, default=1000)
+    ap.add_argument("--short", type=int, default=200, help="Iterations of a short program")
+    ap.add_argument("--long", type=int, default=5000, help="Iterations of a long program")
+    ap.add_argument("--quantum", type=int, default=1000)
+    args = ap.parse_args(argv)
+
+    sizes = [args.long if i % 10 == 0 else args.short for i in range(args.scripts)]
+    programs = [parse_source(PROGRAM.format(n=n)) for n in sizes]
+    iterations = sum(sizes)
+    short = [i for i, n in enumerate(sizes) if n == args.short]
+
+    seq_time, seq_done = sequential(programs)
+    conc_time, conc_done, stats = asyncio.run(concurrent(programs, args.quantum, seq_time / 2))
+
+    print(f"{args.scripts} scripts, {iterations} iterations, quantum {args.quantum}")
+    print(f"{'':<12} {'seconds':>8} {'iter/s':>10} {'short done':>11}")
+    for name, total, done in (("sequential", seq_time, seq_done), ("asyncio", conc_time, conc_done)):
+        mean_short = sum(done[i] for i in short) / len(short)
+        print(f"{name:<12} {total:>8.2f} {iterations / total:>10.0f} {mean_short:>10.2f}s")
+    print(f"max scheduling wait of a monitor task: {stats['max_wait'] * 1000:.1f} ms")
+    if stats["fairness"] is not None:
+        index, running = stats["fairness"]
+        print(f"Jain's fairness index at midpoint: {index:.3f} over {running} running programs")
+
+if __name__ == "__main__":
+    main()
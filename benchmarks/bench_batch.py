@@ -0,0 +1,58 @@
+"""Throughput of `deepulang batch` as the worker count grows.
+
+Usage:
+    python benchmarks/bench_batch.py [--files 400] [--iterations 20000] [--jobs 1,2,4,8]
+
+Generates independent CPU-bound programs, then times `deepulang batch`
+(a fresh process each time, so pool start-up is included) for each job
+count. On an otherwise idle machine speedup should track the number of
+cores up to --jobs = CPU count.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROGRAM = """\
+let total be {seed}
+let i be 0
+while i is less than {n} do
+  set total to total + i * 3 - total / 7
+  set i to i + 1
+end
+say total
+"""
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--files", type=int, default=400)
+    ap.add_argument("--iterations", type=int, default=20000, help="Loop iterations per program")
+    default_jobs = sorted({1, 2, 4, os.cpu_count() or 1})
+    ap.add_argument("--jobs", default=",".join(map(str, default_jobs)))
+    ap.add_argument("--engine", default="closure")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.files):
+            Path(tmp, f"job{i:05}.dpl").write_text(PROGRAM.format(seed=i, n=args.iterations))
+        print(f"{args.files} files x {args.iterations} iterations, engine {args.engine}, "
+              f"{os.cpu_count()} CPUs")
+        print(f"{'jobs':>4} {'seconds':>8} {'files/s':>8} {'speedup':>8}")
+        base = None
+        for jobs in map(int, args.jobs.split(",")):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-m", "deepulang", "batch", tmp, "-j", str(jobs),
+                            "--engine", args.engine, "--no-cache", "--no-output"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f"{jobs:>4} {elapsed:>8.2f} {args.files / elapsed:>8.1f} {base / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
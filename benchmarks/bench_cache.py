@@ -0,0 +1,65 @@
+"""Cold vs warm startup of `deepulang file.dpl` with the parsed-program cache.
+
+Usage:
+    python benchmarks/bench_cache.py [--lines 20000] [--runs 5]
+
+Each run is a fresh `python -m deepulang` process. "no-cache" passes
+--no-cache, "cold" points --cache-dir at an empty directory (parse + write)
+and "warm" reuses a populated one (hash + unpickle). The generated program
+does little work at runtime, so the difference is lexing and parsing.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+LINES = (
+    'let value{i} be {i} * 3 + (7 - {i}) / 2\n'
+    'if value{i} is not less than 100 then\n'
+    '  set value{i} to value{i} - 1  # comment\n'
+    'end\n'
+)
+
+def generate(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(LINES.format(i=i) for i in range(lines // 4)))
+        f.write('say "done"\n')
+
+def run(path, *flags):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "deepulang", str(path), *flags],
+                   stdout=subprocess.DEVNULL, env=env, check=True)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=20000, help="Source lines in the generated program")
+    ap.add_argument("--runs", type=int, default=5, help="Runs per mode (median reported)")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "prog.dpl"
+        generate(path, args.lines)
+        warm_dir = Path(tmp) / "warm"
+        run(path, "--cache-dir", str(warm_dir))
+        times = {"no-cache": [], "cold": [], "warm": []}
+        for i in range(args.runs):
+            times["no-cache"].append(run(path, "--no-cache"))
+            times["cold"].append(run(path, "--cache-dir", str(Path(tmp) / f"cold{i}")))
+            times["warm"].append(run(path, "--cache-dir", str(warm_dir)))
+        base = statistics.median(times["no-cache"])
+        print(f"{args.lines} lines, median of {args.runs} runs")
+        print(f"{'mode':<9} {'seconds':>8} {'speedup':>8}")
+        for mode, samples in times.items():
+            t = statistics.median(samples)
+            print(f"{mode:<9} {t:>8.3f} {base / t:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Rows per second of one run per row vs run_columns() (NumPy).
+
+Usage:
+    python benchmarks/bench_columnar.py [--rows 100000] [--loop-rows 20000]
+
+Runs a scoring script (arithmetic, an if/otherwise, a short data-dependent
+while loop) over --rows generated records with run_columns(), and over the
+first --loop-rows of them one row at a time, with CompiledProgram.run()
+and with a tree-walking Interpreter whose variables are set from the row.
+Checks that all agree on those rows and reports rows per second of each.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import deepulang  # noqa: E402
+from deepulang.interpreter import Interpreter  # noqa: E402
+
+SCRIPT = """\
+let score be price * qty - discount
+if score is greater than 500 then
+  set score to score - score / 10
+otherwise
+  set score to score + bonus
+end
+let tier be 0
+while tier * tier * 1000 is less than score do
+  set tier to tier + 1
+end
+"""
+
+def records(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "price": rng.integers(1, 200, rows),
+        "qty": rng.integers(1, 10, rows),
+        "discount": rng.integers(0, 50, rows),
+        "bonus": 7,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100000, help="Rows for run_columns()")
+    ap.add_argument("--loop-rows", type=int, default=20000, help="Rows for the run() loop")
+    args = ap.parse_args(argv)
+    if np is None:
+        print("bench_columnar needs NumPy", file=sys.stderr)
+        return 1
+
+    program = deepulang.compile(SCRIPT)
+    columns = records(args.rows)
+
+    start = time.perf_counter()
+    result = program.run_columns(columns)
+    columnar = time.perf_counter() - start
+
+    loop_rows = min(args.loop_rows, args.rows)
+    inputs = [{name: (value[row].item() if np.ndim(value) else value)
+               for name, value in columns.items()} for row in range(loop_rows)]
+    start = time.perf_counter()
+    compiled = [program.run(row) for row in inputs]
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    walked = []
+    for row in inputs:
+        interp = Interpreter()
+        for name, value in row.items():
+            interp.env.define(name, value)
+        interp.interpret(program.program)
+        walked.append(interp.env.values)
+    walking = time.perf_counter() - start
+
+    for name in ("score", "tier"):
+        got = result[name][:loop_rows].tolist()
+        if got != [row[name] for row in compiled] or got != [row[name] for row in walked]:
+            print(f"{name}: run_columns() and one run per row differ", file=sys.stderr)
+            return 1
+    rate = args.rows / columnar
+    print(f"{'mode':<18} {'rows':>9} {'seconds':>8} {'rows/s':>12} {'run_columns() speedup':>22}")
+    for mode, rows, seconds in (("Interpreter loop", loop_rows, walking),
+                                ("run() loop", loop_rows, looped),
+                                ("run_columns()", args.rows, columnar)):
+        print(f"{mode:<18} {rows:>9} {seconds:>8.3f} {rows / seconds:>12,.0f} "
+              f"{rate / (rows / seconds):>21.0f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Per-call latency of a CompiledProgram vs. the full front end per call.
+
+Usage:
+    python benchmarks/bench_embed.py [--calls 20000]
+
+"front end" does what an embedding had to do before: Lexer, Parser and a
+new Interpreter for every request. "compiled" calls run() on a program
+compiled once with deepulang.compile().
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deepulang  # noqa: E402
+from deepulang import Interpreter, Lexer, Parser  # noqa: E402
+from deepulang.output import CaptureOutput  # noqa: E402
+
+SOURCE = """\
+let subtotal be price * qty
+if subtotal is greater than 100 then
+  set subtotal to subtotal - subtotal / 10
+end
+let tax be subtotal * 8 / 100
+let total be subtotal + tax
+say total
+"""
+
+def front_end(inputs):
+    interp = Interpreter(CaptureOutput())
+    for name, value in inputs.items():
+        interp.env.define(name, value)
+    interp.interpret(Parser(Lexer(SOURCE).tokenize()).parse())
+    return interp.env.values
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--calls", type=int, default=20000)
+    args = ap.parse_args(argv)
+
+    program = deepulang.compile(SOURCE, opt_level=1)
+    out = CaptureOutput()
+    cases = [
+        ("front end", front_end),
+        ("compiled", lambda inputs: program.run(inputs, output=out)),
+    ]
+    print(f"{'mode':<10} {'us/call':>8}")
+    for label, call in cases:
+        start = time.perf_counter()
+        for i in range(args.calls):
+            call({"price": i % 50, "qty": 3})
+        elapsed = time.perf_counter() - start
+        out.lines.clear()
+        print(f"{label:<10} {elapsed / args.calls * 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    main()
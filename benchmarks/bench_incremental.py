@@ -0,0 +1,96 @@
+"""Edit-to-AST latency of deepulang.incremental.Document vs a full re-parse.
+
+Usage:
+    python benchmarks/bench_incremental.py [--sizes 1000,10000,100000] [--edits 50]
+
+For each size, a program of that many lines (top-level statements and
+if/while blocks) is loaded into a Document, then --edits edits are made
+at random lines, each followed by reading ``document.program``:
+
+- keystroke: replace one digit within a line (no line numbers move);
+- new line: insert a statement (every later node moves down a line);
+- full: lex and parse the whole text again, what the editor used to do.
+
+Reports the median milliseconds per edit.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang.incremental import Document  # noqa: E402
+from deepulang.lexer import Lexer  # noqa: E402
+from deepulang.parser import Parser  # noqa: E402
+
+CHUNK = (
+    "let total be 0\n"
+    "set total to total + 12 * 3 - (total / 7)\n"
+    "if total is not greater than 100 then\n"
+    "  say total\n"
+    "otherwise\n"
+    "  set total to total - 1  # comment\n"
+    "end\n"
+    "while total is less than 50 do\n"
+    "  set total to total + 1\n"
+    "end\n"
+)
+
+def generate(lines):
+    return CHUNK * (lines // CHUNK.count("\n"))
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+def keystrokes(document, edits, rng):
+    samples = []
+    for _ in range(edits):
+        line = rng.randrange(len(document.lines) // 10) * 10 + 2
+        col = document.lines[line - 1].index(" * 3")  # the digit in front of it
+        start = time.perf_counter()
+        document.edit((line, col), (line, col + 1), str(rng.randrange(1, 10)))
+        document.program
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def new_lines(document, edits, rng):
+    samples = []
+    for _ in range(edits):
+        line = rng.randrange(len(document.lines) // 10) * 10 + 1
+        start = time.perf_counter()
+        document.edit((line, 1), (line, 1), "say 1\n")
+        document.program
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def full(text, edits):
+    samples = []
+    for _ in range(max(1, edits // 10)):
+        start = time.perf_counter()
+        Parser(Lexer(text).tokenize()).parse()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated line counts")
+    ap.add_argument("--edits", type=int, default=50, help="Edits per size and kind")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(0)
+    print(f"{'lines':>8} {'keystroke ms':>13} {'new line ms':>12} {'full ms':>9}")
+    for size in map(int, args.sizes.split(",")):
+        text = generate(size)
+        document = Document(text)
+        document.program
+        typed = keystrokes(document, args.edits, rng)
+        inserted = new_lines(document, args.edits, rng)
+        whole = full(text, args.edits)
+        print(f"{size:>8} {median_ms(typed):>13.3f} {median_ms(inserted):>12.3f} "
+              f"{median_ms(whole):>9.1f}")
+
+if __name__ == "__main__":
+    main()
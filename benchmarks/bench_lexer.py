@@ -0,0 +1,66 @@
+"""Compare the regex Lexer with the original character-stepping lexer.
+
+Usage:
+    python benchmarks/bench_lexer.py [--sizes 10000,100000,1000000,5000000]
+
+Sources are synthetic DeepuLang programs heavy on identifiers starting
+with 'i' and multi-word comparators, the case that made the old lexer
+quadratic. The legacy lexer is skipped above --legacy-max characters.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang.lexer import Lexer  # noqa: E402
+from legacy_lexer import Lexer as LegacyLexer  # noqa: E402
+
+CHUNK = (
+    'let index be 0\n'
+    'let item be "it is\\tfine"\n'
+    'while index is less than 10 do  # count up\n'
+    '  if item is not equal to "x" then\n'
+    '    set index to index + 1\n'
+    '  otherwise\n'
+    '    say (index * 2) / 3\n'
+    '  end\n'
+    'end\n'
+)
+
+def make_source(size):
+    return CHUNK * (size // len(CHUNK) + 1)
+
+def best_time(lexer_cls, source, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tokens = lexer_cls(source).tokenize()
+        best = min(best, time.perf_counter() - start)
+    return best, len(tokens)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10000,100000,1000000,5000000",
+                    help="Comma-separated source sizes in characters")
+    ap.add_argument("--legacy-max", type=int, default=250000,
+                    help="Largest source the legacy lexer is timed on")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'chars':>10} {'tokens':>9} {'regex s':>9} {'Mtok/s':>7} {'legacy s':>9} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        source = make_source(size)
+        new_time, count = best_time(Lexer, source, args.repeat)
+        row = f"{len(source):>10} {count:>9} {new_time:>9.4f} {count / new_time / 1e6:>7.2f}"
+        if len(source) <= args.legacy_max:
+            old_time, old_count = best_time(LegacyLexer, source, args.repeat)
+            assert old_count == count
+            row += f" {old_time:>9.4f} {old_time / new_time:>7.1f}x"
+        else:
+            row += f" {'skipped':>9} {'-':>8}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
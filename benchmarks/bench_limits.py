@@ -0,0 +1,65 @@
+"""Overhead of execution limits on a loop-heavy program, per engine.
+
+Usage:
+    python benchmarks/bench_limits.py [--iterations 300000] [--repeat 5] [--engines tree,vm,closure,py]
+
+Runs in-process and reports the best of ``--repeat`` runs for: no limits,
+a step limit plus timeout (back-edge counting only), and all four limits
+(counting plus checked arithmetic). Limits are set high enough never to
+trigger.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import parse_source  # noqa: E402
+from deepulang.engines import ENGINES, create_engine  # noqa: E402
+from deepulang.limits import Limits  # noqa: E402
+from deepulang.output import CaptureOutput  # noqa: E402
+
+PROGRAM = """\
+let i be 0
+let total be 0
+while i is less than {n} do
+  set total to total + i * 3 - 1
+  set i to i + 1
+end
+say total
+"""
+
+CONFIGS = {
+    "none": None,
+    "steps": dict(max_steps=10 ** 12, timeout=3600),
+    "all": dict(max_steps=10 ** 12, timeout=3600, max_string_length=10 ** 6, max_int_bits=256),
+}
+
+def best(program, engine, limits, repeat):
+    times = []
+    for _ in range(repeat):
+        budget = Limits(**limits) if limits else None
+        interp = create_engine(engine, CaptureOutput(), budget)
+        start = time.perf_counter()
+        interp.interpret(program)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--iterations", type=int, default=300000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--engines", default=",".join(ENGINES))
+    args = ap.parse_args(argv)
+
+    program = parse_source(PROGRAM.format(n=args.iterations))
+    print(f"{args.iterations} iterations, best of {args.repeat}")
+    print(f"{'engine':<8} {'none':>8} {'steps':>8} {'all':>8} {'steps%':>7} {'all%':>7}")
+    for engine in args.engines.split(","):
+        t = {name: best(program, engine, limits, args.repeat) for name, limits in CONFIGS.items()}
+        print(f"{engine:<8} {t['none']:>8.3f} {t['steps']:>8.3f} {t['all']:>8.3f} "
+              f"{100 * (t['steps'] / t['none'] - 1):>+6.1f}% {100 * (t['all'] / t['none'] - 1):>+6.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Bytes per token and per AST node for a large generated program.
+
+Usage:
+    python benchmarks/bench_memory.py [--lines 1000000]
+
+Sizes are summed with sys.getsizeof (plus any instance __dict__) over every distinct object reachable
+from the token list (tokens plus their lexeme/value objects) and from the
+Program (nodes plus their statement lists; strings and tokens the nodes
+share with the token list are not counted again).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import Lexer, Parser  # noqa: E402
+from deepulang.ast_nodes import Node  # noqa: E402
+
+LINES = [
+    'let value{i} be {i} * 3 + (7 - {i}) / 2',
+    'set value{i} to value{i} - 1',
+    'if value{i} is not less than 100 then',
+    '  say "big"',
+    'end',
+]
+
+def make_source(lines):
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.extend(line.format(i=i) for line in LINES)
+        i += 1
+    return "\n".join(out[:lines]) + "\n"
+
+def size_of(obj):
+    # Instances without __slots__ also pay for their attribute dict.
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, "__dict__", None)
+    return size + sys.getsizeof(attrs) if attrs is not None else size
+
+def token_bytes(tokens, seen):
+    total = sys.getsizeof(tokens)
+    for tok in tokens:
+        total += size_of(tok)
+        for value in (tok.lexeme, tok.value):
+            if value is not None and id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+def node_bytes(program, seen):
+    """Return (bytes, node count) for the tree, skipping objects in ``seen``."""
+    total = 0
+    count = 0
+    stack = [program]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, list):
+            total += sys.getsizeof(n)
+            stack.extend(n)
+        elif isinstance(n, Node):
+            count += 1
+            total += size_of(n)
+            stack.extend(getattr(n, f) for f in n.__dataclass_fields__)
+        elif id(n) not in seen:
+            seen.add(id(n))
+            total += sys.getsizeof(n)
+    return total, count
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=1000000)
+    args = ap.parse_args(argv)
+
+    source = make_source(args.lines)
+    start = time.perf_counter()
+    tokens = Lexer(source).tokenize()
+    lex_time = time.perf_counter() - start
+    start = time.perf_counter()
+    program = Parser(tokens).parse()
+    parse_time = time.perf_counter() - start
+
+    seen = set()
+    tok_total = token_bytes(tokens, seen)
+    seen.update(id(t) for t in tokens)
+    ast_total, nodes = node_bytes(program, seen)
+    print(f"lines:  {args.lines}")
+    print(f"tokens: {len(tokens):>10}  {tok_total / len(tokens):6.1f} bytes/token  (lexed in {lex_time:.2f}s)")
+    print(f"nodes:  {nodes:>10}  {ast_total / nodes:6.1f} bytes/node   (parsed in {parse_time:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Output-heavy program with and without --buffer-output.
+
+Usage:
+    python benchmarks/bench_output.py [--lines 1000000] [--engines closure,py]
+
+Each run is a fresh `python -m deepulang` process whose stdout goes to a
+temporary file, so the numbers include the real write path.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROGRAM = """\
+let i be 0
+while i is less than {n} do
+  say i
+  say "line"
+  set i to i + 1
+end
+"""
+
+def run(path, out, engine, *flags):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "deepulang", "--no-cache", "--engine", engine,
+                    *flags, str(path)], stdout=out, env=env, check=True)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=1000000, help="Lines of output")
+    ap.add_argument("--engines", default="closure,py")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "out.dpl"
+        path.write_text(PROGRAM.format(n=args.lines // 2), encoding="utf-8")
+        print(f"{args.lines} lines")
+        print(f"{'engine':<8} {'print':>8} {'buffered':>9} {'speedup':>8}")
+        for engine in args.engines.split(","):
+            with open(Path(tmp) / "out.txt", "wb") as out:
+                plain = run(path, out, engine)
+            with open(Path(tmp) / "out.txt", "wb") as out:
+                buffered = run(path, out, engine, "--buffer-output")
+            print(f"{engine:<8} {plain:>8.2f} {buffered:>9.2f} {plain / buffered:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare the precedence Parser with the original recursive-descent parser.
+
+Usage:
+    python benchmarks/bench_parser.py [--scale 1.0] [--repeat 10] [--depth 5000]
+
+Parses generated programs (long flat programs, long arithmetic
+expressions, nested blocks, comparator-heavy conditions) with both
+parsers from the same token list, checks that the trees and every node's
+position are identical, and reports nodes parsed per second (best of
+--repeat, with the garbage collector off). Finally parses a --depth deep
+parenthesized expression, which the legacy parser cannot do within
+Python's recursion limit.
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang.ast_nodes import Node, count_nodes  # noqa: E402
+from deepulang.lexer import Lexer  # noqa: E402
+from deepulang.parser import Parser  # noqa: E402
+from legacy_parser import Parser as LegacyParser  # noqa: E402
+from suite import WORKLOADS  # noqa: E402
+
+def long_expressions(scale):
+    """Generated code: wide expressions mixing every operator and parentheses."""
+    terms = " + ".join(f"(a{i % 7} * {i} - -b / {i % 5 + 1})" for i in range(40))
+    return "".join(f"set x to {terms} * not c\n" for _ in range(int(300 * scale)))
+
+PROGRAMS = dict(WORKLOADS, long_expressions=long_expressions)
+
+def same_tree(a, b):
+    """Whether two trees have the same nodes, fields, tokens and positions."""
+    stack = [(a, b)]
+    while stack:
+        x, y = stack.pop()
+        if isinstance(x, list):
+            if not isinstance(y, list) or len(x) != len(y):
+                return False
+            stack.extend(zip(x, y))
+        elif isinstance(x, Node):
+            if type(x) is not type(y) or (x.line, x.col) != (y.line, y.col):
+                return False
+            stack.extend((getattr(x, n), getattr(y, n)) for n in x.__slots__)
+        elif hasattr(x, "lexeme"):
+            if repr(x) != repr(y):
+                return False
+        elif x != y or type(x) is not type(y):
+            return False
+    return True
+
+def best_times(tokens, repeat):
+    """Best parse time of the legacy and the new parser, and their trees.
+
+    Runs alternate between the parsers so that drift in machine speed
+    affects both alike. Collections triggered by building a large tree
+    swamp the difference between them, so the collector is off.
+    """
+    best = [float("inf"), float("inf")]
+    trees = [None, None]
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, parser_cls in enumerate((LegacyParser, Parser)):
+                start = time.perf_counter()
+                trees[i] = parser_cls(tokens).parse()
+                best[i] = min(best[i], time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, trees
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scale", type=float, default=1.0, help="Program size multiplier")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--depth", type=int, default=5000, help="Nesting of the deep expression")
+    args = ap.parse_args(argv)
+
+    print(f"{'program':<17} {'nodes':>8} {'legacy nodes/s':>15} {'new nodes/s':>12} {'speedup':>8}")
+    for name, generate in PROGRAMS.items():
+        tokens = Lexer(generate(args.scale)).tokenize()
+        (old, new), (expected, program) = best_times(tokens, args.repeat)
+        if not same_tree(expected, program):
+            print(f"{name}: trees differ", file=sys.stderr)
+            return 1
+        nodes = count_nodes(program)
+        print(f"{name:<17} {nodes:>8} {nodes / old:>15,.0f} {nodes / new:>12,.0f} "
+              f"{old / new:>7.2f}x")
+
+    source = "say " + "(" * args.depth + "1" + ")" * args.depth + "\n"
+    tokens = Lexer(source).tokenize()
+    try:
+        LegacyParser(tokens).parse()
+        legacy = "ok"
+    except RecursionError:
+        legacy = "RecursionError"
+    start = time.perf_counter()
+    Parser(tokens).parse()
+    print(f"\n{args.depth} nested parentheses: legacy {legacy}, "
+          f"new ok in {time.perf_counter() - start:.4f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Per-script latency: a fresh process per script vs `deepulang serve`.
+
+Usage:
+    python benchmarks/bench_server.py [--runs 30] [--lines 200]
+
+Starts a server on a temporary socket and runs a generated script of
+--lines lines (mostly arithmetic, one 'say') in four ways: a fresh
+`python -m deepulang` process without and with the parsed-program cache,
+a `python -m deepulang run --server` client process, and a request sent
+with deepulang.client.run_remote() from this process (what a tool that
+stays running sees). Reports min and median milliseconds.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from deepulang.client import run_remote  # noqa: E402
+
+def generate(path, lines):
+    body = "".join(f"set total to total + {i} * 3 - {i} / 2\n" for i in range(lines - 2))
+    path.write_text(f"let total be 0\n{body}say total\n", encoding="utf-8")
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), statistics.median(samples)
+
+def wait_for(path, proc, seconds=10):
+    deadline = time.monotonic() + seconds
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("server did not start")
+        time.sleep(0.01)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=30, help="Runs per mode")
+    ap.add_argument("--lines", type=int, default=200, help="Lines in the generated script")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "prog.dpl"
+        generate(script, args.lines)
+        sock = os.path.join(tmp, "dpl.sock")
+        server = subprocess.Popen([sys.executable, "-m", "deepulang", "serve", "--socket", sock],
+                                  env=env, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(sock, server)
+            source = script.read_text(encoding="utf-8")
+
+            def process(*flags):
+                return lambda: subprocess.run([sys.executable, "-m", "deepulang", *flags],
+                                              stdout=subprocess.DEVNULL, env=env, check=True)
+
+            def remote():
+                if not run_remote({"source": source, "variables": False}, sock)["ok"]:
+                    raise RuntimeError("request failed")
+
+            cache = os.path.join(tmp, "cache")
+            process("--cache-dir", cache, str(script))()
+            remote()
+            modes = {
+                "process, no cache": process("--no-cache", str(script)),
+                "process, cached": process("--cache-dir", cache, str(script)),
+                "client process": process("run", "--server", "--socket", sock, str(script)),
+                "run_remote()": remote,
+            }
+            print(f"{args.lines}-line script, {args.runs} runs")
+            print(f"{'mode':<18} {'min ms':>8} {'median ms':>10}")
+            for name, fn in modes.items():
+                low, median = timed(fn, args.runs)
+                print(f"{name:<18} {low * 1000:>8.2f} {median * 1000:>10.2f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Process startup time of the `deepulang` command.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 20] [--imports 15]
+
+Each run is a fresh process. Reports the minimum and median wall time of
+bare `python -c pass`, `python -m deepulang --version` and a hello-world
+program with and without the parsed-program cache, and each one's
+overhead over bare Python checked against a target. --imports N also
+lists the N slowest modules imported by the hello-world run (from
+`python -X importtime`, cumulative microseconds). Exits with status 1 if
+a target is missed; the targets assume an otherwise idle machine.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Milliseconds over bare `python -c pass`.
+TARGETS = {"--version": 25, "hello (cached)": 50, "hello (no cache)": 50}
+
+def timed(args, env, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], stdout=subprocess.DEVNULL, env=env, check=True)
+        samples.append(time.perf_counter() - start)
+    return min(samples), statistics.median(samples)
+
+def slowest_imports(args, env, count):
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], env=env, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=20, help="Runs per command")
+    ap.add_argument("--imports", type=int, default=0, metavar="N",
+                    help="Also list the N slowest imports of the hello-world run")
+    args = ap.parse_args(argv)
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    with tempfile.TemporaryDirectory() as tmp:
+        hello = Path(tmp) / "hello.dpl"
+        hello.write_text('say "Hello, world"\n', encoding="utf-8")
+        cached = ["-m", "deepulang", "--cache-dir", str(Path(tmp) / "cache"), str(hello)]
+        subprocess.run([sys.executable, *cached], stdout=subprocess.DEVNULL, env=env, check=True)
+        commands = {
+            "python -c pass": ["-c", "pass"],
+            "--version": ["-m", "deepulang", "--version"],
+            "hello (cached)": cached,
+            "hello (no cache)": ["-m", "deepulang", "--no-cache", str(hello)],
+        }
+        results = {name: timed(command, env, args.runs) for name, command in commands.items()}
+        imports = slowest_imports(cached, env, args.imports) if args.imports else []
+
+    base = results["python -c pass"][0]
+    missed = 0
+    print(f"{'command':<18} {'min ms':>8} {'median ms':>10} {'overhead':>9}  target")
+    for name, (low, median) in results.items():
+        row = f"{name:<18} {low * 1000:>8.1f} {median * 1000:>10.1f}"
+        if name in TARGETS:
+            overhead = (low - base) * 1000
+            ok = overhead <= TARGETS[name]
+            missed += not ok
+            row += f" {overhead:>+8.1f}  <= {TARGETS[name]} {'ok' if ok else 'MISSED'}"
+        print(row)
+    if imports:
+        print()
+        print(f"{'cumulative us':>13}  module")
+        for micros, module in imports:
+            print(f"{micros:>13}  {module}")
+    return 1 if missed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
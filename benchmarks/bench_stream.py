@@ -0,0 +1,81 @@
+"""Peak RSS of eager vs streaming lexing/parsing on a large generated file.
+
+Usage:
+    python benchmarks/bench_stream.py [--size-mb 100] [--parse-size-mb 10]
+
+Each measurement runs in a fresh subprocess and reports its ru_maxrss.
+"eager" reads the whole file and builds the token list (Lexer.tokenize);
+"stream" feeds the open file to Lexer.iter_tokens() and, for the parse
+phase, hands the iterator straight to Parser. The parse phase still keeps
+the whole AST, so it runs on a smaller input by default.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = r"""
+import resource, sys
+from deepulang import Lexer, Parser
+phase, mode, path = sys.argv[1:4]
+with open(path, encoding="utf-8") as f:
+    if mode == "eager":
+        tokens = Lexer(f.read()).tokenize()
+    else:
+        tokens = Lexer(f).iter_tokens()
+    if phase == "lex":
+        count = sum(1 for _ in tokens)
+    else:
+        count = len(Parser(tokens).parse().statements)
+print(count, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+LINES = (
+    'let value{i} be {i} * 3 + (7 - {i}) / 2\n'
+    'if value{i} is not less than 100 then\n'
+    '  say "big value number {i}"  # comment\n'
+    'end\n'
+)
+
+def generate(path, size_mb):
+    target = size_mb * 1024 * 1024
+    written = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            block = "".join(LINES.format(i=i + k) for k in range(1000))
+            f.write(block)
+            written += len(block)
+            i += 1000
+
+def measure(phase, mode, path):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", WORKER, phase, mode, str(path)],
+                         capture_output=True, text=True, env=env, check=True).stdout
+    elapsed = time.perf_counter() - start
+    count, rss_kb = out.split()
+    return int(count), int(rss_kb), elapsed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--size-mb", type=int, default=100, help="Input size for the lex phase")
+    ap.add_argument("--parse-size-mb", type=int, default=10, help="Input size for the parse phase")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'phase':<6} {'MB':>5} {'mode':<7} {'count':>10} {'peak RSS MB':>12} {'seconds':>8}")
+        for phase, size in (("lex", args.size_mb), ("parse", args.parse_size_mb)):
+            path = Path(tmp) / f"{phase}.dpl"
+            generate(path, size)
+            for mode in ("eager", "stream"):
+                count, rss_kb, elapsed = measure(phase, mode, path)
+                print(f"{phase:<6} {size:>5} {mode:<7} {count:>10} {rss_kb / 1024:>12.1f} {elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
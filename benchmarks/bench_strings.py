@@ -0,0 +1,70 @@
+"""Seconds to build long strings by repeated '+', with and without ropes.
+
+Usage:
+    python benchmarks/bench_strings.py [--sizes 1,10,30] [--copy-max 1] [--engines tree,vm,closure,py,async]
+
+Runs loops that build a string of each size (in MB) ten characters per
+iteration and then 'say' it, so the rope is flattened once:
+
+- append: ``set s to s + "abcdefghi,"``
+- chain:  ``set s to s + x + ","`` (the py engine's CPython in-place
+  append does not apply, as the first '+' is not stored)
+
+"ropes" is the default; "copies" turns ropes off (every append copies the
+whole string, quadratic) and only runs sizes up to --copy-max MB.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import parse_source, rope  # noqa: E402
+from deepulang.engines import ENGINES, create_engine  # noqa: E402
+from deepulang.output import CaptureOutput  # noqa: E402
+
+PATTERNS = {
+    "append": 'set s to s + "abcdefghi,"',
+    "chain": 'set s to s + x + ","',
+}
+
+def build(engine, pattern, size):
+    times = size // 10
+    program = parse_source(f'let s be ""\nlet x be "abcdefghi"\nrepeat {times} times\n'
+                           f'  {PATTERNS[pattern]}\nend\nsay s\n')
+    output = CaptureOutput()
+    start = time.perf_counter()
+    create_engine(engine, output).interpret(program)
+    elapsed = time.perf_counter() - start
+    assert len(output.lines[0]) == times * 10
+    return elapsed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1,10,30", help="Comma-separated string sizes in MB")
+    ap.add_argument("--copy-max", type=float, default=1, help="Largest size (MB) run without ropes")
+    ap.add_argument("--engines", default=",".join(ENGINES), help="Comma-separated engines")
+    args = ap.parse_args(argv)
+
+    threshold = rope.ROPE_THRESHOLD
+    print(f"{'pattern':<8} {'engine':<8} {'MB':>5} {'ropes s':>9} {'copies s':>9} {'speedup':>8}")
+    for pattern in PATTERNS:
+        for engine in args.engines.split(","):
+            for mb in map(float, args.sizes.split(",")):
+                size = int(mb * 1_000_000)
+                with_ropes = build(engine, pattern, size)
+                copies = speedup = "-"
+                if mb <= args.copy_max:
+                    rope.ROPE_THRESHOLD = sys.maxsize
+                    try:
+                        copied = build(engine, pattern, size)
+                    finally:
+                        rope.ROPE_THRESHOLD = threshold
+                    copies = f"{copied:.2f}"
+                    speedup = f"{copied / with_ropes:.1f}x"
+                print(f"{pattern:<8} {engine:<8} {mb:>5g} {with_ropes:>9.2f} {copies:>9} {speedup:>8}",
+                      flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Variable-heavy loops on each engine.
+
+Usage:
+    python benchmarks/bench_variables.py [--iterations 50000] [--repeat 3]
+
+The program keeps a handful of variables live and reads and writes them
+on every iteration, so run time is dominated by variable access. Parsing
+is excluded; the best of --repeat runs is reported per engine.
+"""
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import Lexer, Parser  # noqa: E402
+from deepulang.engines import ENGINES, create_engine  # noqa: E402
+
+PROGRAM = """\
+let a be 1
+let b be 2
+let c be 3
+let total be 0
+let i be 0
+while i is less than {n} do
+  set a to b + c + i
+  set b to a - c - i
+  set c to a - b - i
+  set total to total + a + b + c - i
+  set i to i + 1
+end
+say total
+"""
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--iterations", type=int, default=50000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    source = PROGRAM.format(n=args.iterations)
+    program = Parser(Lexer(source).tokenize()).parse()
+    print(f"{args.iterations} iterations, best of {args.repeat}")
+    print(f"{'engine':<8} {'seconds':>8} {'ns/access':>10}")
+    # Per iteration: 16 variable reads (condition included) and 5 writes.
+    accesses = args.iterations * 21
+    for engine in ENGINES:
+        best = float("inf")
+        for _ in range(args.repeat):
+            interp = create_engine(engine)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                interp.interpret(program)
+            best = min(best, time.perf_counter() - start)
+        print(f"{engine:<8} {best:>8.3f} {best / accesses * 1e9:>10.1f}")
+
+if __name__ == "__main__":
+    main()
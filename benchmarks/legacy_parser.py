@@ -0,0 +1,170 @@
+"""The original recursive-descent Parser, kept as the baseline for bench_parser.py."""
+from deepulang.tokens import (
+    BE, DO, END, EOF, IDENT, IF,
+    IS_EQ, IS_GT, IS_LT, IS_NE, IS_NOT_GT, IS_NOT_LT,
+    LET, LPAREN, MINUS, NEWLINE, NOT, NUMBER,
+    OTHERWISE, PLUS, REPEAT, RPAREN, SAY, SET,
+    SLASH, STAR, STRING, THEN, TIMES, TO,
+    WHILE,
+)
+from deepulang.ast_nodes import *
+from deepulang.parser import ParseError
+
+class Parser:
+    """Recursive-descent parser over a token list or any token iterator.
+
+    Tokens are pulled one at a time with a single token of lookahead, so
+    passing Lexer.iter_tokens() parses without materializing the token list.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.stream = iter(tokens)
+        self.current = next(self.stream)
+
+    def peek(self):
+        return self.current
+
+    def advance(self):
+        tok = self.current
+        if tok.type is not EOF:
+            self.current = next(self.stream)
+        return tok
+
+    def check(self, ttype):
+        return self.current.type is ttype
+
+    def match(self, *types):
+        if self.current.type in types:
+            return self.advance()
+        return None
+
+    def consume(self, ttype, msg):
+        if self.check(ttype): return self.advance()
+        raise ParseError(f"{msg} at line {self.peek().line}:{self.peek().col}")
+
+    def synchronize(self):
+        # For minimal MVP just advance on error
+        self.advance()
+
+    def parse(self):
+        return Program(list(self.iter_statements()))
+
+    def iter_statements(self):
+        """Yield top-level statements as soon as each one is complete.
+
+        A block statement is yielded once its 'end' has been consumed; the
+        parser never reads past the token that follows a statement.
+        """
+        while not self.check(EOF):
+            if self.check(NEWLINE):
+                self.advance(); continue
+            yield self.statement()
+
+    def statement(self):
+        start = self.peek()
+        return located(self.statement_kind(), start)
+
+    def statement_kind(self):
+        if self.match(LET):
+            name = self.consume(IDENT, "Expected identifier after 'let'")
+            self.consume(BE, "Expected 'be'")
+            expr = self.expression()
+            return VarDecl(name.lexeme, expr)
+        if self.match(SET):
+            name = self.consume(IDENT, "Expected identifier after 'set'")
+            self.consume(TO, "Expected 'to'")
+            expr = self.expression()
+            return Assign(name.lexeme, expr)
+        if self.match(SAY):
+            return Print(self.expression())
+        if self.match(IF):
+            cond = self.condition()
+            self.consume(THEN, "Expected 'then'")
+            then_block = self.block()
+            else_block = None
+            if self.match(OTHERWISE):
+                else_block = self.block()
+            self.consume(END, "Expected 'end'")
+            return If(cond, then_block, else_block)
+        if self.match(WHILE):
+            cond = self.condition()
+            self.consume(DO, "Expected 'do'")
+            body = self.block()
+            self.consume(END, "Expected 'end'")
+            return While(cond, body)
+        if self.match(REPEAT):
+            count_expr = self.expression()
+            self.consume(TIMES, "Expected 'times'")
+            body = self.block()
+            self.consume(END, "Expected 'end'")
+            return Repeat(count_expr, body)
+        raise ParseError(f"Unexpected token {self.peek()}")
+
+    def block(self):
+        # Accept optional NEWLINE
+        if self.match(NEWLINE):
+            pass
+        statements = []
+        while (not self.check(END) and
+               not self.check(OTHERWISE) and
+               not self.check(EOF)):
+            if self.check(NEWLINE):
+                self.advance()
+                continue
+            statements.append(self.statement())
+            if self.check(NEWLINE):
+                self.advance()
+        return statements
+
+    def condition(self):
+        # For MVP just a comparison (extend later)
+        left = self.expression()
+        comp_token = self.match(IS_GT, IS_LT, IS_EQ,
+                                IS_NE, IS_NOT_GT, IS_NOT_LT)
+        if not comp_token:
+            raise ParseError("Expected comparator in condition")
+        right = self.expression()
+        return located(Comparison(left, comp_token, right), left)
+
+    def expression(self):
+        return self.term()
+
+    def term(self):
+        expr = self.factor()
+        while True:
+            op = self.match(PLUS, MINUS)
+            if not op: break
+            right = self.factor()
+            expr = located(Binary(expr, op, right), op)
+        return expr
+
+    def factor(self):
+        expr = self.unary()
+        while True:
+            op = self.match(STAR, SLASH)
+            if not op: break
+            right = self.unary()
+            expr = located(Binary(expr, op, right), op)
+        return expr
+
+    def unary(self):
+        op = self.match(MINUS, NOT)
+        if op:
+            right = self.unary()
+            return located(Unary(op, right), op)
+        return self.primary()
+
+    def primary(self):
+        tok = self.peek()
+        if tok.type is NUMBER or tok.type is STRING:
+            self.advance()
+            return located(Literal(tok.value), tok)
+        if tok.type is IDENT:
+            self.advance()
+            return located(Var(tok.lexeme), tok)
+        if tok.type is LPAREN:
+            self.advance()
+            expr = self.expression()
+            self.consume(RPAREN, "Expected ')'")
+            return expr
+        raise ParseError(f"Unexpected token in expression {tok}")
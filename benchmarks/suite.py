@@ -0,0 +1,229 @@
+"""Benchmark suite: lexer, parser and engine throughput on generated workloads.
+
+Usage:
+    python benchmarks/suite.py run [--workloads arith,strings] [--engines tree,vm]
+                                   [--scale 1.0] [--repeat 3] [--save results.json]
+                                   [--compare benchmarks/baseline.json] [--threshold 0.1]
+    python benchmarks/suite.py compare benchmarks/baseline.json results.json [--threshold 0.1]
+
+Every workload is timed in three phases: lexing (tokens/s), parsing
+(AST nodes/s) and running on each engine (executed statements/s, counted
+once with the profiler outside the timed runs). Each time is the best of
+--repeat runs. `run --save` writes the results as JSON, the format of
+benchmarks/baseline.json. `compare` (or `run --compare`) lists the
+phases whose rate dropped by more than --threshold (a fraction) against
+the baseline and exits with status 1 if there are any. Rates are only
+comparable between runs on the same machine; regenerate the baseline
+with `run --save benchmarks/baseline.json` when moving.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from deepulang import __version__  # noqa: E402
+from deepulang.ast_nodes import count_nodes  # noqa: E402
+from deepulang.engines import ENGINES, create_engine  # noqa: E402
+from deepulang.lexer import Lexer  # noqa: E402
+from deepulang.output import CaptureOutput  # noqa: E402
+from deepulang.parser import Parser  # noqa: E402
+from deepulang.profiler import ProfilingInterpreter  # noqa: E402
+
+# Workload generators: scale -> source. At scale 1.0 a tree-walker run
+# takes roughly 0.05-0.5s.
+
+def arith(scale):
+    """Tight integer arithmetic in a single loop."""
+    return (
+        "let total be 0\n"
+        "let i be 0\n"
+        f"while i is less than {int(20000 * scale)} do\n"
+        "  set total to total + i * 3 - total / 7\n"
+        "  set i to i + 1\n"
+        "end\n"
+        "say total\n"
+    )
+
+def strings(scale):
+    """String building with '+' and '*', restarted before it grows large."""
+    return (
+        'let s be ""\n'
+        "let n be 0\n"
+        f"repeat {int(10000 * scale)} times\n"
+        '  set s to s + "ab" * 3 + "c"\n'
+        "  set n to n + 1\n"
+        "  if n is greater than 100 then\n"
+        '    set s to ""\n'
+        "    set n to 0\n"
+        "  end\n"
+        "end\n"
+        "say s\n"
+    )
+
+def nesting(scale, depth=12):
+    """If/While nested ``depth`` levels deep, each loop running twice."""
+    lines = ["let hits be 0"]
+    for d in range(depth):
+        pad = "  " * (2 * d)
+        lines += [f"{pad}let w{d} be 0",
+                  f"{pad}while w{d} is less than 2 do",
+                  f"{pad}  if w{d} is not greater than 1 then"]
+    lines.append("  " * (2 * depth) + "set hits to hits + 1")
+    for d in reversed(range(depth)):
+        pad = "  " * (2 * d)
+        lines += [f"{pad}  end", f"{pad}  set w{d} to w{d} + 1", f"{pad}end"]
+    body = "\n".join(lines) + "\n"
+    return f"repeat {max(1, int(4 * scale))} times\n{body}end\nsay hits\n"
+
+def flat(scale):
+    """A very long program without loops."""
+    statements = ["let a be 1", "let b be 2"]
+    for i in range(int(4000 * scale)):
+        x, y = "ab" if i % 2 else "ba"
+        statements.append(f"set {x} to {y} * 2 + {i % 97} - ({x} + {y}) / 3")
+    return "\n".join(statements) + "\nsay a\n"
+
+def comparators(scale):
+    """Multi-word comparators and keywords, the lexer's slowest tokens."""
+    chunk = (
+        "if index is not greater than limit then\n"
+        "  if item is not equal to other then\n"
+        "    set index to index + 1\n"
+        "  otherwise\n"
+        "    if index is less than limit then\n"
+        "      set limit to limit - 1\n"
+        "    end\n"
+        "  end\n"
+        "end\n"
+    )
+    head = "let index be 0\nlet limit be 100000\nlet item be 1\nlet other be 2\n"
+    return head + chunk * int(1000 * scale)
+
+WORKLOADS = {f.__name__: f for f in (arith, strings, nesting, flat, comparators)}
+
+def best(fn, repeat, min_time=0.05):
+    """Best per-call time of ``fn`` over ``repeat`` rounds, and its result.
+
+    Each round calls ``fn`` often enough to take ``min_time``, so quick
+    phases are not lost in timer resolution.
+    """
+    number, result = 1, None
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            result = fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return min(times), result
+
+def measure(source, engines, repeat):
+    """{phase: {"seconds", "items", "rate", "unit"}} for one workload."""
+    phases = {}
+
+    def record(phase, seconds, items, unit):
+        phases[phase] = {"seconds": round(seconds, 6), "items": items,
+                         "rate": round(items / seconds, 1), "unit": unit}
+
+    seconds, tokens = best(lambda: Lexer(source).tokenize(), repeat)
+    record("lex", seconds, len(tokens), "tokens/s")
+    seconds, program = best(lambda: Parser(tokens).parse(), repeat)
+    record("parse", seconds, count_nodes(program), "nodes/s")
+
+    counter = ProfilingInterpreter(CaptureOutput())
+    counter.interpret(program)
+    executed = sum(stats.count for stats in counter.profile.lines.values())
+    for engine in engines:
+        seconds, _ = best(lambda: create_engine(engine, CaptureOutput()).interpret(program), repeat)
+        record(f"run:{engine}", seconds, executed, "statements/s")
+    return phases
+
+def run_suite(workloads, engines, scale, repeat):
+    results = {}
+    for name in workloads:
+        results[name] = measure(WORKLOADS[name](scale), engines, repeat)
+        for phase, m in results[name].items():
+            print(f"{name:<12} {phase:<12} {m['seconds'] * 1000:>10.3f} ms "
+                  f"{m['rate']:>14,.0f} {m['unit']}")
+    return {
+        "meta": {"deepulang": __version__, "python": platform.python_version(),
+                 "machine": platform.machine(), "scale": scale, "repeat": repeat},
+        "results": results,
+    }
+
+def compare(baseline, current, threshold):
+    """Print the rate change of every phase in both; return the regressions."""
+    regressions = []
+    for name, phases in current["results"].items():
+        for phase, m in phases.items():
+            base = baseline["results"].get(name, {}).get(phase)
+            if base is None:
+                continue
+            change = m["rate"] / base["rate"] - 1
+            flag = ""
+            if change < -threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, phase, change))
+            print(f"{name:<12} {phase:<12} {base['rate']:>14,.0f} -> {m['rate']:>14,.0f} "
+                  f"{100 * change:>+7.1f}%{flag}")
+    if baseline.get("meta", {}).get("scale") != current.get("meta", {}).get("scale"):
+        print("warning: baseline was recorded at a different --scale", file=sys.stderr)
+    return regressions
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Run the suite")
+    run.add_argument("--workloads", default=",".join(WORKLOADS),
+                     help=f"Comma-separated subset of: {', '.join(WORKLOADS)}")
+    run.add_argument("--engines", default=",".join(e for e in ENGINES if e != "async"))
+    run.add_argument("--scale", type=float, default=1.0, help="Workload size multiplier")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--save", metavar="FILE", help="Write results as JSON")
+    run.add_argument("--compare", metavar="BASELINE", help="Compare against a saved baseline")
+    run.add_argument("--threshold", type=float, default=0.10,
+                     help="Flag rates this fraction below the baseline (default: 0.10)")
+    cmp = sub.add_parser("compare", help="Compare two saved result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args(argv)
+
+    if args.command == "compare":
+        regressions = compare(load(args.baseline), load(args.current), args.threshold)
+    else:
+        unknown = set(args.workloads.split(",")) - set(WORKLOADS)
+        if unknown:
+            ap.error(f"unknown workload(s): {', '.join(sorted(unknown))}")
+        current = run_suite(args.workloads.split(","), args.engines.split(","),
+                            args.scale, args.repeat)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2)
+                f.write("\n")
+        if not args.compare:
+            return 0
+        print()
+        regressions = compare(load(args.compare), current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,31 +8,148 @@ __all__ = [
 	"Lexer",
 	"Parser",
 	"Interpreter",
+	"ClosureInterpreter",
 	"run_file",
+	"run_stream",
+	"parse_source",
+	"CompiledProgram",
 	"__version__",
 ]
 
 __version__ = "0.1.1"
 
-from .lexer import Lexer  # noqa: E402
-from .parser import Parser  # noqa: E402
-from .interpreter import Interpreter  # noqa: E402
-
-def run_file(path: str):
-	"""Lex, parse, and interpret a .dpl source file."""
-	with open(path, 'r', encoding='utf-8') as f:
-		source = f.read()
-	lexer = Lexer(source)
-	tokens = lexer.tokenize()
-	parser = Parser(tokens)
-	program = parser.parse()
-	interp = Interpreter()
-	interp.interpret(program)
+# Public names are imported on first use (PEP 562), so `import deepulang`
+# and `deepulang --version` do not load the lexer, parser and engines.
+LAZY = {
+	"Lexer": "lexer",
+	"Parser": "parser",
+	"Interpreter": "interpreter",
+	"ClosureInterpreter": "closures",
+	"create_engine": "engines",
+	"interpret_stream": "engines",
+	# deepulang.compile() is left out of __all__ so star imports keep the builtin.
+	"compile": "embed",
+	"CompiledProgram": "embed",
+}
+
+def __getattr__(name):
+	module = LAZY.get(name)
+	if module is None:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	from importlib import import_module
+	value = getattr(import_module(f".{module}", __name__), name)
+	globals()[name] = value
+	return value
+
+def __dir__():
+	return sorted(set(globals()) | set(LAZY))
+
+def parse_source(source: str, observer=None):
+	"""Lex and parse a complete source string into a Program.
+
+	``observer`` is told about the lex and parse phases (see
+	deepulang.instrument).
+	"""
+	from .lexer import Lexer
+	if observer is None:
+		from .parser import Parser
+		return Parser(Lexer(source).tokenize()).parse()
+	from .instrument import observe
+	with observe(observer, "lex") as counts:
+		tokens = Lexer(source).tokenize()
+		counts["tokens"] = len(tokens)
+	return parse_tokens(tokens, observer)
+
+def parse_tokens(tokens, observer=None):
+	"""Parse a token list, as the observed ``parse`` phase."""
+	from .parser import Parser
+	if observer is None:
+		return Parser(tokens).parse()
+	from .ast_nodes import count_nodes
+	from .instrument import observe
+	with observe(observer, "parse") as counts:
+		program = Parser(tokens).parse()
+		counts["nodes"] = count_nodes(program)
+	return program
+
+def load_program(source: str, cache_dir=None, opt_level: int = 0, observer=None, limits=None):
+	"""Parse (or fetch from the cache in ``cache_dir``) and optimize ``source``.
+
+	``limits`` are those the program will run under; the optimizer does not
+	fold anything they would reject.
+	"""
+	from .instrument import observe
+	if cache_dir is not None:
+		from .cache import ProgramCache
+		with observe(observer, "cache") as counts:
+			parsed = []
+			def parse(source):
+				parsed.append(True)
+				return parse_source(source, observer)
+			program = ProgramCache(cache_dir).get_or_parse(source, parse)
+			counts["hit"] = not parsed
+	else:
+		program = parse_source(source, observer)
+	return optimize_program(program, opt_level, observer, limits)
+
+def optimize_program(program, opt_level: int, observer=None, limits=None):
+	if not opt_level:
+		return program
+	from .instrument import observe
+	from .optimizer import optimize
+	with observe(observer, "optimize") as counts:
+		program = optimize(program, opt_level, limits)
+		if observer is not None:
+			from .ast_nodes import count_nodes
+			counts["nodes"] = count_nodes(program)
+	return program
+
+def run_file(path: str, engine: str = "tree", cache_dir=None, opt_level: int = 0, output=None,
+		observer=None):
+	"""Lex, parse, and interpret a .dpl source file.
+
+	``engine`` selects the executor: "tree" walks the AST, "vm" compiles to
+	bytecode first, "closure" to nested Python closures and "py" transpiles
+	to Python source run by CPython itself (see deepulang.engines).
+	With ``cache_dir`` the parsed program is cached there and reused while
+	the file's contents are unchanged (see deepulang.cache). ``opt_level``
+	1 or 2 runs the optimizer first (see deepulang.optimizer). ``output``
+	receives 'say' lines (see deepulang.output). ``observer`` is notified
+	of every phase with its timing and counts (see deepulang.instrument).
+	"""
+	from .engines import create_engine
+	from .instrument import observe, counting_limits, run_observed
+	with observe(observer, "read") as counts:
+		with open(path, 'r', encoding='utf-8') as f:
+			source = f.read()
+		counts["chars"] = len(source)
+	program = load_program(source, cache_dir, opt_level, observer)
+	limits = counting_limits(None) if observer is not None else None
+	run_observed(create_engine(engine, output, limits), program, observer)
+
+def run_stream(stream, engine: str = "tree", opt_level: int = 0, output=None):
+	"""Execute DeepuLang read from a text stream, one statement at a time.
+
+	Each top-level statement runs as soon as it has been parsed (block
+	statements once their 'end' arrives), so output starts before the end
+	of the stream. Returns the engine, whose ``env`` holds the variables.
+	"""
+	from .engines import create_engine, interpret_stream
+	from .lexer import Lexer
+	from .parser import Parser
+	interp = create_engine(engine, output)
+	parser = Parser(Lexer(stream).iter_tokens())
+	statements = parser.iter_statements()
+	if opt_level:
+		from .optimizer import optimize_stream
+		statements = optimize_stream(statements, opt_level)
+	interpret_stream(interp, statements)
+	return interp
 
 # Backwards compatibility: allow python -m deepulang
 def main():  # pragma: no cover - thin wrapper
 	from .cli import main as cli_main
-	cli_main()
+	return cli_main()
 
 if __name__ == '__main__':  # pragma: no cover
 	main()
@@ -0,0 +1,227 @@
+"""Run programs as asyncio coroutines.
+
+    interp = AsyncInterpreter(AsyncCaptureOutput(), quantum=1000)
+    await interp.run(program)
+
+Hundreds of programs can share one event loop: the program is compiled to
+closures as by the closure engine, but loops compile to generators that
+count steps (one per statement in the body, per iteration) and suspend
+once ``quantum`` steps have run, so run() awaits asyncio.sleep(0) and
+lets the other programs go. Code without loops never suspends.
+
+With an async output (``say`` and ``flush`` are coroutine functions) each
+'say' is awaited as well, so a slow consumer applies backpressure; the
+ordinary sinks from deepulang.output work too. Step and time limits are
+checked each time the program suspends.
+"""
+import asyncio
+from inspect import iscoroutinefunction, isgeneratorfunction
+
+from .ast_nodes import *
+from .closures import ClosureInterpreter, sequence
+from .interpreter import RuntimeErrorDPL
+from .rope import plain
+
+DEFAULT_QUANTUM = 1000
+
+class Clock:
+    """Steps the running program may still take before it suspends."""
+    __slots__ = ("left",)
+
+    def __init__(self):
+        self.left = 0
+
+class AsyncInterpreter(ClosureInterpreter):
+    """Closure engine whose run(program) is a coroutine.
+
+    interpret(program) runs the coroutine to completion with asyncio.run(),
+    so the engine also works wherever a synchronous one is expected (but
+    not from inside a running event loop).
+    """
+    def __init__(self, output=None, limits=None, quantum: int = DEFAULT_QUANTUM):
+        super().__init__(output, limits)
+        self.quantum = quantum
+        self.clock = Clock()
+        self.async_output = iscoroutinefunction(self.output.say)
+
+    def interpret(self, program: Program):
+        asyncio.run(self.run(program))
+
+    async def run(self, program: Program):
+        """Execute ``program``, suspending every ``quantum`` steps."""
+        main = self.compile(program)
+        try:
+            if isgeneratorfunction(main):
+                await self.drive(main(self.env.slots))
+            else:
+                main(self.env.slots)
+        finally:
+            if iscoroutinefunction(self.output.flush):
+                await self.output.flush()
+            else:
+                self.output.flush()
+
+    async def drive(self, steps):
+        """Run the generator ``steps``: None means suspend, anything else is awaited."""
+        clock = self.clock
+        limits = self.limits if self.limits is not None and self.limits.counts_steps else None
+        given = clock.left = self.time_slice(limits)
+        for pending in steps:
+            if pending is None:
+                if limits is not None:
+                    limits.tick(given - clock.left)
+                await asyncio.sleep(0)
+                given = clock.left = self.time_slice(limits)
+            else:
+                await pending
+        if limits is not None:
+            limits.tick(given - clock.left)
+
+    def time_slice(self, limits):
+        if limits is None:
+            return self.quantum
+        return min(self.quantum, limits.allowance())
+
+    def compile_block(self, stmts):
+        compiled = [self.compile_statement(s) for s in stmts]
+        if not any(map(isgeneratorfunction, compiled)):
+            return sequence(compiled)
+        steps = tuple((stmt, isgeneratorfunction(stmt)) for stmt in compiled)
+        def block(v):
+            for stmt, suspends in steps:
+                if suspends:
+                    yield from stmt(v)
+                else:
+                    stmt(v)
+        return block
+
+    def tally(self, stmt):
+        if not isgeneratorfunction(stmt):
+            return super().tally(stmt)
+        limits = self.tallied
+        def tallied(v):
+            limits.statements += 1
+            yield from stmt(v)
+        return tallied
+
+    # Statements that can suspend
+    def visit_Print(self, node: Print):
+        if not self.async_output:
+            return super().visit_Print(node)
+        expr = node.expr.accept(self)
+        emit = self.output.say
+        def say(v):
+            yield emit(plain(expr(v)))
+        return say
+
+    def visit_If(self, node: If):
+        if not self.can_suspend(node):
+            return super().visit_If(node)
+        cond = node.condition.accept(self)
+        then_block = as_generator(self.compile_block(node.then_block))
+        else_block = as_generator(self.compile_block(node.else_block or []))
+        def if_else(v):
+            if cond(v):
+                yield from then_block(v)
+            else:
+                yield from else_block(v)
+        return if_else
+
+    def can_suspend(self, node):
+        if isinstance(node, (While, Repeat)):
+            return True
+        if isinstance(node, Print):
+            return self.async_output
+        if isinstance(node, If):
+            return any(self.can_suspend(s) for s in node.then_block + (node.else_block or []))
+        return False
+
+    def visit_While(self, node: While):
+        cond = node.condition.accept(self)
+        body = self.compile_block(node.body)
+        cost = max(1, len(node.body))
+        clock = self.clock
+        if isgeneratorfunction(body):
+            def while_(v):
+                while cond(v):
+                    yield from body(v)
+                    clock.left -= cost
+                    if clock.left <= 0:
+                        yield
+        else:
+            def while_(v):
+                while cond(v):
+                    body(v)
+                    clock.left -= cost
+                    if clock.left <= 0:
+                        yield
+        return while_
+
+    def visit_Repeat(self, node: Repeat):
+        count_expr = node.count_expr.accept(self)
+        body = self.compile_block(node.body)
+        cost = max(1, len(node.body))
+        clock = self.clock
+        def count_of(v):
+            count = count_expr(v)
+            if not isinstance(count, int):
+                raise RuntimeErrorDPL("Repeat count must be integer")
+            return count
+        if isgeneratorfunction(body):
+            def repeat(v):
+                for _ in range(count_of(v)):
+                    yield from body(v)
+                    clock.left -= cost
+                    if clock.left <= 0:
+                        yield
+        else:
+            def repeat(v):
+                for _ in range(count_of(v)):
+                    body(v)
+                    clock.left -= cost
+                    if clock.left <= 0:
+                        yield
+        return repeat
+
+def as_generator(block):
+    """``block`` itself if it can suspend, else a generator that runs it."""
+    if isgeneratorfunction(block):
+        return block
+    def run(v):
+        block(v)
+        yield from ()
+    return run
+
+class AsyncCaptureOutput:
+    """Async sink keeping every line in ``lines``, e.g. for tests."""
+    def __init__(self):
+        self.lines = []
+
+    async def say(self, value):
+        self.lines.append(str(value))
+
+    async def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(line + "\n" for line in self.lines)
+
+class AsyncStreamOutput:
+    """Write lines to an asyncio StreamWriter, draining once ``high_water`` bytes are pending."""
+    def __init__(self, writer, high_water: int = 64 * 1024, encoding: str = "utf-8"):
+        self.writer = writer
+        self.high_water = high_water
+        self.encoding = encoding
+        self.pending = 0
+
+    async def say(self, value):
+        data = f"{value}\n".encode(self.encoding)
+        self.writer.write(data)
+        self.pending += len(data)
+        if self.pending >= self.high_water:
+            self.pending = 0
+            await self.writer.drain()
+
+    async def flush(self):
+        self.pending = 0
+        await self.writer.drain()
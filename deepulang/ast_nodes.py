@@ -1,72 +1,168 @@
-from dataclasses import dataclass
-from typing import List, Optional, Any
+from __future__ import annotations
 
 # AST Node definitions
+#
+# Every node declares __slots__ (no per-instance __dict__), which keeps large
+# trees compact and makes attribute access a fixed-offset load. @node
+# generates the dataclass-style __init__, __repr__ and __eq__ from them;
+# dataclasses itself (and the inspect module it pulls in) would add a
+# noticeable share of the CLI's startup time.
 
 class Node:
+    # Source position (line, 1-based column) of the node's first token;
+    # operators take the operator token's, comparisons their left operand's.
+    # Set by the parser, None when unknown.
+    __slots__ = ("line", "col")
+
+    def __reduce__(self):
+        # Pickle as constructor arguments; the default slot-state protocol
+        # is several times slower to load (see deepulang.cache).
+        fields = tuple(getattr(self, name) for name in self.__slots__)
+        if self.line is None:
+            return (type(self), fields)
+        return (restore_node, (type(self), fields, self.line, self.col))
+
     def accept(self, visitor: "Visitor"):
         name = self.__class__.__name__
         method = getattr(visitor, f"visit_{name}")
         return method(self)
 
-@dataclass
+def node(cls):
+    """Class decorator: __init__ taking ``cls.__slots__`` in order, __repr__, __eq__."""
+    fields = cls.__slots__
+    args = "".join(f", {name}" for name in fields)
+    body = "".join(f"    self.{name} = {name}\n" for name in fields)
+    namespace = {}
+    exec(f"def __init__(self{args}):\n{body}    self.line = None\n    self.col = None\n",
+         namespace)
+    cls.__init__ = namespace["__init__"]
+
+    def __repr__(self):
+        shown = ", ".join(f"{name}={getattr(self, name)!r}" for name in fields)
+        return f"{type(self).__name__}({shown})"
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in fields)
+
+    cls.__repr__ = __repr__
+    cls.__eq__ = __eq__
+    cls.__hash__ = None
+    return cls
+
+def restore_node(cls, fields, line, col=None):
+    node = cls(*fields)
+    node.line = line
+    node.col = col
+    return node
+
+def located(node, source):
+    """Give ``node`` the source position of ``source`` (a node or token)."""
+    node.line = source.line
+    node.col = source.col
+    return node
+
+@node
 class Program(Node):
-    statements: List[Node]
+    __slots__ = ("statements",)
+    statements: list[Node]
 
-@dataclass
+@node
 class VarDecl(Node):
+    __slots__ = ("name", "expr")
     name: str
     expr: Node
 
-@dataclass
+@node
 class Assign(Node):
+    __slots__ = ("name", "expr")
     name: str
     expr: Node
 
-@dataclass
+@node
 class Print(Node):
+    __slots__ = ("expr",)
     expr: Node
 
-@dataclass
+@node
 class If(Node):
+    __slots__ = ("condition", "then_block", "else_block")
     condition: Node
-    then_block: List[Node]
-    else_block: Optional[List[Node]]
+    then_block: list[Node]
+    else_block: list[Node] | None
 
-@dataclass
+@node
 class While(Node):
+    __slots__ = ("condition", "body")
     condition: Node
-    body: List[Node]
+    body: list[Node]
 
-@dataclass
+@node
 class Repeat(Node):
+    __slots__ = ("count_expr", "body")
     count_expr: Node
-    body: List[Node]
+    body: list[Node]
 
-@dataclass
+@node
 class Comparison(Node):
+    __slots__ = ("left", "op", "right")
     left: Node
-    op: Any  # Token
+    op: object  # Token
     right: Node
 
-@dataclass
+@node
 class Binary(Node):
+    __slots__ = ("left", "op", "right")
     left: Node
-    op: Any  # Token
+    op: object  # Token
     right: Node
 
-@dataclass
+@node
 class Unary(Node):
-    op: Any  # Token
+    __slots__ = ("op", "right")
+    op: object  # Token
     right: Node
 
-@dataclass
+@node
 class Literal(Node):
-    value: Any
+    __slots__ = ("value",)
+    value: object
 
-@dataclass
+@node
 class Var(Node):
+    __slots__ = ("name",)
+    name: str
+
+# Variable references resolved to Environment slots (deepulang.resolver).
+
+@node
+class SlotDecl(Node):
+    __slots__ = ("name", "slot", "expr")
+    name: str
+    slot: int
+    expr: Node
+
+@node
+class SlotAssign(Node):
+    __slots__ = ("name", "slot", "expr")
     name: str
+    slot: int
+    expr: Node
+
+@node
+class SlotVar(Node):
+    __slots__ = ("name", "slot")
+    name: str
+    slot: int
+
+def count_nodes(value) -> int:
+    """Number of nodes in a node, or a list of nodes, and everything below it."""
+    if isinstance(value, list):
+        return sum(count_nodes(v) for v in value)
+    if isinstance(value, Node):
+        return 1 + sum(count_nodes(getattr(value, name)) for name in value.__slots__)
+    return 0
 
 class Visitor:
     pass
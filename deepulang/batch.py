@@ -0,0 +1,149 @@
+"""`deepulang batch`: run many independent programs across worker processes.
+
+Each file is lexed, parsed and executed in a worker from a process pool
+with a fresh engine (so its own Environment) and a CaptureOutput, and
+produces one JSON object per line in the report, in input order:
+
+    {"file": ..., "ok": true, "seconds": ..., "parse_seconds": ...,
+     "output": "...", "variables": {...}}
+
+Failed programs have ``"ok": false`` and an ``"error"`` (plus ``"line"``
+when known) instead of ``"variables"``. The limit flags (``--max-steps``,
+``--timeout``, ...) apply to each file separately. Workers are reused for many files,
+so interpreter start-up and imports are paid once per worker.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from . import parse_source
+from .cli import add_limit_arguments, add_opt_arguments, limit_options
+from .engines import ENGINES, create_engine
+from .optimizer import optimize
+from .output import CaptureOutput
+
+def expand(patterns):
+    """Files named by ``patterns``: paths, globs (``**`` allowed) or directories."""
+    files = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            files += sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        elif os.path.isdir(pattern):
+            files += sorted(str(p) for p in Path(pattern).rglob("*.dpl"))
+        else:
+            files.append(pattern)
+    return files
+
+def run_job(path, engine="tree", opt_level=0, cache_dir=None, keep_output=True, limits=None):
+    """Run one file in isolation and return its report entry.
+
+    ``limits`` is a dict of Limits arguments; the budget starts with the run.
+    """
+    result = {"file": path, "ok": False, "seconds": None}
+    output = CaptureOutput()
+    start = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        if cache_dir is not None:
+            from .cache import ProgramCache
+            program = ProgramCache(cache_dir).get_or_parse(source, parse_source)
+        else:
+            program = parse_source(source)
+        budget = None
+        if limits:
+            from .limits import Limits
+            budget = Limits(**limits)
+        if opt_level:
+            program = optimize(program, opt_level, budget)
+        result["parse_seconds"] = round(time.perf_counter() - start, 6)
+        if budget is not None:
+            budget.reset()
+        interp = create_engine(engine, output, budget)
+        interp.interpret(program)
+        result["ok"] = True
+        result["variables"] = {name: json_value(v) for name, v in interp.env.variables.items()}
+    except Exception as e:
+        result.update(describe_error(e))
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    if keep_output:
+        result["output"] = output.getvalue()
+    return result
+
+def describe_error(error) -> dict:
+    """The ``error`` (and ``line``, when known) fields of a failed report entry."""
+    fields = {"error": f"{type(error).__name__}: {error}"}
+    line = getattr(error, "line", None)
+    if isinstance(line, int):
+        fields["line"] = line
+    return fields
+
+def json_value(value):
+    return value if isinstance(value, (bool, int, float, str)) else repr(value)
+
+def run_batch(files, jobs=None, engine="tree", opt_level=0, cache_dir=None, keep_output=True,
+              limits=None):
+    """Yield report entries for ``files`` in order, running ``jobs`` at a time.
+
+    ``jobs=1`` runs everything in this process.
+    """
+    options = (engine, opt_level, cache_dir, keep_output, limits)
+    if jobs == 1 or len(files) <= 1:
+        for path in files:
+            yield run_job(path, *options)
+        return
+    jobs = jobs or os.cpu_count() or 1
+    # Hand each worker several files per round trip; keep chunks small
+    # enough that slow files still spread across workers.
+    chunksize = max(1, min(64, len(files) // (jobs * 8)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(run_job, files, *([o] * len(files) for o in options),
+                            chunksize=chunksize)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="deepulang batch",
+        description="Run many .dpl files in parallel and write a JSON-lines report",
+    )
+    parser.add_argument("sources", nargs="+", help="Files, directories (searched for *.dpl) or globs")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Worker processes (default: number of CPUs; 1 runs in-process)")
+    parser.add_argument("--engine", choices=ENGINES, default="tree", help="Execution engine")
+    add_opt_arguments(parser, "Optimize: -O1 or -O2 (-O means -O1)")
+    parser.add_argument("--report", metavar="FILE", help="Write the report here instead of stdout")
+    parser.add_argument("--no-output", action="store_true",
+                        help="Leave program output out of the report")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the parsed-program cache")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Parsed-program cache directory")
+    add_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    files = expand(args.sources)
+    if not files:
+        print("error: no input files", file=sys.stderr)
+        return 1
+    cache_dir = None
+    if not args.no_cache:
+        from .cache import ProgramCache
+        cache_dir = str(ProgramCache(args.cache_dir).directory)
+
+    report = open(args.report, "w", encoding="utf-8") if args.report else sys.stdout
+    failed = 0
+    start = time.perf_counter()
+    try:
+        for result in run_batch(files, args.jobs, args.engine, args.opt_level,
+                                cache_dir, not args.no_output, limit_options(args)):
+            failed += not result["ok"]
+            report.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if report is not sys.stdout:
+            report.close()
+    elapsed = time.perf_counter() - start
+    print(f"{len(files)} files, {failed} failed, {elapsed:.2f}s", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,136 @@
+"""On-disk cache of parsed programs, in the spirit of __pycache__.
+
+Entries are pickled Program trees keyed by a hash of the source text, the
+deepulang version, the AST node layout and the Python implementation, so
+any change to either side simply misses. Writes go to a temporary file that is renamed into
+place, and the directory is kept under ``max_bytes`` by evicting the least
+recently used entries (hits refresh an entry's mtime).
+"""
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+
+from . import __version__
+from .ast_nodes import Node
+
+MAGIC = b"DPLC\x01"
+SUFFIX = ".dplc"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Node classes and their fields; editing ast_nodes.py invalidates old entries
+# even without a version bump.
+NODE_LAYOUT = ";".join(
+    f"{cls.__name__}({','.join(cls.__slots__)})" for cls in (Node, *Node.__subclasses__())
+)
+
+def default_cache_dir() -> Path:
+    env = os.environ.get("DEEPULANG_CACHE_DIR")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "deepulang"
+
+class ProgramCache:
+    def __init__(self, directory=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, source: str) -> str:
+        h = hashlib.sha256()
+        h.update(f"{__version__}\0{sys.implementation.cache_tag}\0{NODE_LAYOUT}\0".encode())
+        h.update(source.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def path_for(self, source: str) -> Path:
+        return self.directory / (self.key(source) + SUFFIX)
+
+    def load(self, source: str):
+        """Return the cached Program for ``source``, or None on a miss."""
+        path = self.path_for(source)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not data.startswith(MAGIC):
+            self.discard(path)
+            return None
+        try:
+            program = pickle.loads(data[len(MAGIC):])
+        except Exception:
+            self.discard(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    def store(self, source: str, program) -> bool:
+        """Write ``program`` for ``source``; failures are ignored (returns False)."""
+        import tempfile  # imported here: cache hits should not pay for it
+        try:
+            data = MAGIC + pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            return False
+        if len(data) > self.max_bytes:
+            return False
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self.path_for(source))
+            except BaseException:
+                self.discard(tmp)
+                raise
+            self.evict()
+        except OSError:
+            return False
+        return True
+
+    def get_or_parse(self, source: str, parse):
+        """Return the cached Program for ``source``, else ``parse(source)`` and cache it."""
+        program = self.load(source)
+        if program is None:
+            program = parse(source)
+            self.store(source, program)
+        return program
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+
+    def clear(self):
+        if not self.directory.is_dir():
+            return
+        for path in self.directory.glob("*" + SUFFIX):
+            self.discard(path)
+
+    @staticmethod
+    def discard(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
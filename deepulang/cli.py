@@ -1,55 +1,342 @@
-import argparse
+import os
 import sys
-from pathlib import Path
-from . import __version__, run_file, Lexer, Parser, Interpreter
+from . import __version__
+
+# Everything else is imported inside the functions that need it: the CLI
+# runs as a short-lived process, and `--version` should not pay for the
+# lexer, parser and engines.
+
+
+# Subcommands, recognized when they are the first argument.
+COMMANDS = {
+    "batch": "deepulang.batch",
+    "serve": "deepulang.server",
+}
 
 
 def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        import importlib
+        return importlib.import_module(COMMANDS[argv[0]]).main(argv[1:])
+    if argv and argv[0] == "run":
+        argv = argv[1:]  # `deepulang run FILE` is `deepulang FILE`
+    if "--version" in argv:
+        print(f"deepulang {__version__}")
+        return 0
+
+    import argparse
+    from .engines import ENGINES
     parser = argparse.ArgumentParser(
         prog="deepulang",
-        description="DeepuLang - tiny educational language"
+        description="DeepuLang - tiny educational language",
+        epilog="Commands: 'deepulang batch --help' runs many files in parallel; "
+               "'deepulang serve --help' keeps an interpreter running for --server.",
     )
-    parser.add_argument("source", nargs="?", help="Path to .dpl source file")
+    parser.add_argument("source", nargs="?", help="Path to .dpl source file, or - for stdin")
     parser.add_argument("--version", action="store_true", help="Show version and exit")
     parser.add_argument("--tokens", action="store_true", help="Print tokens instead of executing")
     parser.add_argument("--ast", action="store_true", help="Print parsed AST (repr) and exit")
+    parser.add_argument("--check", action="store_true",
+                        help="Report variables used before any 'let' could declare them, "
+                             "without running")
+    parser.add_argument("--engine", choices=ENGINES, default="tree",
+                        help="Execution engine: tree walker, bytecode VM, closure compiler, "
+                             "Python transpiler or asyncio coroutine (default: tree)")
+    parser.add_argument("--emit-python", action="store_true",
+                        help="Print the Python source generated by the py engine and exit")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read the source incrementally and execute each top-level "
+                             "statement as soon as it is parsed")
+    parser.add_argument("--buffer-output", action="store_true",
+                        help="Collect 'say' output and write it in large chunks (flushed at "
+                             "the end of the program or on error)")
+    add_opt_arguments(parser, "Optimize before running: -O1 folds constants and drops dead "
+                              "branches, -O2 also hoists loop invariants (-O means -O1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not read or write the parsed-program cache")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Parsed-program cache directory (default: $DEEPULANG_CACHE_DIR "
+                             "or ~/.cache/deepulang)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print per-phase wall time, token/node counts, statements "
+                             "executed, --max-steps steps, variables and memory growth to "
+                             "stderr afterwards")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run on the tree walker and report per-line execution counts and "
+                             "times, and per-node-type counts, afterwards")
+    parser.add_argument("--profile-format", choices=("text", "collapsed", "json"), default="text",
+                        help="Profile report format; 'collapsed' is stacks for flame graph "
+                             "tools (default: text)")
+    parser.add_argument("--profile-file", metavar="FILE",
+                        help="Write the profile report here instead of stderr")
+    parser.add_argument("--watch", action="store_true",
+                        help="Run the file again every time it changes, re-parsing only the "
+                             "edited statements (stop with Ctrl-C)")
+    parser.add_argument("--server", action="store_true",
+                        help="Run the program in a running 'deepulang serve' instead of "
+                             "this process")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="The server's socket for --server (default: as 'deepulang serve')")
+    add_limit_arguments(parser)
     args = parser.parse_args(argv)
+    if args.profile and args.engine != "tree":
+        parser.error("--profile only works with --engine tree")
 
-    if args.version:
-        print(f"deepulang {__version__}")
-        return 0
+    if args.server:
+        return run_on_server(args, parser)
+    if args.watch:
+        return run_watch(args, parser)
+
+    args.observer = None
+    if args.stats:
+        from .instrument import Stats
+        args.observer = Stats()
+    try:
+        return run_source(args, parser)
+    finally:
+        if args.observer is not None:
+            sys.stderr.write(args.observer.report())
 
+
+def run_source(args, parser):
+    """Read, lex and parse the source named by args, then run_tokens/run_program."""
     if not args.source:
         parser.print_usage()
         print("error: missing source file")
         return 1
 
-    path = Path(args.source)
-    if not path.exists():
+    from .instrument import observe
+    if args.source == "-":
+        if args.stream:
+            from .lexer import Lexer
+            return run_tokens(args, Lexer(sys.stdin).iter_tokens())
+        return run_tokens(args, lex(args, sys.stdin.read()))
+
+    path = args.source
+    if not os.path.exists(path):
         print(f"error: file not found: {path}", file=sys.stderr)
         return 1
 
     with open(path, 'r', encoding='utf-8') as f:
-        source = f.read()
+        if args.stream:
+            from .lexer import Lexer
+            return run_tokens(args, Lexer(f).iter_tokens())
+        with observe(args.observer, "read") as counts:
+            source = f.read()
+            counts["chars"] = len(source)
+
+    if not (args.tokens or args.no_cache):
+        from . import load_program
+        from .cache import ProgramCache
+        cache_dir = str(ProgramCache(args.cache_dir).directory)
+        return run_program(args, load_program(source, cache_dir, observer=args.observer))
+
+    return run_tokens(args, lex(args, source))
+
+
+def run_on_server(args, parser):
+    """Send the source named by args to `deepulang serve` and relay its output."""
+    for flag in ("tokens", "ast", "check", "emit_python", "stream", "profile", "stats"):
+        if getattr(args, flag):
+            parser.error(f"--{flag.replace('_', '-')} does not work with --server")
+    if not args.source:
+        parser.print_usage()
+        print("error: missing source file")
+        return 1
+    if args.source == "-":
+        source = sys.stdin.read()
+    else:
+        try:
+            with open(args.source, 'r', encoding='utf-8') as f:
+                source = f.read()
+        except FileNotFoundError:
+            print(f"error: file not found: {args.source}", file=sys.stderr)
+            return 1
+
+    from .client import default_socket_path, run_remote
+    request = {"source": source, "engine": args.engine, "opt_level": args.opt_level,
+               "limits": limit_options(args), "variables": False}
+    socket_path = args.socket or default_socket_path()
+
+    def write(text):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    try:
+        result = run_remote(request, socket_path, write)
+    except OSError as e:
+        print(f"error: cannot reach 'deepulang serve' at {socket_path}: {e}", file=sys.stderr)
+        return 1
+    if not result["ok"]:
+        where = f" (line {result['line']})" if "line" in result else ""
+        print(f"error: {result['error']}{where}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_watch(args, parser, rounds=None):
+    """Parse and run the file named by args on every change (see deepulang.incremental)."""
+    for flag in ("tokens", "stream", "stats"):
+        if getattr(args, flag):
+            parser.error(f"--{flag} does not work with --watch")
+    if not args.source or args.source == "-":
+        parser.error("--watch needs a file")
+    args.observer = None
+    from .incremental import watch
+
+    def changed(document, seconds):
+        print(f"--- {args.source}: {len(document.lines)} lines, re-parsed "
+              f"{document.reparsed_lines} in {seconds * 1000:.1f} ms", file=sys.stderr)
+        try:
+            run_program(args, document.program)
+        except Exception as e:
+            print(f"error: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.stdout.flush()
+
+    try:
+        watch(args.source, changed, rounds=rounds)
+    except KeyboardInterrupt:
+        pass
+    return 0
 
-    lexer = Lexer(source)
-    tokens = lexer.tokenize()
 
+def lex(args, source):
+    from .instrument import observe
+    from .lexer import Lexer
+    with observe(args.observer, "lex") as counts:
+        tokens = Lexer(source).tokenize()
+        counts["tokens"] = len(tokens)
+    return tokens
+
+
+def run_tokens(args, tokens):
+    """Print, parse or execute a token list or token iterator per args."""
     if args.tokens:
         for t in tokens:
             print(t)
         return 0
 
-    parser_obj = Parser(tokens)
-    program = parser_obj.parse()
+    from . import parse_tokens
+    from .instrument import observe, record_run
+    if args.stream and not (args.ast or args.emit_python):
+        from .engines import interpret_stream
+        from .optimizer import optimize_stream
+        from .parser import Parser
+        statements = Parser(tokens).iter_statements()
+        if args.opt_level:
+            statements = optimize_stream(statements, args.opt_level, make_limits(args))
+        interp = make_engine(args)
+        # Lexing, parsing and running interleave, so they are one phase.
+        with observe(args.observer, "run") as counts:
+            try:
+                interpret_stream(interp, statements)
+            finally:
+                write_profile(args, interp)
+                if args.observer is not None:
+                    record_run(counts, interp)
+        return 0
+    return run_program(args, parse_tokens(tokens, args.observer))
+
+
+def run_program(args, program):
+    """Print or execute a parsed Program per args."""
+    from . import optimize_program
+    from .instrument import run_observed
+    program = optimize_program(program, args.opt_level, args.observer, make_limits(args))
+
+    if args.check:
+        from .resolver import check
+        problems = check(program)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
 
     if args.ast:
         print(program)
         return 0
 
-    interp = Interpreter()
-    interp.interpret(program)
+    if args.emit_python:
+        from .transpiler import transpile
+        print(transpile(program).source, end="")
+        return 0
+
+    interp = make_engine(args)
+    try:
+        run_observed(interp, program, args.observer)
+    finally:
+        write_profile(args, interp)
     return 0
 
+def make_engine(args):
+    from .engines import create_engine
+    limits = make_limits(args)
+    if args.observer is not None:
+        from .instrument import counting_limits
+        limits = counting_limits(limits)
+    if args.profile:
+        from .profiler import ProfilingInterpreter
+        return ProfilingInterpreter(make_output(args), limits)
+    return create_engine(args.engine, make_output(args), limits)
+
+def write_profile(args, interp):
+    """Write the --profile report (also after a runtime error)."""
+    if not args.profile:
+        return
+    report = interp.profile.render(args.profile_format)
+    if args.profile_file:
+        with open(args.profile_file, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        sys.stderr.write(report)
+
+# optimizer.LEVELS, without importing the optimizer at startup.
+OPT_LEVELS = (0, 1, 2)
+
+def add_opt_arguments(parser, help):
+    """-O, -O0, -O1 and -O2, setting ``opt_level``.
+
+    The level is part of the option rather than its argument, so that
+    ``-O script.dpl`` does not take the file name for a level.
+    """
+    import argparse
+    parser.add_argument("-O", dest="opt_level", action="store_const", const=1, default=0, help=help)
+    for level in OPT_LEVELS:
+        parser.add_argument(f"-O{level}", dest="opt_level", action="store_const", const=level,
+                            help=argparse.SUPPRESS)
+
+def add_limit_arguments(parser):
+    group = parser.add_argument_group("limits", "Budgets for untrusted programs; breaking one "
+                                                "raises LimitExceeded")
+    group.add_argument("--max-steps", type=int, metavar="N",
+                       help="Stop after N loop steps (one per statement in a loop body, "
+                            "per iteration)")
+    group.add_argument("--timeout", type=float, metavar="SECONDS",
+                       help="Stop once the program has run for this long")
+    group.add_argument("--max-string-length", type=int, metavar="N",
+                       help="Refuse to build strings longer than N characters")
+    group.add_argument("--max-int-bits", type=int, metavar="N",
+                       help="Refuse integers wider than N bits")
+
+# Limits() arguments, as set by add_limit_arguments().
+LIMIT_NAMES = ("max_steps", "timeout", "max_string_length", "max_int_bits")
+
+def limit_options(args):
+    return {name: getattr(args, name) for name in LIMIT_NAMES if getattr(args, name) is not None}
+
+def make_limits(args):
+    options = limit_options(args)
+    if not options:
+        return None
+    from .limits import Limits
+    return Limits(**options)
+
+def make_output(args):
+    if args.buffer_output:
+        from .output import BufferedOutput
+        return BufferedOutput(binary=True)
+    return None
+
 if __name__ == "__main__":  # pragma: no cover
     raise SystemExit(main())
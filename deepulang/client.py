@@ -0,0 +1,35 @@
+"""Client for `deepulang serve` (see deepulang.server), behind `deepulang run --server`.
+
+Kept to the standard library's json, os and socket so that a client
+process starts almost as fast as Python itself.
+"""
+import json
+import os
+import socket
+
+def default_socket_path() -> str:
+    env = os.environ.get("DEEPULANG_SOCKET")
+    if env:
+        return env
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "deepulang.sock")
+    return os.path.join(os.environ.get("TMPDIR") or "/tmp", f"deepulang-{os.getuid()}.sock")
+
+def run_remote(request: dict, socket_path=None, output=None) -> dict:
+    """Send ``request`` to the server and return its result message.
+
+    Output chunks that arrive first are passed to ``output(text)`` as they
+    come (dropped when None). Raises OSError if the server is unreachable.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or default_socket_path())
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as replies:
+            for line in replies:
+                message = json.loads(line)
+                if "ok" in message:
+                    return message
+                if output is not None:
+                    output(message["output"])
+    raise ConnectionError("server closed the connection without a result")
@@ -0,0 +1,424 @@
+"""Run one program over many rows of input at once, a column at a time.
+
+    program = deepulang.compile('let total be price * qty - discount\\n')
+    columns = program.run_columns({"price": prices, "qty": quantities, "discount": 5})
+    columns["total"]                        # NumPy array, one value per row
+
+Every row gets exactly what CompiledProgram.run() would give it with the
+row's values as inputs, but each operator is applied to all the rows that
+reach it in one NumPy operation. The rows are carried through the program
+as arrays of row numbers: an ``if`` splits them by its condition, and a
+loop keeps going with the rows whose condition still holds (or whose count
+is not used up) until there are none.
+
+Values are kept in int64, float64 and bool arrays, which NumPy computes
+natively, or in object arrays of Python values (strings, ints beyond 64
+bits, columns that mix types), which are computed element by element with
+Python's own operators. The native operations are the ones whose results
+are the same as Python's: int arithmetic that might overflow 64 bits,
+division by zero and int/float comparisons that floats cannot decide
+exactly are handed to Python for the elements concerned.
+
+A row stops at its first error, as a run() would. run_columns() then
+raises the error of the first row that failed, with its number in the
+exception's ``row`` attribute, after the output of the rows before it.
+'say' output is written at the end, in row order: all of row 0's lines,
+then row 1's, and so on. Execution limits are not supported.
+
+Needs NumPy (``pip install deepulang[columnar]``).
+"""
+import operator
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover - depends on the environment
+    raise ImportError("deepulang.columnar needs NumPy (pip install 'deepulang[columnar]')") from e
+
+from .tokens import (
+    IS_EQ, IS_GT, IS_LT, IS_NE, IS_NOT_GT, IS_NOT_LT,
+    MINUS, NOT, PLUS, SLASH, STAR,
+)
+from .ast_nodes import *
+from .interpreter import RuntimeErrorDPL
+from .output import PrintOutput
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+# Int64 operands smaller than this cannot overflow when added or subtracted.
+SAFE_INT = 2 ** 62
+# Larger ints may not convert to float exactly, which a comparison with a
+# float would need; Python compares them exactly.
+EXACT_FLOAT_INT = 2 ** 53
+
+def divide(left, right):
+    return left // right if isinstance(left, int) and isinstance(right, int) else left / right
+
+def is_truthy(value):
+    if value is None: return False
+    if isinstance(value, bool): return value
+    return bool(value)
+
+# The Interpreter's operators, for one pair of Python values.
+SCALAR = {
+    PLUS: operator.add, MINUS: operator.sub, STAR: operator.mul, SLASH: divide,
+    IS_GT: operator.gt, IS_LT: operator.lt, IS_EQ: operator.eq, IS_NE: operator.ne,
+    IS_NOT_GT: lambda left, right: not (left > right),
+    IS_NOT_LT: lambda left, right: not (left < right),
+}
+
+def dtype_for(value):
+    """The array type holding ``value`` natively, or object."""
+    if isinstance(value, bool):
+        return np.bool_
+    if isinstance(value, int):
+        return np.int64 if INT64_MIN <= value <= INT64_MAX else object
+    if isinstance(value, float):
+        return np.float64
+    return object
+
+def as_column(value, length=None):
+    """An input value as an int64, float64, bool or object array."""
+    array = np.asarray(value)
+    if array.ndim == 0:
+        value = array.item() if array.dtype != object else value
+        return np.full(length, value, dtype=dtype_for(value))
+    if array.ndim != 1:
+        raise ValueError(f"Columns must be one-dimensional, not {array.ndim}-dimensional")
+    kind = array.dtype.kind
+    if kind == "b":
+        return array.astype(np.bool_)
+    if kind in "iu":
+        if kind == "u" and array.size and array.max() > INT64_MAX:
+            return array.astype(object)
+        return array.astype(np.int64)
+    if kind == "f":
+        return array.astype(np.float64)
+    return array.astype(object)
+
+def as_objects(array):
+    return array if array.dtype == object else array.astype(object)
+
+class Column:
+    """A variable's values for every row; ``defined`` is None once all rows have one."""
+    __slots__ = ("values", "defined")
+
+    def __init__(self, values, defined=None):
+        self.values = values
+        self.defined = defined
+
+class ColumnarInterpreter(Visitor):
+    """Runs a Program over arrays of input rows (see the module docstring).
+
+    Visitors work on the rows in ``self.rows`` (sorted row numbers of the
+    rows that reached the node); expression visitors return one value per
+    row in it. Rows that fail are marked in ``failed`` and dropped after
+    the statement they failed in.
+    """
+    def __init__(self, output=None):
+        self.output = output if output is not None else PrintOutput()
+
+    def run(self, program: Program, columns) -> dict:
+        arrays = {name: value for name, value in columns.items() if np.ndim(value)}
+        lengths = {len(value) for value in arrays.values()}
+        if len(lengths) != 1:
+            raise ValueError("run_columns() needs columns of one and the same length")
+        (length,) = lengths
+        self.columns = {name: Column(as_column(value, length)) for name, value in columns.items()}
+        self.failed = np.zeros(length, dtype=np.bool_)
+        self.errors = {}
+        self.said = []
+        self.mentioned = set()
+        self.execute_block(program.statements, np.arange(length))
+
+        first = min(self.errors) if self.errors else None
+        try:
+            self.write_output(first)
+        finally:
+            self.output.flush()
+        if first is not None:
+            error = self.errors[first]
+            error.row = first
+            raise error
+        result = dict(columns)
+        for name in self.mentioned:
+            if name.startswith("$"):
+                continue  # an optimizer temporary, left out as by run()
+            column = self.columns[name]
+            if column.defined is None:
+                result[name] = column.values
+            elif column.defined.any():
+                result[name] = np.ma.masked_array(column.values, mask=~column.defined)
+        return result
+
+    def write_output(self, last=None):
+        """Say every recorded value, row by row, up to row ``last``."""
+        if not self.said:
+            return
+        rows = np.concatenate([said for said, _ in self.said])
+        seq = np.concatenate([np.full(len(said), i) for i, (said, _) in enumerate(self.said)])
+        values = [value for _, array in self.said for value in array.tolist()]
+        say = self.output.say
+        for i in np.lexsort((seq, rows)).tolist():
+            if last is not None and rows[i] > last:
+                break
+            say(values[i])
+
+    def fail(self, rows, error):
+        """Stop ``rows`` with ``error``, unless they failed earlier."""
+        for row in rows[~self.failed[rows]].tolist():
+            self.errors[row] = error
+        self.failed[rows] = True
+
+    def elementwise(self, function, *arrays):
+        """``function`` applied to the Python values of each row; errors fail the row."""
+        rows = self.rows
+
+        def call(*args):
+            try:
+                return function(*args)
+            except Exception as e:
+                return Failure(e)
+
+        with np.errstate(all="ignore"):
+            result = np.frompyfunc(call, len(arrays), 1)(*map(as_objects, arrays))
+        failures = np.frompyfunc(lambda value: type(value) is Failure, 1, 1)(result).astype(np.bool_)
+        if failures.any():
+            for i in np.flatnonzero(failures).tolist():
+                if not self.failed[rows[i]]:
+                    self.failed[rows[i]] = True
+                    self.errors[rows[i]] = result[i].error
+            result[failures] = None
+        return result
+
+    def patch(self, result, unsafe, function, *arrays):
+        """Recompute the elements of ``result`` marked ``unsafe`` in Python."""
+        index = np.flatnonzero(unsafe)
+        rows, self.rows = self.rows, self.rows[index]
+        try:
+            exact = self.elementwise(function, *(array[index] for array in arrays))
+        finally:
+            self.rows = rows
+        if result.dtype == np.bool_:
+            result[index] = exact.astype(np.bool_)
+        elif not all(value is None for value in exact):
+            result = result.astype(object)
+            result[index] = exact
+        return result
+
+    # Statements
+    def execute_block(self, stmts, rows):
+        for s in stmts:
+            if not len(rows):
+                return
+            self.rows = rows
+            s.accept(self)
+            rows = rows[~self.failed[rows]]
+
+    def visit_VarDecl(self, node: VarDecl):
+        self.store(node.name, self.evaluate(node.expr), declare=True)
+
+    def visit_Assign(self, node: Assign):
+        self.store(node.name, self.evaluate(node.expr), declare=False)
+
+    def store(self, name, values, declare):
+        rows = self.rows
+        self.mentioned.add(name)
+        column = self.columns.get(name)
+        if not declare:
+            missing = None
+            if column is None:
+                missing = np.ones(len(rows), dtype=np.bool_)
+            elif column.defined is not None:
+                missing = ~column.defined[rows]
+            if missing is not None and missing.any():
+                self.fail(rows[missing], RuntimeErrorDPL(f"Undefined variable '{name}'"))
+        keep = ~self.failed[rows]
+        rows, values = rows[keep], values[keep]
+        if not len(rows):
+            return
+        if column is None:
+            array = np.zeros(len(self.failed), dtype=values.dtype)
+            array[rows] = values
+            defined = np.zeros(len(self.failed), dtype=np.bool_)
+            defined[rows] = True
+            self.columns[name] = Column(array, None if defined.all() else defined)
+            return
+        if column.values.dtype != values.dtype:
+            if len(rows) == len(self.failed):
+                column.values = values
+                column.defined = None
+                return
+            column.values = as_objects(column.values)
+            values = as_objects(values)
+        column.values[rows] = values
+        if column.defined is not None:
+            column.defined[rows] = True
+            if column.defined.all():
+                column.defined = None
+
+    def visit_Print(self, node: Print):
+        values = self.evaluate(node.expr)
+        keep = ~self.failed[self.rows]
+        self.said.append((self.rows[keep], values[keep]))
+
+    def visit_If(self, node: If):
+        rows = self.rows
+        condition = self.truthy(self.evaluate(node.condition))
+        keep = ~self.failed[rows]
+        self.execute_block(node.then_block, rows[keep & condition])
+        if node.else_block is not None:
+            self.execute_block(node.else_block, rows[keep & ~condition])
+
+    def visit_While(self, node: While):
+        rows = self.rows
+        while len(rows):
+            self.rows = rows
+            condition = self.truthy(self.evaluate(node.condition))
+            rows = rows[condition & ~self.failed[rows]]
+            self.execute_block(node.body, rows)
+            rows = rows[~self.failed[rows]]
+
+    def visit_Repeat(self, node: Repeat):
+        rows = self.rows
+        counts = self.evaluate(node.count_expr)
+        kind = counts.dtype.kind
+        if kind == "O":
+            is_int = np.frompyfunc(lambda value: isinstance(value, int), 1, 1)(counts).astype(np.bool_)
+        else:
+            is_int = np.full(len(rows), kind in "bi", dtype=np.bool_)
+        self.fail(rows[~is_int], RuntimeErrorDPL("Repeat count must be integer"))
+        keep = ~self.failed[rows]
+        rows, counts = rows[keep], counts[keep]
+        done = 0
+        while len(rows):
+            more = counts > done
+            rows, counts = rows[more], counts[more]
+            self.execute_block(node.body, rows)
+            keep = ~self.failed[rows]
+            rows, counts = rows[keep], counts[keep]
+            done += 1
+
+    # Expressions
+    def evaluate(self, node):
+        return node.accept(self)
+
+    def truthy(self, values):
+        kind = values.dtype.kind
+        if kind == "b":
+            return values
+        if kind in "if":
+            return values != 0
+        return np.frompyfunc(is_truthy, 1, 1)(values).astype(np.bool_)
+
+    def visit_Literal(self, node: Literal):
+        return np.full(len(self.rows), node.value, dtype=dtype_for(node.value))
+
+    def visit_Var(self, node: Var):
+        rows = self.rows
+        self.mentioned.add(node.name)
+        column = self.columns.get(node.name)
+        if column is None:
+            self.fail(rows, RuntimeErrorDPL(f"Undefined variable '{node.name}'"))
+            return np.zeros(len(rows), dtype=np.int64)
+        if column.defined is not None:
+            missing = ~column.defined[rows]
+            if missing.any():
+                self.fail(rows[missing], RuntimeErrorDPL(f"Undefined variable '{node.name}'"))
+        return column.values[rows]
+
+    def visit_Unary(self, node: Unary):
+        right = self.evaluate(node.right)
+        if node.op.type is NOT:
+            return ~self.truthy(right)
+        kind = right.dtype.kind
+        if kind == "O":
+            return self.elementwise(operator.neg, right)
+        if kind == "b":
+            right = right.astype(np.int64)
+        result = -right
+        if kind != "f":
+            unsafe = right == INT64_MIN
+            if unsafe.any():
+                result = self.patch(result, unsafe, operator.neg, right)
+        return result
+
+    def visit_Binary(self, node: Binary):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.right)
+        t = node.op.type
+        if left.dtype.kind == "O" or right.dtype.kind == "O":
+            return self.elementwise(SCALAR[t], left, right)
+        if left.dtype.kind == "b":
+            left = left.astype(np.int64)
+        if right.dtype.kind == "b":
+            right = right.astype(np.int64)
+        ints = left.dtype.kind == "i" and right.dtype.kind == "i"
+        with np.errstate(all="ignore"):
+            if t is PLUS:
+                result = left + right
+            elif t is MINUS:
+                result = left - right
+            elif t is STAR:
+                result = left * right
+            elif ints:
+                result = np.floor_divide(left, right)
+            else:
+                result = np.true_divide(left, right)
+            if t is SLASH:
+                unsafe = right == 0
+                if ints:
+                    unsafe |= (left == INT64_MIN) & (right == -1)
+            elif not ints:
+                return result
+            elif t is STAR:
+                unsafe = np.abs(left.astype(np.float64)) * np.abs(right.astype(np.float64)) >= SAFE_INT
+            else:
+                unsafe = (left >= SAFE_INT) | (left <= -SAFE_INT) | (right >= SAFE_INT) | (right <= -SAFE_INT)
+        if unsafe.any():
+            result = self.patch(result, unsafe, SCALAR[t], left, right)
+        return result
+
+    def visit_Comparison(self, node: Comparison):
+        left = self.evaluate(node.left)
+        right = self.evaluate(node.right)
+        t = node.op.type
+        kinds = left.dtype.kind + right.dtype.kind
+        if "O" in kinds:
+            return self.elementwise(SCALAR[t], left, right).astype(np.bool_)
+        with np.errstate(all="ignore"):
+            if t is IS_GT:
+                result = left > right
+            elif t is IS_LT:
+                result = left < right
+            elif t is IS_EQ:
+                result = left == right
+            elif t is IS_NE:
+                result = left != right
+            elif t is IS_NOT_GT:
+                result = ~(left > right)
+            else:
+                result = ~(left < right)
+        if kinds in ("if", "fi"):
+            whole = left if kinds[0] == "i" else right
+            unsafe = (whole > EXACT_FLOAT_INT) | (whole < -EXACT_FLOAT_INT)
+            if unsafe.any():
+                result = self.patch(result, unsafe, SCALAR[t], left, right)
+        return result
+
+class Failure:
+    """An error raised by one element of an elementwise() operation."""
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+def run_columns(program: Program, columns, output=None) -> dict:
+    """Run ``program`` once per row of ``columns`` (see the module docstring).
+
+    ``columns`` maps input variable names to one-dimensional arrays of the
+    same length, or to single values shared by all rows. Returns every
+    variable the program uses as an array; variables some rows never
+    define come back as masked arrays. Inputs the program never mentions
+    are returned unchanged.
+    """
+    return ColumnarInterpreter(output).run(program, columns)
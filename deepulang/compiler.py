@@ -0,0 +1,268 @@
+from .tokens import TokenType
+from .ast_nodes import *
+
+# Opcodes. Every instruction is two words wide: the opcode followed by its
+# argument (0 when unused), so the VM can always advance pc by 2.
+LOAD_CONST = 0
+LOAD = 1
+STORE = 2
+DEFINE = 3
+ADD = 4
+SUB = 5
+MUL = 6
+DIV = 7
+NEG = 8
+NOT = 9
+PRINT = 10
+JUMP = 11
+# Fused comparison + conditional jump: pop two operands and jump to the
+# target when the comparison is false.
+JUMP_IF_NOT_GT = 12
+JUMP_IF_NOT_LT = 13
+JUMP_IF_NOT_EQ = 14
+JUMP_IF_NOT_NE = 15
+JUMP_IF_NOT_NGT = 16
+JUMP_IF_NOT_NLT = 17
+REPEAT_INIT = 18
+REPEAT_NEXT = 19
+HALT = 20
+# Arithmetic with a constant right operand, emitted instead of
+# LOAD_CONST followed by the plain operator.
+ADD_CONST = 21
+SUB_CONST = 22
+MUL_CONST = 23
+# Only emitted when compiling with Limits (see deepulang.limits): TICK adds
+# its argument to the step count at a loop back-edge, and the CHECKED_
+# operators pass their result through the value limits.
+TICK = 24
+CHECKED_ADD = 25
+CHECKED_SUB = 26
+CHECKED_MUL = 27
+# Only emitted when the Limits count statements: one before every statement.
+STATEMENT = 28
+
+OPNAMES = {
+    value: name for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int) and name != "OPNAMES"
+}
+
+BINARY_OPS = {
+    TokenType.PLUS: ADD,
+    TokenType.MINUS: SUB,
+    TokenType.STAR: MUL,
+    TokenType.SLASH: DIV,
+}
+
+CHECKED_BINARY_OPS = {
+    ADD: CHECKED_ADD,
+    SUB: CHECKED_SUB,
+    MUL: CHECKED_MUL,
+}
+
+CONST_BINARY_OPS = {
+    ADD: ADD_CONST,
+    SUB: SUB_CONST,
+    MUL: MUL_CONST,
+}
+
+UNARY_OPS = {
+    TokenType.MINUS: NEG,
+    TokenType.NOT: NOT,
+}
+
+COMPARE_JUMPS = {
+    TokenType.IS_GT: JUMP_IF_NOT_GT,
+    TokenType.IS_LT: JUMP_IF_NOT_LT,
+    TokenType.IS_EQ: JUMP_IF_NOT_EQ,
+    TokenType.IS_NE: JUMP_IF_NOT_NE,
+    TokenType.IS_NOT_GT: JUMP_IF_NOT_NGT,
+    TokenType.IS_NOT_LT: JUMP_IF_NOT_NLT,
+}
+
+class CompileError(Exception):
+    pass
+
+class Code:
+    """Flat bytecode for a whole program.
+
+    ``ops`` is a list of ints (opcode, argument pairs), ``consts`` the
+    constants pool and ``names`` maps each variable slot to its name.
+    """
+    def __init__(self, ops, consts, names):
+        self.ops = ops
+        self.consts = consts
+        self.names = names
+
+    def disassemble(self):
+        lines = []
+        for pc in range(0, len(self.ops), 2):
+            op, arg = self.ops[pc], self.ops[pc + 1]
+            name = OPNAMES[op]
+            if op in (LOAD_CONST, ADD_CONST, SUB_CONST, MUL_CONST):
+                detail = repr(self.consts[arg])
+            elif op in (LOAD, STORE, DEFINE):
+                detail = self.names[arg]
+            elif op in (PRINT, ADD, SUB, MUL, DIV, NEG, NOT, REPEAT_INIT, HALT,
+                        CHECKED_ADD, CHECKED_SUB, CHECKED_MUL, STATEMENT):
+                detail = ""
+            elif op == TICK:
+                detail = str(arg)
+            else:
+                detail = f"-> {arg}"
+            lines.append(f"{pc:6} {name:<16}{detail}".rstrip())
+        return "\n".join(lines)
+
+class Compiler(Visitor):
+    """Compile a Program tree into a Code object for the stack VM.
+
+    Given an Environment, variables use its slots (allocating new ones as
+    needed) so the VM can run directly on ``env.slots``; otherwise the
+    Code gets slots of its own. Given Limits, loop back-edges get TICK and
+    arithmetic uses the CHECKED_ operators as those limits require, and
+    every statement starts with STATEMENT if they count statements.
+    """
+    def __init__(self, env=None, limits=None):
+        self.counted = limits is not None and limits.counts_steps
+        self.checked = limits is not None and limits.checks_values
+        self.tallied = limits is not None and limits.counts_statements
+        self.ops = []
+        self.consts = []
+        self.const_index = {}
+        self.env = env
+        self.names = env.names if env is not None else []
+        self.slots = {}
+
+    def compile(self, program: Program) -> Code:
+        self.compile_block(program.statements)
+        self.emit(HALT)
+        return Code(self.ops, self.consts, self.names)
+
+    # Helpers
+    def emit(self, op, arg=0):
+        self.ops.append(op)
+        self.ops.append(arg)
+        return len(self.ops) - 2
+
+    def patch(self, at, target):
+        self.ops[at + 1] = target
+
+    def here(self):
+        return len(self.ops)
+
+    def const(self, value):
+        # Key on type as well so that True and 1 stay distinct constants.
+        key = (type(value), value)
+        idx = self.const_index.get(key)
+        if idx is None:
+            idx = len(self.consts)
+            self.consts.append(value)
+            self.const_index[key] = idx
+        return idx
+
+    def slot(self, name):
+        if self.env is not None:
+            return self.env.slot(name)
+        idx = self.slots.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self.slots[name] = idx
+        return idx
+
+    def compile_block(self, stmts):
+        for s in stmts:
+            if self.tallied:
+                self.emit(STATEMENT)
+            s.accept(self)
+
+    def back_edge(self, body):
+        if self.counted:
+            self.emit(TICK, max(1, len(body)))
+
+    def compile_condition(self, node):
+        """Emit a conditional jump taken when ``node`` is false; return its address."""
+        if isinstance(node, Comparison):
+            node.left.accept(self)
+            node.right.accept(self)
+            jump = COMPARE_JUMPS.get(node.op.type)
+            if jump is None:
+                raise CompileError(f"Unknown comparator {node.op.type}")
+            return self.emit(jump)
+        raise CompileError(f"Cannot compile condition {node!r}")
+
+    # Statements
+    def visit_VarDecl(self, node: VarDecl):
+        node.expr.accept(self)
+        self.emit(DEFINE, self.slot(node.name))
+
+    def visit_Assign(self, node: Assign):
+        node.expr.accept(self)
+        self.emit(STORE, self.slot(node.name))
+
+    def visit_Print(self, node: Print):
+        node.expr.accept(self)
+        self.emit(PRINT)
+
+    def visit_If(self, node: If):
+        skip_then = self.compile_condition(node.condition)
+        self.compile_block(node.then_block)
+        if node.else_block is not None:
+            skip_else = self.emit(JUMP)
+            self.patch(skip_then, self.here())
+            self.compile_block(node.else_block)
+            self.patch(skip_else, self.here())
+        else:
+            self.patch(skip_then, self.here())
+
+    def visit_While(self, node: While):
+        top = self.here()
+        exit_jump = self.compile_condition(node.condition)
+        self.compile_block(node.body)
+        self.back_edge(node.body)
+        self.emit(JUMP, top)
+        self.patch(exit_jump, self.here())
+
+    def visit_Repeat(self, node: Repeat):
+        # The remaining iteration count lives on the stack for the loop's duration.
+        node.count_expr.accept(self)
+        self.emit(REPEAT_INIT)
+        top = self.emit(REPEAT_NEXT)
+        self.compile_block(node.body)
+        self.back_edge(node.body)
+        self.emit(JUMP, top)
+        self.patch(top, self.here())
+
+    # Expressions
+    def visit_Binary(self, node: Binary):
+        op = BINARY_OPS.get(node.op.type)
+        if op is None:
+            raise CompileError(f"Unknown binary operator {node.op.type}")
+        node.left.accept(self)
+        if self.checked and op in CHECKED_BINARY_OPS:
+            node.right.accept(self)
+            self.emit(CHECKED_BINARY_OPS[op])
+            return
+        if isinstance(node.right, Literal) and op in CONST_BINARY_OPS:
+            self.emit(CONST_BINARY_OPS[op], self.const(node.right.value))
+            return
+        node.right.accept(self)
+        self.emit(op)
+
+    def visit_Unary(self, node: Unary):
+        op = UNARY_OPS.get(node.op.type)
+        if op is None:
+            raise CompileError(f"Unknown unary operator {node.op.type}")
+        node.right.accept(self)
+        self.emit(op)
+
+    def visit_Comparison(self, node: Comparison):
+        raise CompileError("Comparisons are only valid as conditions")
+
+    def visit_Literal(self, node: Literal):
+        self.emit(LOAD_CONST, self.const(node.value))
+
+    def visit_Var(self, node: Var):
+        self.emit(LOAD, self.slot(node.name))
+
+def compile_program(program: Program) -> Code:
+    return Compiler().compile(program)
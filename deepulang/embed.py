@@ -0,0 +1,85 @@
+"""Parse once, run many times: the embedding API.
+
+    program = deepulang.compile('let total be price * qty\\nsay total\\n')
+    program.run({"price": 3, "qty": 4})        # prints 12, returns the variables
+    program.run({"price": 5, "qty": 1}, output=CaptureOutput())
+
+compile() lexes, parses, optionally optimizes and turns the program into
+closures (the closure engine) a single time. Every run() gets a fresh slot
+list of its own, so one CompiledProgram can be run from many threads at
+once; 'say' goes to the ``output`` given to that run().
+"""
+from contextvars import ContextVar
+
+from . import parse_source
+from .ast_nodes import Program
+from .closures import ClosureInterpreter
+from .interpreter import UNDEFINED, Environment
+from .optimizer import optimize
+from .output import PrintOutput
+from .rope import plain
+
+# Output of the run() executing in the current thread or task.
+current_output = ContextVar("current_output")
+
+class ContextOutput:
+    """Sink compiled into the closures; forwards to current_output."""
+    def say(self, value):
+        current_output.get().say(value)
+
+    def flush(self):
+        pass
+
+class CompiledProgram:
+    def __init__(self, program: Program, opt_level: int = 0):
+        if opt_level:
+            program = optimize(program, opt_level)
+        self.program = program
+        compiler = ClosureInterpreter(ContextOutput())
+        self.entry = compiler.compile(program)
+        env = compiler.env
+        self.names = tuple(env.names)
+        self.index = dict(env.index)
+
+    def run(self, inputs=None, output=None) -> dict:
+        """Run with variables pre-set from ``inputs``; return the final variables.
+
+        Inputs the program never mentions are returned unchanged; the
+        optimizer's '$' temporaries are left out. ``output``
+        receives 'say' lines (printed when None) and is flushed afterwards.
+        """
+        slots = [UNDEFINED] * len(self.names)
+        result = {}
+        if inputs:
+            index = self.index
+            for name, value in inputs.items():
+                i = index.get(name)
+                if i is None:
+                    result[name] = value
+                else:
+                    slots[i] = value
+        if output is None:
+            output = PrintOutput()
+        token = current_output.set(output)
+        try:
+            self.entry(slots)
+        finally:
+            current_output.reset(token)
+            output.flush()
+        for name, value in zip(self.names, slots):
+            if value is not UNDEFINED and not name.startswith("$"):
+                result[name] = plain(value)
+        return result
+
+    def run_columns(self, columns, output=None) -> dict:
+        """Run once per row of ``columns``, all rows at a time (see deepulang.columnar).
+
+        ``columns`` maps input names to NumPy arrays (or other sequences) of
+        one value per row; returns the variables as arrays. Needs NumPy.
+        """
+        from .columnar import run_columns
+        return run_columns(self.program, columns, output)
+
+def compile(source: str, opt_level: int = 0) -> CompiledProgram:
+    """Lex and parse ``source`` once and return a reusable CompiledProgram."""
+    return CompiledProgram(parse_source(source), opt_level)
@@ -0,0 +1,38 @@
+"""Execution engines selectable from run_file() and the CLI.
+
+Every engine exposes the same ``interpret(program)`` contract as
+Interpreter and keeps the final variables in ``engine.env``; calling
+interpret() again continues with those variables. ``output`` is the sink
+for 'say' (see deepulang.output); by default lines are printed directly.
+``limits`` sets execution budgets (see deepulang.limits).
+"""
+
+ENGINES = ("tree", "vm", "closure", "py", "async")
+
+def create_engine(name: str = "tree", output=None, limits=None):
+    if name == "tree":
+        from .interpreter import Interpreter
+        return Interpreter(output, limits)
+    if name == "vm":
+        from .vm import VM
+        return VM(output, limits)
+    if name == "closure":
+        from .closures import ClosureInterpreter
+        return ClosureInterpreter(output, limits)
+    if name == "py":
+        from .transpiler import PyInterpreter
+        return PyInterpreter(output, limits)
+    if name == "async":
+        from .aio import AsyncInterpreter
+        return AsyncInterpreter(output, limits)
+    raise ValueError(f"Unknown engine '{name}' (choose from {', '.join(ENGINES)})")
+
+def interpret_stream(engine, statements):
+    """Execute each top-level statement as soon as it arrives.
+
+    ``statements`` is typically Parser.iter_statements(), so nothing after
+    the current statement needs to have been read yet.
+    """
+    from .ast_nodes import Program
+    for stmt in statements:
+        engine.interpret(Program([stmt]))
@@ -0,0 +1,299 @@
+"""Incremental lexing and parsing of a document that is edited in place.
+
+A Document keeps the source as a list of lines and the parsed program as
+segments: runs of whole lines that hold one or more complete top-level
+statements (plus the blank and comment lines after them). An edit only
+invalidates the segments it touches; the next access to ``program``
+re-lexes and re-parses just those lines and reuses every other statement
+object as it was:
+
+    doc = Document(source)
+    doc.edit((12, 5), (12, 9), "total")     # replace line 12, columns 5-8
+    doc.program                             # Program, or raises the error
+
+A segment boundary sits wherever a top-level statement starts a line
+after a NEWLINE, so the statements before a boundary never depend on the
+text after it. An edited region that ends inside an unfinished block (a
+parse error at the region's end) or string absorbs the following
+segments until it parses, so the result is always exactly what parsing
+the whole text gives, errors included. A region that still fails keeps
+its error until an edit touches it, so a typo does not force a full
+re-parse on every later keystroke elsewhere.
+
+Edits that add or remove lines also move the line numbers of every node
+after them; that walk is linear in the nodes that follow but far cheaper
+than lexing and parsing them again. So is gathering the statements into a
+new Program, which copies only references.
+
+The nodes are moved in place, and a Program returned earlier shares them,
+so an edit invalidates every Program the document gave out before it:
+its statements may report the new line numbers, or be replaced. Copying
+the moved nodes instead would make an edit that adds a line several
+times slower; a caller that keeps an old Program copies it itself
+(``copy.deepcopy(document.program)``).
+"""
+import os
+import time
+from bisect import bisect_right
+from itertools import chain
+from operator import attrgetter
+
+from .ast_nodes import Node, Program
+from .lexer import Lexer, LexError
+from .parser import Parser, ParseError
+from .tokens import EOF, NEWLINE
+
+# How often watch() checks the file for changes, in seconds.
+WATCH_INTERVAL = 0.2
+
+def split_lines(text: str) -> list:
+    """``text`` as lines that keep their '\\n' (the only newline the lexer knows)."""
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+class Segment:
+    """Lines from ``first`` up to the next segment's first line.
+
+    ``statements`` is None while the lines are waiting to be parsed again,
+    and when that failed with ``error``.
+    """
+    __slots__ = ("first", "statements", "error")
+
+    def __init__(self, first, statements=None, error=None):
+        self.first = first
+        self.statements = statements
+        self.error = error
+
+def parse_lines(lines, first_line):
+    """Lex and parse ``lines`` (numbered from ``first_line``) into Segments."""
+    tokens = Lexer("".join(lines), first_line=first_line).tokenize()
+    parser = Parser(tokens)
+    segment = Segment(first_line, [])
+    segments = [segment]
+    after_newline = False
+    try:
+        while parser.current.type is not EOF:
+            if parser.current.type is NEWLINE:
+                parser.advance()
+                after_newline = True
+                continue
+            stmt = parser.statement()
+            if after_newline and segment.statements:
+                segment = Segment(stmt.line, [])
+                segments.append(segment)
+            segment.statements.append(stmt)
+            after_newline = False
+    except ParseError as e:
+        # Raised at the end of the lines: the statement may go on below.
+        e.at_end = parser.current is tokens[-1]
+        raise
+    return segments
+
+def needs_more(error) -> bool:
+    """Whether parsing more of the following lines might resolve ``error``."""
+    if isinstance(error, LexError):
+        return str(error).startswith("Unterminated string")
+    return getattr(error, "at_end", False)
+
+# Per node class: the fields that hold nodes or lists of nodes, and
+# whether it has an ``op`` token. The other fields hold plain values.
+VALUE_FIELDS = {"name", "value", "slot", "op"}
+CHILDREN = {cls: (tuple(f for f in cls.__slots__ if f not in VALUE_FIELDS), "op" in cls.__slots__)
+            for cls in Node.__subclasses__()}
+
+def shift_lines(statements, delta):
+    """Move every node and token position under ``statements`` by ``delta`` lines."""
+    stack = list(statements)
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        node = pop()
+        node.line += delta
+        fields, has_op = CHILDREN[type(node)]
+        if has_op:
+            node.op.line += delta
+        for name in fields:
+            child = getattr(node, name)
+            if type(child) is list:
+                extend(child)
+            elif child is not None:
+                push(child)
+
+class Document:
+    def __init__(self, text: str = ""):
+        self.lines = split_lines(text)
+        self.segments = [Segment(1)]
+        self.starts = [1]
+        # Segments waiting to be parsed and segments that failed; either may
+        # also hold segments an edit has since dropped from self.segments.
+        self.pending = [self.segments[0]]
+        self.failed = []
+        # Lines lexed and parsed by the last reparse(), for diagnostics.
+        self.reparsed_lines = 0
+        self.cached = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    @property
+    def program(self) -> Program:
+        """The parsed document; raises the first LexError or ParseError in it.
+
+        Valid until the next edit, which may change its nodes' line numbers.
+        """
+        if self.cached is None:
+            self.reparse()
+            self.failed = sorted((s for s in self.failed if self.holds(s) and s.error is not None),
+                                 key=attrgetter("first"))
+            if self.failed:
+                errors = [segment.error for segment in self.failed]
+                # Like parse_source(), which lexes everything before parsing.
+                raise next((e for e in errors if isinstance(e, LexError)), errors[0])
+            statements = chain.from_iterable(map(attrgetter("statements"), self.segments))
+            self.cached = Program(list(statements))
+        return self.cached
+
+    def holds(self, segment) -> bool:
+        """Whether ``segment`` is still one of this document's segments."""
+        i = bisect_right(self.starts, segment.first) - 1
+        return i >= 0 and self.segments[i] is segment
+
+    def edit(self, start, end, text: str):
+        """Replace the text from ``start`` up to ``end`` with ``text``.
+
+        Positions are (line, column) pairs, 1-based like token positions;
+        ``end`` is exclusive, a column past the end of its line means the
+        end of that line (before its '\n'), and a position one past the
+        last line means the end of the document.
+        """
+        lines = self.lines
+        if lines and not lines[-1].endswith("\n"):
+            # The end of the document is on the last line, not after it.
+            past = (len(lines), len(lines[-1]) + 1)
+            start = min(start, past)
+            end = min(end, past)
+        (first, col), (last, end_col) = start, end
+        if first <= len(lines):
+            col = min(col, len(lines[first - 1].rstrip("\n")) + 1)
+        if last <= len(lines):
+            end_col = min(end_col, len(lines[last - 1].rstrip("\n")) + 1)
+        head = self.lines[first - 1][:col - 1] if first <= len(self.lines) else ""
+        tail = self.lines[last - 1][end_col - 1:] if last <= len(self.lines) else ""
+        self.replace_lines(first, min(last, len(self.lines)), split_lines(head + text + tail))
+
+    def update(self, text: str):
+        """Replace the whole text, re-parsing only the lines that changed."""
+        old, new = self.lines, split_lines(text)
+        limit = min(len(old), len(new))
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+        if prefix == len(old) == len(new):
+            return
+        self.replace_lines(prefix + 1, len(old) - suffix, new[prefix:len(new) - suffix])
+
+    def replace_lines(self, first: int, last: int, lines: list):
+        """Replace lines ``first`` to ``last`` (inclusive; ``last`` may be
+        ``first - 1`` to insert before ``first``) with ``lines``.
+
+        Every new line but one at the end of the document must end in '\n'.
+        """
+        segments, starts = self.segments, self.starts
+        count = max(1, len(self.lines))
+        self.lines[first - 1:last] = lines
+        delta = len(lines) - (last - first + 1)
+        # Merge the segments holding the replaced lines (or the insertion
+        # point) into one that is waiting to be parsed.
+        a = bisect_right(starts, min(first, count)) - 1
+        b = bisect_right(starts, min(max(first, last), count)) - 1
+        merged = Segment(segments[a].first)
+        if merged.first == first and not lines and b + 1 < len(segments):
+            # No lines are left for it: the next segment moves up to its place.
+            segments[a:b + 1] = []
+            starts[a:b + 1] = []
+            after = a
+        else:
+            segments[a:b + 1] = [merged]
+            starts[a:b + 1] = [merged.first]
+            self.pending.append(merged)
+            after = a + 1
+        if delta:
+            moved = []
+            for i in range(after, len(segments)):
+                segment = segments[i]
+                segment.first += delta
+                starts[i] += delta
+                if segment.statements:
+                    moved.append(segment.statements)
+                elif segment.error is not None:
+                    segment.error = None  # parse again for correct line numbers
+                    self.pending.append(segment)
+            shift_lines(chain.from_iterable(moved), delta)
+        self.cached = None
+
+    def reparse(self):
+        """Parse every segment that is waiting for it."""
+        segments, starts = self.segments, self.starts
+        self.reparsed_lines = 0
+        pending, self.pending = self.pending, []
+        for segment in sorted(pending, key=attrgetter("first")):
+            # Dropped by an edit, or absorbed by a segment parsed before it.
+            if not self.holds(segment) or segment.statements is not None or segment.error is not None:
+                continue
+            i = bisect_right(starts, segment.first) - 1
+            j = i + 1
+            while True:
+                first = segment.first
+                end = segments[j].first if j < len(segments) else len(self.lines) + 1
+                try:
+                    parsed = parse_lines(self.lines[first - 1:end - 1], first)
+                except (LexError, ParseError) as e:
+                    if needs_more(e) and j < len(segments):
+                        j += 1
+                        continue
+                    parsed = [Segment(first, None, e)]
+                    self.failed.append(parsed[0])
+                break
+            self.reparsed_lines += end - first
+            segments[i:j] = parsed
+            starts[i:j] = [s.first for s in parsed]
+
+def watch(path, on_change, interval: float = WATCH_INTERVAL, rounds=None):
+    """Call ``on_change(document, seconds)`` whenever the file at ``path`` changes.
+
+    ``seconds`` is the time taken to bring the document up to date. Polls
+    the modification time and size every ``interval`` seconds, ``rounds``
+    times (forever when None).
+    """
+    document = Document()
+    seen = None
+    while rounds is None or rounds > 0:
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp is not None and stamp != seen:
+            seen = stamp
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            start = time.perf_counter()
+            document.update(text)
+            try:
+                document.program
+            except (LexError, ParseError):
+                pass
+            on_change(document, time.perf_counter() - start)
+        if rounds is not None:
+            rounds -= 1
+            if not rounds:
+                break
+        time.sleep(interval)
@@ -0,0 +1,151 @@
+"""Observing the lex / parse / optimize / run pipeline.
+
+run_file() and the CLI accept an ``observer`` and report every phase to
+it:
+
+    class Slow(Observer):
+        def phase_finished(self, phase, seconds, counts):
+            if seconds > 0.5:
+                log.warning("%s took %.2fs %s", phase, seconds, counts)
+
+    deepulang.run_file("job.dpl", observer=Slow())
+
+Phases, in order, with their counts:
+
+- ``read``: ``chars`` of source.
+- ``cache``: ``hit`` (whether the parsed-program cache had it); on a miss
+  the ``lex`` and ``parse`` phases run inside it.
+- ``lex``: ``tokens``.
+- ``parse``: ``nodes`` in the AST.
+- ``optimize`` (with an optimization level): ``nodes`` afterwards.
+- ``run``: ``statements`` executed (each time it runs, in a loop or a
+  branch, including one that fails), ``steps`` (what --max-steps counts:
+  per loop iteration, one per statement directly in the loop body, so an
+  if there counts once whichever branch runs, and nothing outside loops)
+  and ``variables`` (how many were defined; variables are never removed,
+  so this is also the peak).
+
+phase_finished() is called even when the phase fails. Stats is the
+observer behind ``--stats``; it also records the growth of the process's
+peak resident memory over each phase. Without an observer nothing is
+measured or counted; with one, the run counts steps like --max-steps
+does and adds up the statements it executes, which costs an add per
+statement.
+"""
+import copy
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+class Observer:
+    """Receives pipeline events; every hook is a no-op by default."""
+    def phase_started(self, phase: str):
+        pass
+
+    def phase_finished(self, phase: str, seconds: float, counts: dict):
+        pass
+
+@contextmanager
+def observe(observer, phase):
+    """Time the enclosed phase; the block fills in the yielded counts dict."""
+    counts = {}
+    if observer is None:
+        yield counts
+        return
+    observer.phase_started(phase)
+    start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        observer.phase_finished(phase, time.perf_counter() - start, counts)
+
+def counting_limits(limits):
+    """A copy of ``limits`` (new Limits for None) that counts steps and
+    statements; the caller's Limits object is never changed."""
+    from .limits import Limits
+    limits = copy.copy(limits) if limits is not None else Limits()
+    if not limits.counts_steps:
+        limits.max_steps = sys.maxsize
+    limits.counts_statements = True
+    return limits
+
+def run_observed(interp, program, observer):
+    """interp.interpret(program) as the ``run`` phase.
+
+    With an observer, the engine's limits must come from counting_limits().
+    """
+    with observe(observer, "run") as counts:
+        try:
+            interp.interpret(program)
+        finally:
+            if observer is not None:
+                record_run(counts, interp)
+
+def record_run(counts, interp):
+    """Fill in the ``run`` counts of an engine given counting_limits()."""
+    counts["statements"] = interp.limits.statements
+    counts["steps"] = interp.limits.steps
+    counts["variables"] = len(interp.env.values)
+
+def peak_rss_kb():
+    """Peak resident memory of this process in KB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+class PhaseStats:
+    __slots__ = ("phase", "depth", "seconds", "counts", "rss_before", "rss_kb")
+
+    def __init__(self, phase, depth, rss_before):
+        self.phase = phase
+        self.depth = depth
+        self.seconds = None
+        self.counts = {}
+        self.rss_before = rss_before
+        self.rss_kb = None
+
+class Stats(Observer):
+    """Collects every phase for a report (``deepulang --stats``)."""
+    def __init__(self):
+        self.phases = []
+        self.open = []
+        self.initial_rss = peak_rss_kb()
+
+    def phase_started(self, phase):
+        entry = PhaseStats(phase, len(self.open), peak_rss_kb())
+        self.phases.append(entry)
+        self.open.append(entry)
+
+    def phase_finished(self, phase, seconds, counts):
+        entry = self.open.pop()
+        entry.seconds = seconds
+        entry.counts = dict(counts)
+        after = peak_rss_kb()
+        if entry.rss_before is not None and after is not None:
+            entry.rss_kb = after - entry.rss_before
+
+    def as_dict(self):
+        """{phase: {"seconds", "peak_rss_growth_kb", **counts}} of finished phases."""
+        return {p.phase: {"seconds": p.seconds, "peak_rss_growth_kb": p.rss_kb, **p.counts}
+                for p in self.phases if p.seconds is not None}
+
+    def report(self) -> str:
+        rows = [f"{'phase':<12} {'seconds':>10} {'peak RSS':>10}  counts"]
+        for p in self.phases:
+            if p.seconds is None:
+                continue
+            counts = " ".join(f"{k}={v}" for k, v in p.counts.items())
+            rss = f"+{p.rss_kb} KB" if p.rss_kb is not None else "-"
+            name = "  " * p.depth + p.phase
+            rows.append(f"{name:<12} {p.seconds:>10.6f} {rss:>10}  {counts}")
+        total = sum(p.seconds for p in self.phases if p.depth == 0 and p.seconds is not None)
+        end = peak_rss_kb()
+        rss = f"+{end - self.initial_rss} KB" if end is not None else "-"
+        rows.append(f"{'total':<12} {total:>10.6f} {rss:>10}")
+        return "\n".join(rows) + "\n"
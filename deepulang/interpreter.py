@@ -1,31 +1,85 @@
-from .tokens import TokenType
+from .tokens import (
+    IS_EQ, IS_GT, IS_LT, IS_NE, IS_NOT_GT, IS_NOT_LT,
+    MINUS, NOT, PLUS, SLASH, STAR,
+)
 from .ast_nodes import *
+from .resolver import resolve
+from .output import PrintOutput
+from .rope import concat, plain
 
 class RuntimeErrorDPL(Exception):
-    pass
+    # Source line where the error happened, when the engine knows it.
+    line = None
+
+# Marker for slots whose variable has not been declared with 'let' yet.
+UNDEFINED = object()
 
 class Environment:
+    """Variables stored in a flat list of slots.
+
+    Every name gets a fixed slot index the first time it is seen (the
+    resolver does this before a program runs, see deepulang.resolver), so
+    engines read and write ``slots[i]`` directly. A slot holds UNDEFINED
+    until its variable is declared. ``values`` is a name -> value snapshot.
+    """
     def __init__(self):
-        self.values = {}
+        self.slots = []
+        self.names = []
+        self.index = {}
+
+    @property
+    def values(self):
+        return {name: plain(value) for name, value in zip(self.names, self.slots) if value is not UNDEFINED}
+
+    @property
+    def variables(self):
+        """``values`` without the optimizer's '$' temporaries (deepulang.optimizer)."""
+        return {name: plain(value) for name, value in zip(self.names, self.slots)
+                if value is not UNDEFINED and not name.startswith("$")}
+
+    def slot(self, name):
+        idx = self.index.get(name)
+        if idx is None:
+            idx = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.slots.append(UNDEFINED)
+        return idx
+
     def define(self, name, value):
-        self.values[name] = value
+        self.slots[self.slot(name)] = value
     def assign(self, name, value):
-        if name in self.values:
-            self.values[name] = value
-        else:
+        idx = self.index.get(name)
+        if idx is None or self.slots[idx] is UNDEFINED:
             raise RuntimeErrorDPL(f"Undefined variable '{name}'")
+        self.slots[idx] = value
     def get(self, name):
-        if name in self.values:
-            return self.values[name]
+        idx = self.index.get(name)
+        if idx is not None:
+            value = self.slots[idx]
+            if value is not UNDEFINED:
+                return value
         raise RuntimeErrorDPL(f"Undefined variable '{name}'")
 
 class Interpreter(Visitor):
-    def __init__(self):
+    def __init__(self, output=None, limits=None):
         self.env = Environment()
+        self.slots = self.env.slots
+        # Where 'say' goes (see deepulang.output); flushed after every run.
+        self.output = output if output is not None else PrintOutput()
+        # Execution budgets (see deepulang.limits). The loop and operator
+        # checks are only taken when the corresponding limit is set.
+        self.limits = limits
+        self.counted = limits if limits is not None and limits.counts_steps else None
+        self.checked = limits if limits is not None and limits.checks_values else None
+        self.tallied = limits if limits is not None and limits.counts_statements else None
 
     def interpret(self, program: Program):
-        for stmt in program.statements:
-            self.execute(stmt)
+        program = resolve(program, self.env)
+        self.slots = self.env.slots
+        try:
+            self.execute_block(program.statements)
+        finally:
+            self.output.flush()
 
     # Visitor methods
     def execute(self, node):
@@ -42,9 +96,18 @@ class Interpreter(Visitor):
         value = self.evaluate(node.expr)
         self.env.assign(node.name, value)
 
+    def visit_SlotDecl(self, node: SlotDecl):
+        self.slots[node.slot] = self.evaluate(node.expr)
+
+    def visit_SlotAssign(self, node: SlotAssign):
+        value = self.evaluate(node.expr)
+        if self.slots[node.slot] is UNDEFINED:
+            raise RuntimeErrorDPL(f"Undefined variable '{node.name}'")
+        self.slots[node.slot] = value
+
     def visit_Print(self, node: Print):
         value = self.evaluate(node.expr)
-        print(value)
+        self.output.say(plain(value))
 
     def visit_If(self, node: If):
         if self.is_truthy(self.evaluate(node.condition)):
@@ -53,6 +116,8 @@ class Interpreter(Visitor):
             self.execute_block(node.else_block)
 
     def visit_While(self, node: While):
+        if self.counted is not None:
+            return self.counted_while(node)
         while self.is_truthy(self.evaluate(node.condition)):
             self.execute_block(node.body)
 
@@ -60,24 +125,50 @@ class Interpreter(Visitor):
         count = self.evaluate(node.count_expr)
         if not isinstance(count, int):
             raise RuntimeErrorDPL("Repeat count must be integer")
+        if self.counted is not None:
+            return self.counted_repeat(node, count)
+        for _ in range(count):
+            self.execute_block(node.body)
+
+    def counted_while(self, node: While):
+        limits = self.counted
+        cost = max(1, len(node.body))
+        steps, allowance = 0, limits.allowance()
+        while self.is_truthy(self.evaluate(node.condition)):
+            self.execute_block(node.body)
+            steps += cost
+            if steps >= allowance:
+                allowance = limits.tick(steps)
+                steps = 0
+        limits.tick(steps)
+
+    def counted_repeat(self, node: Repeat, count):
+        limits = self.counted
+        cost = max(1, len(node.body))
+        steps, allowance = 0, limits.allowance()
         for _ in range(count):
             self.execute_block(node.body)
+            steps += cost
+            if steps >= allowance:
+                allowance = limits.tick(steps)
+                steps = 0
+        limits.tick(steps)
 
     def visit_Comparison(self, node: Comparison):
         left = self.evaluate(node.left)
         right = self.evaluate(node.right)
         t = node.op.type
-        if t == TokenType.IS_GT:
+        if t is IS_GT:
             return left > right
-        if t == TokenType.IS_LT:
+        if t is IS_LT:
             return left < right
-        if t == TokenType.IS_EQ:
+        if t is IS_EQ:
             return left == right
-        if t == TokenType.IS_NE:
+        if t is IS_NE:
             return left != right
-        if t == TokenType.IS_NOT_GT:
+        if t is IS_NOT_GT:
             return not (left > right)
-        if t == TokenType.IS_NOT_LT:
+        if t is IS_NOT_LT:
             return not (left < right)
         raise RuntimeErrorDPL(f"Unknown comparator {t}")
 
@@ -85,22 +176,35 @@ class Interpreter(Visitor):
         left = self.evaluate(node.left)
         right = self.evaluate(node.right)
         t = node.op.type
-        if t == TokenType.PLUS:
+        if self.checked is not None and t is not SLASH:
+            return self.checked_binary(t, left, right)
+        if t is PLUS:
+            if left.__class__ is str:
+                return concat(left, right)
             return left + right
-        if t == TokenType.MINUS:
+        if t is MINUS:
             return left - right
-        if t == TokenType.STAR:
+        if t is STAR:
             return left * right
-        if t == TokenType.SLASH:
+        if t is SLASH:
             return left // right if isinstance(left, int) and isinstance(right, int) else left / right
         raise RuntimeErrorDPL(f"Unknown binary operator {t}")
 
+    def checked_binary(self, t, left, right):
+        if t is PLUS:
+            return self.checked.add(left, right)
+        if t is MINUS:
+            return self.checked.sub(left, right)
+        if t is STAR:
+            return self.checked.mul(left, right)
+        raise RuntimeErrorDPL(f"Unknown binary operator {t}")
+
     def visit_Unary(self, node: Unary):
         right = self.evaluate(node.right)
         t = node.op.type
-        if t == TokenType.MINUS:
+        if t is MINUS:
             return -right
-        if t == TokenType.NOT:
+        if t is NOT:
             return not self.is_truthy(right)
         raise RuntimeErrorDPL(f"Unknown unary operator {t}")
 
@@ -110,6 +214,12 @@ class Interpreter(Visitor):
     def visit_Var(self, node: Var):
         return self.env.get(node.name)
 
+    def visit_SlotVar(self, node: SlotVar):
+        value = self.slots[node.slot]
+        if value is UNDEFINED:
+            raise RuntimeErrorDPL(f"Undefined variable '{node.name}'")
+        return value
+
     # Helpers
     def evaluate(self, node):
         return node.accept(self)
@@ -120,5 +230,13 @@ class Interpreter(Visitor):
         return bool(value)
 
     def execute_block(self, stmts):
+        if self.tallied is not None:
+            return self.tallied_block(stmts)
+        for s in stmts:
+            self.execute(s)
+
+    def tallied_block(self, stmts):
+        limits = self.tallied
         for s in stmts:
+            limits.statements += 1
             self.execute(s)
@@ -4,143 +4,178 @@ from .tokens import Token, TokenType, KEYWORDS, MULTIWORD_COMPARATORS
 class LexError(Exception):
     pass
 
+def phrase_pattern(phrase):
+    # Case-insensitive on exactly the ASCII letters of the phrase.
+    return "".join(f"[{c}{c.upper()}]" if c.isalpha() else re.escape(c) for c in phrase)
+
+COMPARATOR_TYPES = {phrase: ttype for phrase, ttype in MULTIWORD_COMPARATORS}
+
+SINGLE_CHAR_TOKENS = {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.STAR,
+    '/': TokenType.SLASH,
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+}
+
+ESCAPES = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+ESCAPE_RE = re.compile(r'\\([\s\S])')
+
+# One alternation for the whole token grammar, with leading blanks skipped
+# in the same match. A NUL character ends the input (as it always has), so
+# comments and strings stop in front of it.
+TOKEN_RE = re.compile(
+    r"[ \t\r]*(?:"
+    r"(?P<newline>\n)"
+    r"|(?P<comment>#[^\n\0]*)"
+    r"|(?P<comparator>" + "|".join(phrase_pattern(p) for p in COMPARATOR_TYPES) + ")"
+    r"|(?P<ident>[^\W\d]\w*)"
+    r"|(?P<number>\d+)"
+    r'|"(?P<string>[^"\\\0]*(?:\\[\s\S][^"\\\0]*)*)"'
+    r"|(?P<op>[-+*/()])"
+    r")"
+)
+BLANKS_RE = re.compile(r"[ \t\r]*")
+IDENT_RE = re.compile(r"[^\W\d]\w*")
+
+# Longest lookahead a comparator needs: the phrase plus one boundary char.
+COMPARATOR_LOOKAHEAD = max(len(p) for p in COMPARATOR_TYPES) + 1
+
 class Lexer:
-    def __init__(self, source: str):
+    """Regex-driven scanner: one TOKEN_RE.match per token, linear in input size.
+
+    ``source`` is either a string or a text stream (any object with
+    ``readline`` or ``read``). Streams are consumed ``chunk_size``
+    characters (or one line) at a time by iter_tokens(), so only the
+    current token and a few characters of lookahead are held in memory.
+    ``first_line`` numbers the first line of ``source``, for lexing a
+    piece of a larger file (see deepulang.incremental).
+
+    Token positions follow the original character-stepping lexer exactly:
+    NEWLINE tokens carry the position after the newline, comparator tokens
+    the position after the phrase, and strings the position after the
+    opening quote.
+    """
+    def __init__(self, source, chunk_size: int = 65536, first_line: int = 1):
         self.source = source
+        self.chunk_size = chunk_size
+        self.first_line = first_line
         self.pos = 0
-        self.line = 1
+        self.line = first_line
         self.col = 1
-        self.length = len(source)
-
-    def peek(self, n=0):
-        idx = self.pos + n
-        return self.source[idx] if idx < self.length else '\0'
-
-    def advance(self):
-        ch = self.peek()
-        self.pos += 1
-        if ch == '\n':
-            self.line += 1
-            self.col = 1
+        if isinstance(source, str):
+            self.length = len(source)
+            self.read = None
         else:
-            self.col += 1
-        return ch
-
-    def match(self, expected):
-        if self.peek() == expected:
-            self.advance()
-            return True
-        return False
-
-    def skip_ws_and_comments(self):
-        while True:
-            ch = self.peek()
-            if ch in ' \t\r':
-                self.advance()
-                continue
-            if ch == '#':
-                while self.peek() not in ('\n', '\0'):
-                    self.advance()
-                continue
-            break
-
-    def try_multiword_comparator(self):
-        # Look ahead up to longest phrase length
-        remaining = self.source[self.pos:].lower()
-        for phrase, ttype in MULTIWORD_COMPARATORS:
-            if remaining.startswith(phrase):
-                # Ensure word boundary
-                end_idx = len(phrase)
-                if end_idx == len(remaining) or not remaining[end_idx].isalpha():
-                    # consume phrase
-                    for _ in range(len(phrase)):
-                        self.advance()
-                    return Token(ttype, phrase, None, self.line, self.col)
-        return None
-
-    def string(self):
-        start_line, start_col = self.line, self.col
-        value = ""
-        while True:
-            ch = self.advance()
-            if ch == '\0':
-                raise LexError(f"Unterminated string at {start_line}:{start_col}")
-            if ch == '"':
-                break
-            if ch == '\\':
-                nxt = self.advance()
-                escapes = {'n':'\n','t':'\t','"':'"','\\':'\\'}
-                value += escapes.get(nxt, nxt)
-            else:
-                value += ch
-        return Token(TokenType.STRING, value, value, start_line, start_col)
-
-    def number(self):
-        start_line, start_col = self.line, self.col
-        num = ""
-        while self.peek().isdigit():
-            num += self.advance()
-        # (Optional: handle decimals)
-        return Token(TokenType.NUMBER, num, int(num), start_line, start_col)
-
-    def identifier(self):
-        start_line, start_col = self.line, self.col
-        ident = ""
-        while self.peek().isalnum() or self.peek() == '_':
-            ident += self.advance()
-        lower = ident.lower()
-        ttype = KEYWORDS.get(lower)
-        if ttype:
-            return Token(ttype, ident, lower, start_line, start_col)
-        return Token(TokenType.IDENT, ident, ident, start_line, start_col)
+            self.length = None
+            self.read = getattr(source, "readline", None) or source.read
 
     def tokenize(self):
-        tokens = []
+        return list(self.iter_tokens())
+
+    def iter_tokens(self):
+        """Yield tokens one at a time, reading more input only when needed."""
+        read = self.read
+        chunk_size = self.chunk_size
+        if read is None:
+            buf = self.source
+            final = True
+        else:
+            buf = ""
+            final = False
+        length = len(buf)
+        match = TOKEN_RE.match
+        keywords = KEYWORDS
+        ident_type = TokenType.IDENT
+        newline_type = TokenType.NEWLINE
+        offset = 0  # absolute position of buf[0]
+        pos = 0
+        line = self.first_line
+        line_start = 0  # relative to buf; negative once the line start is dropped
         while True:
-            self.skip_ws_and_comments()
-            ch = self.peek()
-            if ch == '\0':
-                tokens.append(Token(TokenType.EOF, "", None, self.line, self.col))
-                break
-
-            # NEWLINE
-            if ch == '\n':
-                self.advance()
-                tokens.append(Token(TokenType.NEWLINE, '\\n', None, self.line, self.col))
-                continue
-
-            # Multiword comparator attempt (only when starting with 'i' maybe)
-            if ch.lower() == 'i':
-                comp = self.try_multiword_comparator()
-                if comp:
-                    tokens.append(comp)
+            m = match(buf, pos)
+            if not final:
+                # A token touching the end of the buffer may continue in the
+                # next chunk; an 'i' word may still turn into a comparator.
+                if m is None:
+                    blank_end = BLANKS_RE.match(buf, pos).end()
+                    more = blank_end == length or buf[blank_end] == '"'
+                else:
+                    kind = m.lastgroup
+                    end = m.end()
+                    more = end == length and kind != 'newline' and kind != 'op' and kind != 'string'
+                    if not more and kind == 'ident' and buf[m.start(kind)] in 'iI':
+                        start = m.start(kind)
+                        more = length - start < COMPARATOR_LOOKAHEAD and buf.find('\n', start) == -1
+                if more:
+                    chunk = read(chunk_size)
+                    if not chunk:
+                        final = True
+                    offset += pos
+                    line_start -= pos
+                    buf = buf[pos:] + chunk
+                    length = len(buf)
+                    pos = 0
                     continue
-
-            if ch == '"':
-                self.advance()  # consume opening quote
-                tokens.append(self.string())
-                continue
-            if ch.isdigit():
-                tokens.append(self.number())
-                continue
-            if ch.isalpha() or ch == '_':
-                tokens.append(self.identifier())
-                continue
-
-            # Single-character tokens
-            start_line, start_col = self.line, self.col
-            if ch == '+':
-                self.advance(); tokens.append(Token(TokenType.PLUS, '+', None, start_line, start_col)); continue
-            if ch == '-':
-                self.advance(); tokens.append(Token(TokenType.MINUS, '-', None, start_line, start_col)); continue
-            if ch == '*':
-                self.advance(); tokens.append(Token(TokenType.STAR, '*', None, start_line, start_col)); continue
-            if ch == '/':
-                self.advance(); tokens.append(Token(TokenType.SLASH, '/', None, start_line, start_col)); continue
-            if ch == '(':
-                self.advance(); tokens.append(Token(TokenType.LPAREN, '(', None, start_line, start_col)); continue
-            if ch == ')':
-                self.advance(); tokens.append(Token(TokenType.RPAREN, ')', None, start_line, start_col)); continue
-
-            raise LexError(f"Unexpected character '{ch}' at {self.line}:{self.col}")
-        return tokens
\ No newline at end of file
+            if m is None:
+                pos = BLANKS_RE.match(buf, pos).end()
+                col = pos - line_start + 1
+                self.pos, self.line, self.col = offset + pos, line, col
+                if pos >= length or buf[pos] == '\0':
+                    yield Token(TokenType.EOF, "", None, line, col)
+                    return
+                if buf[pos] == '"':
+                    raise LexError(f"Unterminated string at {line}:{col + 1}")
+                raise LexError(f"Unexpected character '{buf[pos]}' at {line}:{col}")
+            kind = m.lastgroup
+            pos = m.start(kind) if kind != 'string' else m.start(kind) - 1
+            end = m.end()
+            if kind == 'ident':
+                text = m.group(kind)
+                ttype = keywords.get(text.lower())
+                if ttype:
+                    yield Token(ttype, text, text.lower(), line, pos - line_start + 1)
+                elif text[0] < '\x80' or text[0].isalpha():
+                    yield Token(ident_type, text, text, line, pos - line_start + 1)
+                else:
+                    # \w also admits numeric characters such as '½' that
+                    # cannot start an identifier.
+                    raise LexError(f"Unexpected character '{text[0]}' at {line}:{pos - line_start + 1}")
+            elif kind == 'newline':
+                line += 1
+                line_start = end
+                yield Token(newline_type, '\\n', None, line, 1)
+            elif kind == 'number':
+                text = m.group(kind)
+                yield Token(TokenType.NUMBER, text, int(text), line, pos - line_start + 1)
+            elif kind == 'op':
+                ch = m.group(kind)
+                yield Token(SINGLE_CHAR_TOKENS[ch], ch, None, line, pos - line_start + 1)
+            elif kind == 'comparator':
+                if end < length and buf[end].isalpha():
+                    # Not at a word boundary ("is lesser"): lex as identifier.
+                    m = IDENT_RE.match(buf, pos)
+                    end = m.end()
+                    text = m.group()
+                    ttype = keywords.get(text.lower())
+                    if ttype:
+                        yield Token(ttype, text, text.lower(), line, pos - line_start + 1)
+                    else:
+                        yield Token(ident_type, text, text, line, pos - line_start + 1)
+                else:
+                    phrase = m.group(kind).lower()
+                    yield Token(COMPARATOR_TYPES[phrase], phrase, None, line, end - line_start + 1)
+            elif kind == 'comment':
+                pass
+            else:  # string
+                col = pos - line_start + 2
+                value = m.group('string')
+                if '\\' in value:
+                    value = ESCAPE_RE.sub(lambda e: ESCAPES.get(e.group(1), e.group(1)), value)
+                yield Token(TokenType.STRING, value, value, line, col)
+                newlines = buf.count('\n', pos, end)
+                if newlines:
+                    line += newlines
+                    line_start = buf.rfind('\n', pos, end) + 1
+            pos = end
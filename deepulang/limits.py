@@ -0,0 +1,138 @@
+"""Execution budgets for untrusted programs.
+
+A Limits object is handed to an engine (``create_engine(name,
+limits=...)``) and enforced in two places:
+
+- Loop back-edges. Every iteration of a while or repeat loop costs one step
+  per statement in its body. Engines count steps in a local variable and
+  only call tick() once the count reaches the allowance tick() handed out
+  last time, so the per-iteration cost is an add and a compare. tick()
+  enforces ``max_steps`` and the wall-clock ``timeout``.
+- Arithmetic results. With ``max_string_length`` or ``max_int_bits`` set,
+  '+', '-' and '*' check their result, and string repetition is checked
+  before the string is built.
+
+Breaking a limit raises LimitExceeded, a RuntimeErrorDPL. The budget starts
+when the Limits object is created; reset() starts it again.
+
+With ``counts_statements`` set (deepulang.instrument does, for --stats),
+engines also add every statement they execute to ``statements``. That is
+not a budget, and costs an add per statement.
+"""
+import sys
+import time
+
+from .interpreter import RuntimeErrorDPL
+from .rope import Rope, concat
+
+# Steps between clock reads when only a timeout is set.
+CLOCK_INTERVAL = 1024
+
+class LimitExceeded(RuntimeErrorDPL):
+    pass
+
+class Limits:
+    def __init__(self, max_steps=None, timeout=None, max_string_length=None, max_int_bits=None):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_string_length = max_string_length
+        self.max_int_bits = max_int_bits
+        self.counts_statements = False
+        self._build_operators()
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.statements = 0
+        self.deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+
+    @property
+    def counts_steps(self):
+        return self.max_steps is not None or self.timeout is not None
+
+    @property
+    def checks_values(self):
+        return self.max_string_length is not None or self.max_int_bits is not None
+
+    def allowance(self):
+        """How many more steps may run before tick() must be called."""
+        allowance = sys.maxsize
+        if self.max_steps is not None:
+            allowance = max(1, self.max_steps - self.steps)
+        if self.deadline is not None:
+            allowance = min(allowance, CLOCK_INTERVAL)
+        return allowance
+
+    def tick(self, steps):
+        """Account for ``steps`` more steps; return the next allowance."""
+        self.steps += steps
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise LimitExceeded(f"Step limit of {self.max_steps} exceeded")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LimitExceeded(f"Time limit of {self.timeout}s exceeded")
+        return self.allowance()
+
+    def check(self, value):
+        """Return ``value`` if it is within the size limits, else raise."""
+        if isinstance(value, (str, Rope)):
+            if self.max_string_length is not None and len(value) > self.max_string_length:
+                raise self.string_too_long()
+        elif isinstance(value, int):
+            if self.max_int_bits is not None and value.bit_length() > self.max_int_bits:
+                raise self.int_too_big()
+        return value
+
+    def string_too_long(self):
+        return LimitExceeded(f"String longer than {self.max_string_length} characters")
+
+    def int_too_big(self):
+        return LimitExceeded(f"Integer larger than {self.max_int_bits} bits")
+
+    def check_repeat(self, text, times):
+        if self.max_string_length is not None and len(text) * times > self.max_string_length:
+            raise self.string_too_long()
+
+    # Checked '+', '-' and '*' used by engines when checks_values is set.
+    # They run once per arithmetic operation, so they are closures over
+    # precomputed bounds rather than methods calling check(): |n| < 2 ** bits
+    # is the same test as n.bit_length() <= bits, but needs no call.
+    def _build_operators(self):
+        inf = float("inf")
+        bound = 1 << self.max_int_bits if self.max_int_bits is not None else inf
+        max_length = self.max_string_length if self.max_string_length is not None else inf
+        string_too_long, int_too_big = self.string_too_long, self.int_too_big
+
+        def add(left, right):
+            result = concat(left, right) if left.__class__ is str else left + right
+            if result.__class__ is int:
+                if -bound < result < bound:
+                    return result
+                raise int_too_big()
+            if (result.__class__ is str or result.__class__ is Rope) and len(result) > max_length:
+                raise string_too_long()
+            return result
+
+        def sub(left, right):
+            result = left - right
+            if result.__class__ is int and not -bound < result < bound:
+                raise int_too_big()
+            return result
+
+        def mul(left, right):
+            # Refuse before building the string: "x" * 10 ** 12 would not return.
+            if left.__class__ is str or left.__class__ is Rope:
+                if right.__class__ is int and len(left) * right > max_length:
+                    raise string_too_long()
+            elif right.__class__ is str or right.__class__ is Rope:
+                if left.__class__ is int and len(right) * left > max_length:
+                    raise string_too_long()
+            result = left * right
+            if result.__class__ is int and not -bound < result < bound:
+                raise int_too_big()
+            return result
+
+        self.add, self.sub, self.mul = add, sub, mul
+
+def loop_cost(body):
+    """Steps charged per iteration of a loop with this body."""
+    return max(1, len(body))
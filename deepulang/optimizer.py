@@ -0,0 +1,514 @@
+"""AST optimizer run between parsing and execution.
+
+Level 1 folds Binary, Unary and Comparison nodes whose operands are literals
+and drops code that can never run (decided If branches, while loops whose
+condition is false from the start, repeat loops with a count of zero or
+less). Level 2 also hoists loop-invariant integer arithmetic out of while
+and repeat bodies into temporaries named ``$inv<n>``; the '$' keeps them
+apart from any name a program can spell. It also replaces counting and
+accumulating loops (bodies of nothing but integer ``set v to v + step``
+updates) with their closed form: the number of iterations goes into a
+temporary ``$trips<n>`` and every variable is updated once.
+
+Under Limits, level 2 changes what the limits see, so it holds back:
+with value limits (max_int_bits, max_string_length) it does nothing
+beyond level 1, as a hoisted or closed-form expression is computed at a
+different point and with other intermediates (k * (k - 1) is wider than
+the sum it leads to). With step limits it does not replace loops, which
+would skip the steps they are charged.
+
+Step limits also charge a loop iteration one step per statement directly
+in its body, so under them no level changes how many statements a body
+has: a decided If or a dead loop there is kept as one statement (its
+branches and body still optimized), and nothing is hoisted out of a loop
+into the body of another.
+
+Folding evaluates with the tree-walking Interpreter itself, so '/' keeps its
+integer-floor rule and anything that would fail (1 / 0, "a" + 1) is left in
+place to fail at runtime exactly as before. Given the Limits the program
+will run under, the Interpreter checks with them too, so a result they
+reject ("x" * 50 with max_string_length=20) is not folded either.
+"""
+from .tokens import (
+    IS_GT, IS_LT, IS_NOT_GT, IS_NOT_LT,
+    MINUS, NOT, PLUS, SLASH, STAR, Token,
+)
+from .ast_nodes import *
+from .interpreter import Interpreter
+from .rope import plain
+
+LEVELS = (0, 1, 2)
+
+# Folded strings longer than this stay as expressions ("x" * 1000000).
+MAX_FOLDED_LENGTH = 1024
+
+def expr_key(node):
+    """Structural key of an expression, for sharing identical hoisted values."""
+    if isinstance(node, Literal):
+        return ("lit", type(node.value), node.value)
+    if isinstance(node, Var):
+        return ("var", node.name)
+    if isinstance(node, Unary):
+        return ("unary", node.op.type, expr_key(node.right))
+    return ("binary", node.op.type, expr_key(node.left), expr_key(node.right))
+
+def assignments(stmts):
+    """Every VarDecl and Assign anywhere in ``stmts``."""
+    for s in stmts:
+        if isinstance(s, (VarDecl, Assign)):
+            yield s
+        elif isinstance(s, If):
+            yield from assignments(s.then_block)
+            if s.else_block is not None:
+                yield from assignments(s.else_block)
+        elif isinstance(s, (While, Repeat)):
+            yield from assignments(s.body)
+
+def assigned_names(stmts):
+    """Every variable declared or set anywhere in ``stmts``."""
+    return {s.name for s in assignments(stmts)}
+
+def loop_ints(body, ints):
+    """The variables of ``ints`` that still hold an int whenever a loop with
+    ``body`` starts an iteration (and so after it)."""
+    stable = set(ints)
+    changed = True
+    while changed:
+        changed = False
+        for s in assignments(body):
+            if s.name in stable and not is_int_expr(s.expr, stable):
+                stable.discard(s.name)
+                changed = True
+    return stable
+
+def has_var(node):
+    if isinstance(node, Var):
+        return True
+    if isinstance(node, Unary):
+        return has_var(node.right)
+    if isinstance(node, Binary):
+        return has_var(node.left) or has_var(node.right)
+    return False
+
+def is_int_expr(node, ints):
+    """True when ``node`` always evaluates to an int (or bool) without raising.
+
+    ``ints`` holds the variables known to be defined and integer-valued.
+    """
+    if isinstance(node, Literal):
+        return isinstance(node.value, int)
+    if isinstance(node, Var):
+        return node.name in ints
+    if isinstance(node, Unary):
+        return node.op.type in (MINUS, NOT) and is_int_expr(node.right, ints)
+    if isinstance(node, Binary):
+        t = node.op.type
+        if t is SLASH:
+            right = node.right
+            return (isinstance(right, Literal) and isinstance(right.value, int)
+                    and right.value != 0 and is_int_expr(node.left, ints))
+        return t in (PLUS, MINUS, STAR) and is_int_expr(node.left, ints) and is_int_expr(node.right, ints)
+    return False
+
+def terms(node, sign=1, out=None):
+    """``node`` as the (sign, term) pairs its '+', '-' and unary '-' add up."""
+    if out is None:
+        out = []
+    if isinstance(node, Binary) and node.op.type in (PLUS, MINUS):
+        terms(node.left, sign, out)
+        terms(node.right, -sign if node.op.type is MINUS else sign, out)
+    elif isinstance(node, Unary) and node.op.type is MINUS:
+        terms(node.right, -sign, out)
+    else:
+        out.append((sign, node))
+    return out
+
+LEXEMES = {PLUS: "+", MINUS: "-", STAR: "*", SLASH: "/"}
+
+def binary(left, type_, right, at):
+    """A Binary built by the optimizer, placed at the node or token ``at``."""
+    return located(Binary(left, Token(type_, LEXEMES[type_], None, at.line, at.col), right), at)
+
+def literal(value, at):
+    return located(Literal(value), at)
+
+def added(node, pairs, at):
+    """``node`` plus the (sign, term) ``pairs``; their plain sum if ``node`` is None."""
+    for sign, term in pairs:
+        if node is None:
+            node = term if sign > 0 else located(Unary(Token(MINUS, "-", None, at.line, at.col), term), at)
+        else:
+            node = binary(node, PLUS if sign > 0 else MINUS, term, at)
+    return node if node is not None else literal(0, at)
+
+class Optimizer(Visitor):
+    """Rewrite a Program into an equivalent, cheaper one.
+
+    Statement visitors return lists so that a decided If can be replaced by
+    the statements of the branch that runs. The input tree is not modified.
+    Top-level analysis state is kept between optimize_statements() calls, so
+    a streamed program can be optimized one statement at a time.
+    """
+    def __init__(self, level: int = 1, limits=None):
+        if level not in LEVELS:
+            raise ValueError(f"Unknown optimization level {level} (choose from 0, 1, 2)")
+        self.level = level
+        self.limits = limits
+        self.evaluator = Interpreter(limits=limits)
+        self.temps = 0
+        self.ints = set()
+
+    def optimize(self, program: Program) -> Program:
+        return located(Program(self.optimize_statements(program.statements)), program)
+
+    def optimize_statements(self, stmts):
+        if self.level == 0:
+            return list(stmts)
+        stmts = self.block(stmts)
+        if self.level >= 2 and not (self.limits is not None and self.limits.checks_values):
+            stmts = self.hoist_block(stmts, self.ints)
+        return stmts
+
+    # Folding and dead code
+    def block(self, stmts):
+        out = []
+        for s in stmts:
+            out += s.accept(self)
+        return out
+
+    def fold(self, node):
+        return node.accept(self)
+
+    def evaluate(self, node):
+        """Return (True, value) if ``node`` can be computed now, else (False, None)."""
+        if isinstance(node, Binary) and node.op.type is STAR:
+            # Measure a string repetition before building it.
+            left, right = node.left.value, node.right.value
+            for text, count in ((left, right), (right, left)):
+                if isinstance(text, str) and isinstance(count, int) \
+                        and len(text) * count > MAX_FOLDED_LENGTH:
+                    return False, None
+        try:
+            value = plain(self.evaluator.evaluate(node))
+        except Exception:
+            return False, None
+        if isinstance(value, str) and len(value) > MAX_FOLDED_LENGTH:
+            return False, None
+        return True, value
+
+    def decide(self, condition):
+        """Fold a condition; return (node, value) with value None if unknown."""
+        condition = self.fold(condition)
+        if isinstance(condition.left, Literal) and isinstance(condition.right, Literal):
+            known, value = self.evaluate(condition)
+            if known:
+                return condition, self.evaluator.is_truthy(value)
+        return condition, None
+
+    def visit_VarDecl(self, node: VarDecl):
+        return [located(VarDecl(node.name, self.fold(node.expr)), node)]
+
+    def visit_Assign(self, node: Assign):
+        return [located(Assign(node.name, self.fold(node.expr)), node)]
+
+    def visit_Print(self, node: Print):
+        return [located(Print(self.fold(node.expr)), node)]
+
+    def visit_If(self, node: If):
+        condition, value = self.decide(node.condition)
+        if value is True:
+            return self.block(node.then_block)
+        if value is False:
+            return self.block(node.else_block) if node.else_block is not None else []
+        else_block = self.block(node.else_block) if node.else_block is not None else None
+        return [located(If(condition, self.block(node.then_block), else_block), node)]
+
+    def visit_While(self, node: While):
+        condition, value = self.decide(node.condition)
+        if value is False:
+            return []
+        return [located(While(condition, self.loop_body(node.body)), node)]
+
+    def visit_Repeat(self, node: Repeat):
+        count = self.fold(node.count_expr)
+        if isinstance(count, Literal) and isinstance(count.value, int) and count.value <= 0:
+            return []
+        return [located(Repeat(count, self.loop_body(node.body)), node)]
+
+    def counts_steps(self):
+        return self.limits is not None and self.limits.counts_steps
+
+    def loop_body(self, stmts):
+        """block() for a loop body; under step limits, one statement per statement."""
+        if not self.counts_steps():
+            return self.block(stmts)
+        return [self.kept(s) for s in stmts]
+
+    def kept(self, node):
+        """``node`` optimized, but left one statement even if it is decided or dead."""
+        if isinstance(node, If):
+            else_block = self.block(node.else_block) if node.else_block is not None else None
+            return located(If(self.fold(node.condition), self.block(node.then_block), else_block),
+                           node)
+        if isinstance(node, While):
+            return located(While(self.fold(node.condition), self.loop_body(node.body)), node)
+        if isinstance(node, Repeat):
+            return located(Repeat(self.fold(node.count_expr), self.loop_body(node.body)), node)
+        return node.accept(self)[0]
+
+    def visit_Comparison(self, node: Comparison):
+        return located(Comparison(self.fold(node.left), node.op, self.fold(node.right)), node)
+
+    def visit_Binary(self, node: Binary):
+        folded = Binary(self.fold(node.left), node.op, self.fold(node.right))
+        if isinstance(folded.left, Literal) and isinstance(folded.right, Literal):
+            known, value = self.evaluate(folded)
+            if known:
+                return located(Literal(value), node)
+        return located(folded, node)
+
+    def visit_Unary(self, node: Unary):
+        folded = Unary(node.op, self.fold(node.right))
+        if isinstance(folded.right, Literal):
+            known, value = self.evaluate(folded)
+            if known:
+                return located(Literal(value), node)
+        return located(folded, node)
+
+    def visit_Literal(self, node: Literal):
+        return node
+
+    def visit_Var(self, node: Var):
+        return node
+
+    # Loop-invariant hoisting
+    def hoist_block(self, stmts, ints, in_loop=False):
+        """Hoist invariants out of the loops in ``stmts``; update ``ints`` in place.
+
+        ``ints`` is the set of variables definitely defined and holding an
+        int when control reaches the next statement. Only expressions built
+        from such variables, int literals and operators that cannot raise on
+        ints are hoisted, so evaluating them early is never observable.
+        """
+        out = []
+        for s in stmts:
+            if isinstance(s, (VarDecl, Assign)):
+                if is_int_expr(s.expr, ints):
+                    ints.add(s.name)
+                else:
+                    ints.discard(s.name)
+                out.append(s)
+            elif isinstance(s, If):
+                then_ints = set(ints)
+                then_block = self.hoist_block(s.then_block, then_ints)
+                else_ints = set(ints)
+                else_block = None
+                if s.else_block is not None:
+                    else_block = self.hoist_block(s.else_block, else_ints)
+                ints.intersection_update(then_ints, else_ints)
+                out.append(located(If(s.condition, then_block, else_block), s))
+            elif isinstance(s, (While, Repeat)):
+                if in_loop and self.counts_steps():
+                    # Hoisted statements would lengthen the enclosing body.
+                    ints.intersection_update(loop_ints(s.body, ints))
+                    out.append(s)
+                    continue
+                closed = self.closed_form(s, ints) if self.limits is None else None
+                out += closed if closed is not None else self.hoist_loop(s, ints)
+            else:
+                out.append(s)
+        return out
+
+    def hoist_loop(self, loop, ints):
+        variant = assigned_names(loop.body)
+        invariant = ints - variant
+        hoisted = {}
+
+        def rewrite(node):
+            if isinstance(node, (Binary, Unary)) and has_var(node) and is_int_expr(node, invariant):
+                key = expr_key(node)
+                temp = hoisted.get(key)
+                if temp is None:
+                    self.temps += 1
+                    temp = hoisted[key] = located(VarDecl(f"$inv{self.temps}", node), loop)
+                return located(Var(temp.name), node)
+            if isinstance(node, Binary):
+                return located(Binary(rewrite(node.left), node.op, rewrite(node.right)), node)
+            if isinstance(node, Unary):
+                return located(Unary(node.op, rewrite(node.right)), node)
+            if isinstance(node, Comparison):
+                return located(Comparison(rewrite(node.left), node.op, rewrite(node.right)), node)
+            return node
+
+        def rewrite_block(stmts):
+            out = []
+            for s in stmts:
+                if isinstance(s, VarDecl):
+                    new = VarDecl(s.name, rewrite(s.expr))
+                elif isinstance(s, Assign):
+                    new = Assign(s.name, rewrite(s.expr))
+                elif isinstance(s, Print):
+                    new = Print(rewrite(s.expr))
+                elif isinstance(s, If):
+                    else_block = rewrite_block(s.else_block) if s.else_block is not None else None
+                    new = If(rewrite(s.condition), rewrite_block(s.then_block), else_block)
+                elif isinstance(s, While):
+                    new = While(rewrite(s.condition), rewrite_block(s.body))
+                else:
+                    new = Repeat(rewrite(s.count_expr), rewrite_block(s.body))
+                out.append(located(new, s))
+            return out
+
+        if isinstance(loop, While):
+            head = rewrite(loop.condition)
+        else:
+            # The count is evaluated once already.
+            head = loop.count_expr
+        body = rewrite_block(loop.body)
+        ints.intersection_update(loop_ints(loop.body, ints))
+        ints.update(temp.name for temp in hoisted.values())
+        # Inner loops hoist what is invariant only within themselves.
+        body = self.hoist_block(body, set(ints), True)
+        if isinstance(loop, While):
+            rebuilt = While(head, body)
+        else:
+            rebuilt = Repeat(head, body)
+        return list(hoisted.values()) + [located(rebuilt, loop)]
+
+    # Closed-form loops
+    def closed_form(self, loop, ints):
+        """Statements with the effect of ``loop`` that do not loop, or None.
+
+        The body must be ``set`` statements on distinct variables in
+        ``ints``. Each sets its variable to an invariant integer expression,
+        or adds to it (once, with '+') invariant integer terms and the
+        values of loop variables whose own steps are all invariant, which
+        sum up to an arithmetic series. A while condition must compare one
+        of the variables, stepped by a literal, with an invariant bound it
+        moves towards. Int arithmetic is exact, so the result is what the
+        iterations add up to, bit for bit; the guard keeps a loop that does
+        not run at all from touching anything, even a bool it would have
+        turned into an int.
+        """
+        body = loop.body
+        names = [s.name for s in body if isinstance(s, Assign)]
+        if not body or len(names) < len(body) or len(set(names)) < len(names) \
+                or not ints.issuperset(names):
+            return None
+        invariant = ints - set(names)
+        constant, steps, sums = {}, {}, {}
+        for position, s in enumerate(body):
+            own, others = [], []
+            for sign, term in terms(s.expr):
+                if isinstance(term, Var) and term.name == s.name:
+                    own.append(sign)
+                elif is_int_expr(term, invariant) or isinstance(term, Var) and term.name in names:
+                    others.append((sign, term))
+                else:
+                    return None
+            if not own:
+                if not is_int_expr(s.expr, invariant):
+                    return None
+                constant[s.name] = s
+            elif own != [1]:
+                return None
+            elif all(is_int_expr(term, invariant) for _, term in others):
+                steps[s.name] = (position, others)
+            else:
+                sums[s.name] = (position, others)
+        for position, pairs in sums.values():
+            for _, term in pairs:
+                if isinstance(term, Var) and term.name in names and term.name not in steps:
+                    return None
+
+        if isinstance(loop, Repeat):
+            if not is_int_expr(loop.count_expr, ints):
+                return None
+            count = loop.count_expr
+        else:
+            count = self.trip_count(loop.condition, steps, invariant)
+            if count is None:
+                return None
+        self.temps += 1
+        trips = f"$trips{self.temps}"
+        if isinstance(loop, Repeat):
+            # The count is evaluated once, whether or not the loop runs.
+            guard = located(Comparison(located(Var(trips), loop),
+                                       Token(IS_GT, "is greater than", None, loop.line, loop.col),
+                                       literal(0, loop)), loop)
+            prefix, update = [located(VarDecl(trips, count), loop)], []
+        else:
+            guard = loop.condition
+            prefix, update = [], [located(VarDecl(trips, count), loop)]
+
+        def k(at):
+            return located(Var(trips), at)
+
+        # Sums first: they read the loop variables' values from before the loop.
+        for name, (position, pairs) in sums.items():
+            s = body[position]
+            total = []
+            for sign, term in pairs:
+                if isinstance(term, Var) and term.name in steps:
+                    # Iteration t (from 0) reads j + (t + after) * step, where
+                    # after is 1 if j was already stepped in that iteration:
+                    # k * j + step * k * (k - 1 + 2 * after) / 2 in all.
+                    step_position, step = steps[term.name]
+                    tri = binary(k(s), PLUS if step_position < position else MINUS, literal(1, s), s)
+                    tri = binary(binary(k(s), STAR, tri, s), SLASH, literal(2, s), s)
+                    term = binary(binary(k(s), STAR, term, s), PLUS,
+                                  binary(added(None, step, s), STAR, tri, s), s)
+                else:
+                    term = binary(k(s), STAR, term, s)
+                total.append((sign, term))
+            update.append(located(Assign(name, added(located(Var(name), s), total, s)), s))
+        for name, (position, pairs) in steps.items():
+            s = body[position]
+            scaled = [(sign, binary(k(s), STAR, term, s)) for sign, term in pairs]
+            update.append(located(Assign(name, added(located(Var(name), s), scaled, s)), s))
+        update += constant.values()
+        return self.block(prefix + [located(If(guard, update, None), loop)])
+
+    def trip_count(self, condition, steps, invariant):
+        """How many times a while loop with ``condition`` runs, once it runs at all."""
+        if not isinstance(condition, Comparison):
+            return None
+        op, left, right = condition.op.type, condition.left, condition.right
+        if not (isinstance(left, Var) and left.name in steps):
+            # Put the stepped variable on the left: 'b < i' is 'i > b'.
+            op = {IS_GT: IS_LT, IS_LT: IS_GT, IS_NOT_GT: IS_NOT_LT, IS_NOT_LT: IS_NOT_GT}.get(op)
+            left, right = right, left
+        if op is None or not (isinstance(left, Var) and left.name in steps) \
+                or not is_int_expr(right, invariant):
+            return None
+        pairs = steps[left.name][1]
+        if not all(isinstance(term, Literal) and isinstance(term.value, int) for _, term in pairs):
+            return None
+        step = sum(sign * term.value for sign, term in pairs)
+        at = condition
+        if step > 0 and op in (IS_LT, IS_NOT_GT):
+            distance = binary(right, MINUS, left, at)
+        elif step < 0 and op in (IS_GT, IS_NOT_LT):
+            distance = binary(left, MINUS, right, at)
+        else:
+            return None  # never moves towards the bound
+        size = abs(step)
+        if op in (IS_LT, IS_GT):
+            # ceil(distance / size) iterations before the bound is reached
+            if size == 1:
+                return distance
+            distance = binary(distance, PLUS, literal(size - 1, at), at)
+            return binary(distance, SLASH, literal(size, at), at)
+        if size != 1:
+            distance = binary(distance, SLASH, literal(size, at), at)
+        return binary(distance, PLUS, literal(1, at), at)
+
+def optimize(program: Program, level: int = 1, limits=None) -> Program:
+    """Optimize ``program``, which will run under ``limits`` (deepulang.limits)."""
+    return Optimizer(level, limits).optimize(program)
+
+def optimize_stream(statements, level: int = 1, limits=None):
+    """Optimize an iterator of top-level statements, yielding as it goes."""
+    optimizer = Optimizer(level, limits)
+    for stmt in statements:
+        yield from optimizer.optimize_statements([stmt])
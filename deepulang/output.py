@@ -0,0 +1,78 @@
+"""Destinations for 'say' output.
+
+Every engine writes through an output object with two methods:
+``say(value)`` for one line and ``flush()``, which the engine calls when a
+program finishes or fails. PrintOutput (the default) prints each line
+immediately; BufferedOutput batches lines and writes them in large chunks;
+CaptureOutput keeps them in memory.
+"""
+import sys
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+class PrintOutput:
+    """One print() per line to the current sys.stdout."""
+    def say(self, value):
+        print(value)
+
+    def flush(self):
+        pass
+
+class BufferedOutput:
+    """Collect lines and write them once ``buffer_size`` characters pile up.
+
+    ``stream`` defaults to whatever sys.stdout is at write time. With
+    ``binary=True`` and a text stream that exposes ``.buffer``, chunks are
+    encoded once and written to the underlying binary stream, skipping the
+    text layer (and its newline translation).
+    """
+    def __init__(self, stream=None, buffer_size: int = DEFAULT_BUFFER_SIZE, binary: bool = False):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.binary = binary
+        self.parts = []
+        self.size = 0
+
+    def say(self, value):
+        text = f"{value}\n"
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.write_pending()
+
+    def write_pending(self):
+        if not self.parts:
+            return
+        data = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        stream = self.stream if self.stream is not None else sys.stdout
+        raw = getattr(stream, "buffer", None) if self.binary else None
+        if raw is None:
+            stream.write(data)
+            return
+        # Keep ordering with anything already written through the text layer.
+        stream.flush()
+        raw.write(data.encode(stream.encoding or "utf-8", stream.errors or "strict"))
+
+    def flush(self):
+        self.write_pending()
+        stream = self.stream if self.stream is not None else sys.stdout
+        if self.binary and getattr(stream, "buffer", None) is not None:
+            stream.buffer.flush()
+        else:
+            stream.flush()
+
+class CaptureOutput:
+    """Keep every line in ``lines`` (as strings), e.g. for tests."""
+    def __init__(self):
+        self.lines = []
+
+    def say(self, value):
+        self.lines.append(str(value))
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(line + "\n" for line in self.lines)
@@ -1,33 +1,71 @@
-from .tokens import TokenType
+from .tokens import (
+    BE, DO, END, EOF, IDENT, IF,
+    IS_EQ, IS_GT, IS_LT, IS_NE, IS_NOT_GT, IS_NOT_LT,
+    LET, LPAREN, MINUS, NEWLINE, NOT, NUMBER,
+    OTHERWISE, PLUS, REPEAT, RPAREN, SAY, SET,
+    SLASH, STAR, STRING, THEN, TIMES, TO,
+    WHILE,
+)
 from .ast_nodes import *
 
 class ParseError(Exception):
     pass
 
+# Binding power of the binary operators, all left-associative. Prefix
+# operators bind tighter than any of them; an open '(' looser.
+BINARY = {PLUS: 1, MINUS: 1, STAR: 2, SLASH: 2}
+PREFIX = {MINUS, NOT}
+UNARY = 3
+OPEN = (0, None)
+
+COMPARATORS = {IS_GT, IS_LT, IS_EQ, IS_NE, IS_NOT_GT, IS_NOT_LT}
+
+def reduce(operands, pending, power):
+    """Apply the pending operators binding at least ``power`` to the operands."""
+    while pending and pending[-1][0] >= power:
+        op_power, op = pending.pop()
+        if op_power == UNARY:
+            node = Unary(op, operands[-1])
+        else:
+            right = operands.pop()
+            node = Binary(operands[-1], op, right)
+        node.line = op.line
+        node.col = op.col
+        operands[-1] = node
+
 class Parser:
+    """Parser over a token list or any token iterator.
+
+    Tokens are pulled one at a time with a single token of lookahead, so
+    passing Lexer.iter_tokens() parses without materializing the token list.
+    Statements are dispatched on their first token through STATEMENTS;
+    expressions are parsed by precedence with explicit stacks, so however
+    deeply they nest, parsing them never recurses.
+    """
     def __init__(self, tokens):
         self.tokens = tokens
-        self.i = 0
+        self.stream = iter(tokens)
+        self.current = next(self.stream)
 
     def peek(self):
-        return self.tokens[self.i]
+        return self.current
 
     def advance(self):
-        tok = self.peek()
-        if tok.type != TokenType.EOF:
-            self.i += 1
+        tok = self.current
+        if tok.type is not EOF:
+            self.current = next(self.stream)
         return tok
 
     def check(self, ttype):
-        return self.peek().type == ttype
+        return self.current.type is ttype
 
     def match(self, *types):
-        if self.peek().type in types:
+        if self.current.type in types:
             return self.advance()
         return None
 
     def consume(self, ttype, msg):
-        if self.check(ttype): return self.advance()
+        if self.current.type is ttype: return self.advance()
         raise ParseError(f"{msg} at line {self.peek().line}:{self.peek().col}")
 
     def synchronize(self):
@@ -35,117 +73,164 @@ class Parser:
         self.advance()
 
     def parse(self):
-        statements = []
-        while not self.check(TokenType.EOF):
-            if self.check(TokenType.NEWLINE):
+        return Program(list(self.iter_statements()))
+
+    def iter_statements(self):
+        """Yield top-level statements as soon as each one is complete.
+
+        A block statement is yielded once its 'end' has been consumed; the
+        parser never reads past the token that follows a statement.
+        """
+        while self.current.type is not EOF:
+            if self.current.type is NEWLINE:
                 self.advance(); continue
-            statements.append(self.statement())
-        return Program(statements)
+            yield self.statement()
 
     def statement(self):
-        if self.match(TokenType.LET):
-            name = self.consume(TokenType.IDENT, "Expected identifier after 'let'")
-            self.consume(TokenType.BE, "Expected 'be'")
-            expr = self.expression()
-            return VarDecl(name.lexeme, expr)
-        if self.match(TokenType.SET):
-            name = self.consume(TokenType.IDENT, "Expected identifier after 'set'")
-            self.consume(TokenType.TO, "Expected 'to'")
-            expr = self.expression()
-            return Assign(name.lexeme, expr)
-        if self.match(TokenType.SAY):
-            return Print(self.expression())
-        if self.match(TokenType.IF):
-            cond = self.condition()
-            self.consume(TokenType.THEN, "Expected 'then'")
-            then_block = self.block()
-            else_block = None
-            if self.match(TokenType.OTHERWISE):
-                else_block = self.block()
-            self.consume(TokenType.END, "Expected 'end'")
-            return If(cond, then_block, else_block)
-        if self.match(TokenType.WHILE):
-            cond = self.condition()
-            self.consume(TokenType.DO, "Expected 'do'")
-            body = self.block()
-            self.consume(TokenType.END, "Expected 'end'")
-            return While(cond, body)
-        if self.match(TokenType.REPEAT):
-            count_expr = self.expression()
-            self.consume(TokenType.TIMES, "Expected 'times'")
-            body = self.block()
-            self.consume(TokenType.END, "Expected 'end'")
-            return Repeat(count_expr, body)
-        raise ParseError(f"Unexpected token {self.peek()}")
+        start = self.current
+        parse = self.STATEMENTS.get(start.type)
+        if parse is None:
+            raise ParseError(f"Unexpected token {start}")
+        self.advance()
+        return located(parse(self), start)
+
+    # One method per statement, called with the leading keyword consumed.
+
+    def let_statement(self):
+        name = self.consume(IDENT, "Expected identifier after 'let'")
+        self.consume(BE, "Expected 'be'")
+        return VarDecl(name.lexeme, self.expression())
+
+    def set_statement(self):
+        name = self.consume(IDENT, "Expected identifier after 'set'")
+        self.consume(TO, "Expected 'to'")
+        return Assign(name.lexeme, self.expression())
+
+    def say_statement(self):
+        return Print(self.expression())
+
+    def if_statement(self):
+        cond = self.condition()
+        self.consume(THEN, "Expected 'then'")
+        then_block = self.block()
+        else_block = None
+        if self.current.type is OTHERWISE:
+            self.advance()
+            else_block = self.block()
+        self.consume(END, "Expected 'end'")
+        return If(cond, then_block, else_block)
+
+    def while_statement(self):
+        cond = self.condition()
+        self.consume(DO, "Expected 'do'")
+        body = self.block()
+        self.consume(END, "Expected 'end'")
+        return While(cond, body)
+
+    def repeat_statement(self):
+        count_expr = self.expression()
+        self.consume(TIMES, "Expected 'times'")
+        body = self.block()
+        self.consume(END, "Expected 'end'")
+        return Repeat(count_expr, body)
+
+    STATEMENTS = {
+        LET: let_statement, SET: set_statement, SAY: say_statement,
+        IF: if_statement, WHILE: while_statement, REPEAT: repeat_statement,
+    }
 
     def block(self):
         # Accept optional NEWLINE
-        if self.match(TokenType.NEWLINE):
-            pass
+        if self.current.type is NEWLINE:
+            self.advance()
         statements = []
-        while (not self.check(TokenType.END) and
-               not self.check(TokenType.OTHERWISE) and
-               not self.check(TokenType.EOF)):
-            if self.check(TokenType.NEWLINE):
+        while True:
+            kind = self.current.type
+            if kind is END or kind is OTHERWISE or kind is EOF:
+                return statements
+            if kind is NEWLINE:
                 self.advance()
                 continue
             statements.append(self.statement())
-            if self.check(TokenType.NEWLINE):
+            if self.current.type is NEWLINE:
                 self.advance()
-        return statements
 
     def condition(self):
         # For MVP just a comparison (extend later)
         left = self.expression()
-        comp_token = self.match(TokenType.IS_GT, TokenType.IS_LT, TokenType.IS_EQ,
-                                TokenType.IS_NE, TokenType.IS_NOT_GT, TokenType.IS_NOT_LT)
-        if not comp_token:
+        if self.current.type not in COMPARATORS:
             raise ParseError("Expected comparator in condition")
+        comp_token = self.advance()
         right = self.expression()
-        return Comparison(left, comp_token, right)
+        return located(Comparison(left, comp_token, right), left)
 
     def expression(self):
-        return self.term()
-
-    def term(self):
-        expr = self.factor()
-        while True:
-            op = self.match(TokenType.PLUS, TokenType.MINUS)
-            if not op: break
-            right = self.factor()
-            expr = Binary(expr, op, right)
-        return expr
-
-    def factor(self):
-        expr = self.unary()
+        """Parse an expression by operator precedence.
+
+        ``operands`` holds finished subtrees; ``pending`` holds operators
+        still waiting for their right operand as (binding power, token),
+        and OPEN for each unclosed '('. An operator first reduces the
+        pending ones that bind at least as tightly, which makes the binary
+        operators left-associative. Trees and positions are the same as
+        the recursive grammar expression -> term -> factor -> unary ->
+        primary gives.
+        """
+        operands = []
+        pending = []
+        depth = 0
+        stream = self.stream
+        # Only operators, operands and parentheses are stepped over here,
+        # never EOF, so self.advance()'s EOF check is not needed.
+        tok = self.current
         while True:
-            op = self.match(TokenType.STAR, TokenType.SLASH)
-            if not op: break
-            right = self.unary()
-            expr = Binary(expr, op, right)
-        return expr
-
-    def unary(self):
-        op = self.match(TokenType.MINUS, TokenType.NOT)
-        if op:
-            right = self.unary()
-            return Unary(op, right)
-        return self.primary()
-
-    def primary(self):
-        tok = self.peek()
-        if tok.type == TokenType.NUMBER:
-            self.advance()
-            return Literal(tok.value)
-        if tok.type == TokenType.STRING:
-            self.advance()
-            return Literal(tok.value)
-        if tok.type == TokenType.IDENT:
-            self.advance()
-            return Var(tok.lexeme)
-        if tok.type == TokenType.LPAREN:
-            self.advance()
-            expr = self.expression()
-            self.consume(TokenType.RPAREN, "Expected ')'")
-            return expr
-        raise ParseError(f"Unexpected token in expression {tok}")
\ No newline at end of file
+            # An operand, after any prefix operators and '('.
+            kind = tok.type
+            if kind is NUMBER or kind is STRING:
+                node = Literal(tok.value)
+            elif kind is IDENT:
+                node = Var(tok.lexeme)
+            elif kind is LPAREN:
+                pending.append(OPEN)
+                depth += 1
+                self.current = tok = next(stream)
+                continue
+            elif kind in PREFIX:
+                pending.append((UNARY, tok))
+                self.current = tok = next(stream)
+                continue
+            else:
+                raise ParseError(f"Unexpected token in expression {tok}")
+            node.line = tok.line
+            node.col = tok.col
+            operands.append(node)
+            self.current = tok = next(stream)
+            # Then binary operators and ')' until one of them needs an operand.
+            while True:
+                kind = tok.type
+                power = BINARY.get(kind)
+                if power is not None:
+                    # reduce(operands, pending, power), inlined: this is the
+                    # hottest loop of the parser.
+                    while pending and pending[-1][0] >= power:
+                        op_power, op = pending.pop()
+                        if op_power == UNARY:
+                            node = Unary(op, operands[-1])
+                        else:
+                            right = operands.pop()
+                            node = Binary(operands[-1], op, right)
+                        node.line = op.line
+                        node.col = op.col
+                        operands[-1] = node
+                    pending.append((power, tok))
+                    self.current = tok = next(stream)
+                    break
+                if pending:
+                    reduce(operands, pending, 1)
+                if kind is RPAREN and depth:
+                    pending.pop()
+                    depth -= 1
+                    self.current = tok = next(stream)
+                    continue
+                if depth:
+                    raise ParseError(f"Expected ')' at line {tok.line}:{tok.col}")
+                return operands[0]
@@ -0,0 +1,110 @@
+"""Per-line profiling for `deepulang --profile`.
+
+ProfilingInterpreter is the tree-walking Interpreter with execute() and
+evaluate() wrapped to record, for every source line, how many times its
+statement ran, the time spent in it including nested statements (total)
+and excluding them (self), and how many nodes of each type were
+evaluated. Only this subclass pays for the bookkeeping; the engines used
+without --profile are untouched.
+
+A Profile can be written as a text table, as collapsed stacks (one
+``frame;frame;... microseconds`` line per statement nesting, the input of
+flamegraph.pl and speedscope) or as JSON.
+"""
+import json
+import time
+from collections import Counter
+
+from .interpreter import Interpreter
+
+FORMATS = ("text", "collapsed", "json")
+
+# How statements are labelled in reports: by the keyword that starts them.
+KEYWORDS = {
+    "VarDecl": "let", "SlotDecl": "let", "Assign": "set", "SlotAssign": "set",
+    "Print": "say", "If": "if", "While": "while", "Repeat": "repeat",
+}
+
+class LineStats:
+    __slots__ = ("kind", "count", "total", "self_time")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+        self.total = 0.0
+        self.self_time = 0.0
+
+class Profile:
+    def __init__(self):
+        self.lines = {}
+        self.node_counts = Counter()
+        # Self time keyed by the stack of enclosing statements.
+        self.stacks = Counter()
+
+    def line_order(self):
+        return sorted(self.lines.items(), key=lambda item: (item[0] is None, item[0] or 0))
+
+    def text(self) -> str:
+        rows = [f"{'line':>6} {'statement':<12} {'count':>10} {'total s':>10} {'self s':>10}"]
+        for line, stats in self.line_order():
+            rows.append(f"{line if line is not None else '?':>6} {stats.kind:<12} {stats.count:>10} "
+                        f"{stats.total:>10.6f} {stats.self_time:>10.6f}")
+        rows.append("")
+        rows.append(f"{'node type':<12} {'count':>10}")
+        for kind, count in self.node_counts.most_common():
+            rows.append(f"{kind:<12} {count:>10}")
+        return "\n".join(rows) + "\n"
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {round(seconds * 1e6)}\n"
+                       for stack, seconds in sorted(self.stacks.items()))
+
+    def json(self) -> str:
+        return json.dumps({
+            "lines": [{"line": line, "statement": s.kind, "count": s.count,
+                       "total": s.total, "self": s.self_time}
+                      for line, s in self.line_order()],
+            "node_counts": dict(self.node_counts.most_common()),
+        }, indent=2) + "\n"
+
+    def render(self, fmt: str = "text") -> str:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown profile format '{fmt}' (choose from {', '.join(FORMATS)})")
+        return getattr(self, fmt)()
+
+class ProfilingInterpreter(Interpreter):
+    """Interpreter that records a Profile of everything it executes."""
+    def __init__(self, output=None, limits=None, clock=time.perf_counter):
+        super().__init__(output, limits)
+        self.profile = Profile()
+        self.clock = clock
+        # One [stack, time spent in nested statements] per active statement.
+        self.active = []
+
+    def execute(self, node):
+        kind = type(node).__name__
+        line = node.line
+        stats = self.profile.lines.get(line)
+        if stats is None:
+            stats = self.profile.lines[line] = LineStats(KEYWORDS.get(kind, kind))
+        stats.count += 1
+        self.profile.node_counts[kind] += 1
+        name = f"line {line if line is not None else '?'} {stats.kind}"
+        frame = [f"{self.active[-1][0]};{name}" if self.active else name, 0.0]
+        self.active.append(frame)
+        start = self.clock()
+        try:
+            return node.accept(self)
+        finally:
+            elapsed = self.clock() - start
+            self.active.pop()
+            own = elapsed - frame[1]
+            stats.total += elapsed
+            stats.self_time += own
+            if self.active:
+                self.active[-1][1] += elapsed
+            self.profile.stacks[frame[0]] += own
+
+    def evaluate(self, node):
+        self.profile.node_counts[type(node).__name__] += 1
+        return node.accept(self)
@@ -0,0 +1,120 @@
+"""Resolve variable names to Environment slots before a program runs.
+
+The resolver rewrites VarDecl, Assign and Var into SlotDecl, SlotAssign and
+SlotVar carrying the variable's index in ``Environment.slots``, so engines
+index a list instead of hashing names on every access. Slots are allocated
+in the environment itself and therefore stay valid across interpret() calls.
+
+While walking the tree it also tracks which names may have been declared
+at each point. A read or 'set' of a name that cannot have been declared
+there is an error whenever that line runs; these are collected in
+``diagnostics`` (see check()) without changing runtime behavior.
+"""
+from .ast_nodes import *
+
+def declared_names(stmts, names=None):
+    """Every variable declared with 'let' anywhere in ``stmts``."""
+    if names is None:
+        names = set()
+    for s in stmts:
+        if isinstance(s, VarDecl):
+            names.add(s.name)
+        elif isinstance(s, If):
+            declared_names(s.then_block, names)
+            if s.else_block is not None:
+                declared_names(s.else_block, names)
+        elif isinstance(s, (While, Repeat)):
+            declared_names(s.body, names)
+    return names
+
+class Resolver(Visitor):
+    def __init__(self, env):
+        self.env = env
+        self.diagnostics = []
+        self.line = None
+        self.everywhere = set()
+        # Names that may be declared when control reaches the current node.
+        self.maybe = set(env.values)
+
+    def resolve(self, program: Program) -> Program:
+        self.everywhere = declared_names(program.statements) | self.maybe
+        return located(Program(self.block(program.statements)), program)
+
+    def block(self, stmts):
+        return [self.statement(s) for s in stmts]
+
+    def statement(self, node):
+        self.line = node.line
+        return located(node.accept(self), node)
+
+    def use(self, name):
+        if name in self.maybe:
+            return
+        if name in self.everywhere:
+            problem = "is used before it is declared"
+        else:
+            problem = "is never declared"
+        where = f"line {self.line}: " if self.line is not None else ""
+        self.diagnostics.append(f"{where}variable '{name}' {problem}")
+
+    # Statements
+    def visit_VarDecl(self, node: VarDecl):
+        expr = node.expr.accept(self)
+        self.maybe.add(node.name)
+        return SlotDecl(node.name, self.env.slot(node.name), expr)
+
+    def visit_Assign(self, node: Assign):
+        expr = node.expr.accept(self)
+        self.use(node.name)
+        return SlotAssign(node.name, self.env.slot(node.name), expr)
+
+    def visit_Print(self, node: Print):
+        return Print(node.expr.accept(self))
+
+    def visit_If(self, node: If):
+        condition = node.condition.accept(self)
+        before = set(self.maybe)
+        then_block = self.block(node.then_block)
+        after_then, self.maybe = self.maybe, before
+        else_block = None
+        if node.else_block is not None:
+            else_block = self.block(node.else_block)
+        self.maybe |= after_then
+        return If(condition, then_block, else_block)
+
+    def visit_While(self, node: While):
+        # A later iteration sees declarations from earlier ones.
+        self.maybe |= declared_names(node.body)
+        return While(node.condition.accept(self), self.block(node.body))
+
+    def visit_Repeat(self, node: Repeat):
+        count_expr = node.count_expr.accept(self)
+        self.maybe |= declared_names(node.body)
+        return Repeat(count_expr, self.block(node.body))
+
+    # Expressions
+    def visit_Comparison(self, node: Comparison):
+        return located(Comparison(node.left.accept(self), node.op, node.right.accept(self)), node)
+
+    def visit_Binary(self, node: Binary):
+        return located(Binary(node.left.accept(self), node.op, node.right.accept(self)), node)
+
+    def visit_Unary(self, node: Unary):
+        return located(Unary(node.op, node.right.accept(self)), node)
+
+    def visit_Literal(self, node: Literal):
+        return node
+
+    def visit_Var(self, node: Var):
+        self.use(node.name)
+        return located(SlotVar(node.name, self.env.slot(node.name)), node)
+
+def resolve(program: Program, env) -> Program:
+    return Resolver(env).resolve(program)
+
+def check(program: Program, env=None):
+    """Return the static undefined-variable diagnostics for ``program``."""
+    from .interpreter import Environment
+    resolver = Resolver(env if env is not None else Environment())
+    resolver.resolve(program)
+    return resolver.diagnostics
@@ -0,0 +1,154 @@
+"""Ropes: long strings built by repeated '+'.
+
+With plain str values, ``set s to s + "x"`` copies all of ``s`` on every
+append, so building an n character string in a loop costs O(n²). Engines
+send '+' with a str on the left through concat(), which returns a Rope
+once the result reaches ROPE_THRESHOLD characters. Appending a str to a
+Rope is amortized O(1).
+
+A Rope stands for exactly one str and behaves as that str under every
+operator a program can apply to it: comparisons, truthiness, '*', and the
+TypeErrors raised by '-', '/' and unary '-'. It flattens itself when its
+characters are needed and caches the result. Engines give 'say' and the
+final variables (Environment.values, CompiledProgram.run()) the flat str,
+so nothing outside a running program sees a Rope.
+
+Appended pieces collect in ``tail``. Every CHUNK_PIECES appends they are
+joined into one entry of ``chunks``, which bounds the memory spent per
+piece. A Rope and the Ropes built from it share both lists, which only
+ever grow. A Rope owns the first ``nchunks`` and ``ntail`` entries. Only
+the newest Rope on a list appends to it in place; appending to an older
+Rope copies its entries first.
+"""
+
+# Length from which str + str builds a Rope; shorter results are copied.
+ROPE_THRESHOLD = 1024
+# Appended pieces joined into one chunk at a time.
+CHUNK_PIECES = 64
+
+class Rope:
+    __slots__ = ("chunks", "nchunks", "tail", "ntail", "length", "text")
+
+    def __init__(self, chunks, nchunks, tail, ntail, length):
+        self.chunks = chunks
+        self.nchunks = nchunks
+        self.tail = tail
+        self.ntail = ntail
+        self.length = length
+        self.text = None
+
+    def flat(self) -> str:
+        text = self.text
+        if text is None:
+            pieces = self.chunks[:self.nchunks]
+            pieces += self.tail[:self.ntail]
+            text = self.text = "".join(pieces)
+        return text
+
+    def append(self, piece: str) -> "Rope":
+        chunks, nchunks, tail, ntail = self.chunks, self.nchunks, self.tail, self.ntail
+        if len(tail) != ntail:
+            tail = tail[:ntail]
+        tail.append(piece)
+        ntail += 1
+        if ntail == CHUNK_PIECES:
+            if len(chunks) != nchunks:
+                chunks = chunks[:nchunks]
+            chunks.append("".join(tail))
+            nchunks += 1
+            tail, ntail = [], 0
+        return Rope(chunks, nchunks, tail, ntail, self.length + len(piece))
+
+    def __add__(self, other):
+        if other.__class__ is str:
+            return self.append(other)
+        if other.__class__ is Rope:
+            return self.append(other.flat())
+        return self.flat() + other
+
+    def __radd__(self, other):
+        return other + self.flat()
+
+    def __mul__(self, other):
+        return self.flat() * plain(other)
+
+    def __rmul__(self, other):
+        return other * self.flat()
+
+    def __sub__(self, other):
+        return self.flat() - plain(other)
+
+    def __rsub__(self, other):
+        return other - self.flat()
+
+    def __truediv__(self, other):
+        return self.flat() / plain(other)
+
+    def __rtruediv__(self, other):
+        return other / self.flat()
+
+    def __neg__(self):
+        return -self.flat()
+
+    def __eq__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return len(other) == self.length and self.flat() == plain(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return len(other) != self.length or self.flat() != plain(other)
+        return NotImplemented
+
+    def __lt__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.flat() < plain(other)
+        return NotImplemented
+
+    def __gt__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.flat() > plain(other)
+        return NotImplemented
+
+    def __le__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.flat() <= plain(other)
+        return NotImplemented
+
+    def __ge__(self, other):
+        if other.__class__ is str or other.__class__ is Rope:
+            return self.flat() >= plain(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.flat())
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length != 0
+
+    def __str__(self):
+        return self.flat()
+
+    def __repr__(self):
+        return repr(self.flat())
+
+    def __format__(self, spec):
+        return format(self.flat(), spec)
+
+# Python words the TypeError for an unsupported comparison ('<' between a
+# Rope and an int) itself, naming both types; make it read as it would for
+# the str the Rope stands for.
+Rope.__name__ = "str"
+
+def concat(left: str, right):
+    """``left + right`` for a str ``left``; a Rope once the result is long."""
+    if right.__class__ is str and len(left) + len(right) >= ROPE_THRESHOLD:
+        return Rope([], 0, [left, right], 2, len(left) + len(right))
+    return left + right
+
+def plain(value):
+    """``value``, with a Rope flattened to its str."""
+    return value.flat() if value.__class__ is Rope else value
@@ -0,0 +1,244 @@
+"""`deepulang serve`: a warm process that runs programs sent to it locally.
+
+Starting Python and importing DeepuLang costs far more than running a
+short script. The server pays for that once and then answers requests on
+a Unix domain socket (default ``$DEEPULANG_SOCKET``, else
+``$XDG_RUNTIME_DIR/deepulang.sock``, else ``/tmp/deepulang-<uid>.sock``;
+created readable by the current user only) or, with ``--stdio``, on
+stdin/stdout. `deepulang run --server script.dpl` is the matching client.
+
+Requests and replies are JSON objects, one per line. A connection may
+send any number of requests; they are answered in order:
+
+    {"id": 1, "source": "say 6 * 7\\n", "engine": "tree", "opt_level": 0,
+     "limits": {"max_steps": 100000}, "variables": true}
+
+``path`` (a file the server reads) may replace ``source``; every other
+field is optional. 'say' output is streamed back while the program runs
+as ``{"id": 1, "output": "42\\n"}`` chunks, followed by one result:
+
+    {"id": 1, "ok": true, "cached": false, "seconds": ..., "variables": {...}}
+
+or ``"ok": false`` with ``"error"`` (and ``"line"`` when known), as in
+the `deepulang batch` report. Each request runs on a fresh engine, so in
+its own Environment. Parsed (and optimized) programs are kept in an
+in-memory LRU keyed by source text (and, when optimized, the limits), so
+sending the same script again skips lexing and parsing. Limits given to
+`deepulang serve` are a ceiling: a request may tighten them but not lift
+them, and the optimizer runs under them too, so ``opt_level`` does not
+get around them. Every connection
+is served on its own thread.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from . import load_program
+from .batch import describe_error, json_value
+from .cli import LIMIT_NAMES, add_limit_arguments, limit_options
+from .client import default_socket_path
+from .engines import create_engine
+from .limits import Limits
+
+DEFAULT_CACHE_SIZE = 256
+# Output is sent once this many characters are pending, or when a line is
+# printed this many seconds after the previous chunk went out.
+OUTPUT_BUFFER_SIZE = 16 * 1024
+OUTPUT_INTERVAL = 0.05
+
+class StreamOutput:
+    """'say' sink sending ``{"id", "output"}`` chunks through ``send``."""
+    def __init__(self, send, request_id):
+        self.send = send
+        self.request_id = request_id
+        self.parts = []
+        self.size = 0
+        self.sent = time.monotonic()
+
+    def say(self, value):
+        text = f"{value}\n"
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= OUTPUT_BUFFER_SIZE or time.monotonic() - self.sent >= OUTPUT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            data = "".join(self.parts)
+            self.parts = []
+            self.size = 0
+            self.send({"id": self.request_id, "output": data})
+        self.sent = time.monotonic()
+
+def merge_limits(ceiling: dict, requested: dict) -> dict:
+    """Limits arguments from a request, capped by the server's ``ceiling``."""
+    merged = dict(ceiling)
+    for name, value in requested.items():
+        if name not in LIMIT_NAMES:
+            raise ValueError(f"Unknown limit '{name}' (choose from {', '.join(LIMIT_NAMES)})")
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Limit '{name}' must be a number")
+        merged[name] = min(value, merged[name]) if name in merged else value
+    return merged
+
+class Server:
+    """Runs requests for any number of connections; holds the program cache.
+
+    ``limits`` is a dict of Limits arguments applied to every request.
+    With ``cache_dir``, programs missing from memory are also looked up
+    in (and added to) the on-disk cache (see deepulang.cache).
+    """
+    def __init__(self, limits=None, cache_size: int = DEFAULT_CACHE_SIZE, cache_dir=None):
+        self.limits = dict(limits or {})
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.programs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def program(self, source: str, opt_level: int, limits: dict):
+        """The parsed and optimized ``source``, and whether it came from memory.
+
+        The optimizer is given the ``limits`` the program runs under, so a
+        request cannot get past them by asking for an optimization level.
+        """
+        key = (opt_level, tuple(sorted(limits.items())) if opt_level else (), source)
+        with self.lock:
+            program = self.programs.get(key)
+            if program is not None:
+                self.programs.move_to_end(key)
+                return program, True
+        # Parse outside the lock; two threads may race to parse the same
+        # source, which is harmless.
+        program = load_program(source, self.cache_dir, opt_level,
+                               limits=Limits(**limits) if limits else None)
+        with self.lock:
+            self.programs[key] = program
+            while len(self.programs) > self.cache_size:
+                self.programs.popitem(last=False)
+        return program, False
+
+    def handle(self, request, send):
+        """Run one request, passing every reply message to ``send``."""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        result = {"id": request_id, "ok": False}
+        start = time.perf_counter()
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            source = request.get("source")
+            if source is None:
+                path = request.get("path")
+                if path is None:
+                    raise ValueError("A request needs 'source' or 'path'")
+                with open(path, "r", encoding="utf-8") as f:
+                    source = f.read()
+            limits = merge_limits(self.limits, request.get("limits") or {})
+            program, result["cached"] = self.program(source, request.get("opt_level", 0), limits)
+            interp = create_engine(request.get("engine", "tree"), StreamOutput(send, request_id),
+                                   Limits(**limits) if limits else None)
+            interp.interpret(program)
+            result["ok"] = True
+            if request.get("variables", True):
+                result["variables"] = {name: json_value(v)
+                                       for name, v in interp.env.variables.items()}
+        except Exception as e:
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                raise
+            result.update(describe_error(e))
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        send(result)
+
+def serve_stream(server: Server, requests, replies):
+    """Answer the JSON lines read from binary file ``requests`` on ``replies``, until EOF."""
+    def send(message):
+        replies.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        replies.flush()
+
+    try:
+        for line in requests:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                send({"id": None, "ok": False, "error": f"Invalid JSON: {e}"})
+                continue
+            server.handle(request, send)
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # the client went away
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_stream(self.server.runner, self.rfile, self.wfile)
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_socket_server(server: Server, path: str) -> UnixServer:
+    """Bind ``path`` for ``server``; serve_forever() the result to accept connections."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # left behind by a server that is gone
+        else:
+            raise OSError(f"A server is already listening on {path}")
+        finally:
+            probe.close()
+    umask = os.umask(0o077)
+    try:
+        unix = UnixServer(path, Handler)
+    finally:
+        os.umask(umask)
+    unix.runner = server
+    return unix
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="deepulang serve",
+        description="Keep a warm interpreter running and execute programs sent over a local "
+                    "socket (client: 'deepulang run --server FILE')",
+    )
+    parser.add_argument("--socket", metavar="PATH",
+                        help="Unix socket to listen on (default: $DEEPULANG_SOCKET, "
+                             "$XDG_RUNTIME_DIR/deepulang.sock or /tmp/deepulang-UID.sock)")
+    parser.add_argument("--stdio", action="store_true",
+                        help="Read requests from stdin and write replies to stdout instead")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, metavar="N",
+                        help=f"Parsed programs kept in memory (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Also keep parsed programs in this on-disk cache")
+    add_limit_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = Server(limit_options(args), args.cache_size, args.cache_dir)
+    if args.stdio:
+        serve_stream(server, sys.stdin.buffer, sys.stdout.buffer)
+        return 0
+    path = args.socket or default_socket_path()
+    try:
+        unix = make_socket_server(server, path)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"deepulang serve: listening on {path}", file=sys.stderr)
+    # Leave through the finally below (removing the socket) on SIGTERM too.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        unix.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        unix.server_close()
+        os.unlink(path)
+    return 0
@@ -42,6 +42,43 @@ class TokenType(Enum):
     IS_NOT_GT = auto()
     IS_NOT_LT = auto()
 
+# Module-level aliases of the members. Each TokenType.X lookup goes through
+# the Enum metaclass, roughly ten times slower than a plain global, so hot
+# paths import these and compare with `is`.
+PLUS = TokenType.PLUS
+MINUS = TokenType.MINUS
+STAR = TokenType.STAR
+SLASH = TokenType.SLASH
+LPAREN = TokenType.LPAREN
+RPAREN = TokenType.RPAREN
+NEWLINE = TokenType.NEWLINE
+EOF = TokenType.EOF
+NUMBER = TokenType.NUMBER
+STRING = TokenType.STRING
+IDENT = TokenType.IDENT
+LET = TokenType.LET
+BE = TokenType.BE
+SET = TokenType.SET
+TO = TokenType.TO
+IF = TokenType.IF
+THEN = TokenType.THEN
+OTHERWISE = TokenType.OTHERWISE
+END = TokenType.END
+WHILE = TokenType.WHILE
+DO = TokenType.DO
+REPEAT = TokenType.REPEAT
+TIMES = TokenType.TIMES
+SAY = TokenType.SAY
+AND = TokenType.AND
+OR = TokenType.OR
+NOT = TokenType.NOT
+IS_GT = TokenType.IS_GT
+IS_LT = TokenType.IS_LT
+IS_EQ = TokenType.IS_EQ
+IS_NE = TokenType.IS_NE
+IS_NOT_GT = TokenType.IS_NOT_GT
+IS_NOT_LT = TokenType.IS_NOT_LT
+
 KEYWORDS = {
     "let": TokenType.LET,
     "be": TokenType.BE,
@@ -72,11 +109,15 @@ MULTIWORD_COMPARATORS = [
 ]
 
 class Token:
+    __slots__ = ("type", "lexeme", "value", "line", "col")
+
     def __init__(self, type_, lexeme, value, line, col):
         self.type = type_
         self.lexeme = lexeme
         self.value = value
         self.line = line
         self.col = col
+    def __reduce__(self):
+        return (Token, (self.type, self.lexeme, self.value, self.line, self.col))
     def __repr__(self):
         return f"Token({self.type}, {self.lexeme}, {self.value}, {self.line}:{self.col})"
\ No newline at end of file
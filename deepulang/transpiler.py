@@ -0,0 +1,339 @@
+import re
+
+from .tokens import TokenType
+from .ast_nodes import *
+from .interpreter import Environment, Interpreter, RuntimeErrorDPL
+from .output import PrintOutput
+from .rope import concat, plain
+
+FILENAME = "<deepulang>"
+ENTRY = "_dpl_main"
+
+CHECKED_OPS = {
+    TokenType.PLUS: "_limits.add",
+    TokenType.MINUS: "_limits.sub",
+    TokenType.STAR: "_limits.mul",
+}
+
+BINARY_OPS = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.STAR: "*",
+}
+
+COMPARATORS = {
+    TokenType.IS_GT: "({} > {})",
+    TokenType.IS_LT: "({} < {})",
+    TokenType.IS_EQ: "({} == {})",
+    TokenType.IS_NE: "({} != {})",
+    TokenType.IS_NOT_GT: "(not ({} > {}))",
+    TokenType.IS_NOT_LT: "(not ({} < {}))",
+}
+
+NAME_IN_MESSAGE = re.compile(r"'(\w+)'")
+
+def divide(a, b):
+    return a // b if isinstance(a, int) and isinstance(b, int) else a / b
+
+def add(a, b):
+    return concat(a, b) if a.__class__ is str else a + b
+
+def repeat_count(count):
+    if not isinstance(count, int):
+        raise RuntimeErrorDPL("Repeat count must be integer")
+    return count
+
+class TranspileError(Exception):
+    pass
+
+class PythonSource:
+    """Generated Python module for a program.
+
+    ``line_map[i]`` is the DeepuLang line for generated line ``i + 1`` and
+    ``names`` maps mangled Python identifiers back to variable names.
+    ``ropes`` is set when its values may be Ropes (see deepulang.rope).
+    """
+    def __init__(self, source, line_map, names, ropes=False):
+        self.source = source
+        self.line_map = line_map
+        self.names = names
+        self.ropes = ropes
+
+    def dpl_line(self, py_line):
+        if 1 <= py_line <= len(self.line_map):
+            return self.line_map[py_line - 1]
+        return None
+
+class Transpiler(Visitor):
+    """Translate a Program into the source of a single Python function.
+
+    Variables become function locals (fast slots in CPython), loops become
+    native while/for loops and '/' keeps its int/float split via divide().
+    A 'set' of a variable that is not definitely declared at that point
+    first reads it, so the undefined-variable error still fires. With
+    Limits, loops count steps in a local and call ``_limits.tick`` once the
+    allowance is used up, and arithmetic goes through the checked operators;
+    if they count statements, every statement adds itself to them first.
+
+    CPython appends to a str local in place for ``s = s + x``, but copies
+    ``s`` for ``s = s + x + ","``, whose first '+' is not stored straight
+    back. Such chains are emitted as ``_add()`` calls, which build Ropes.
+    """
+    def __init__(self, limits=None):
+        self.counted = limits is not None and limits.counts_steps
+        self.checked = limits is not None and limits.checks_values
+        self.tallied = limits is not None and limits.counts_statements
+        self.lines = []
+        self.line_map = []
+        self.names = {}
+        self.indent = 0
+        self.current_line = None
+        self.defined = set()
+        self.temps = 0
+        # Checked '+' builds Ropes too (deepulang.limits).
+        self.ropes = self.checked
+
+    def transpile(self, program: Program) -> PythonSource:
+        self.indent = 2
+        self.block(program.statements)
+        body, body_map = self.lines, self.line_map
+        self.lines, self.line_map = [], []
+        self.current_line = None
+        self.indent = 0
+        self.write(f"def {ENTRY}(_rt, _div=_div, _repeat_count=_repeat_count, _say=_say, "
+                   f"_limits=_limits, _add=_add):")
+        self.indent = 1
+        if self.names:
+            # Continue from variables left by an earlier run on the same engine.
+            self.write("_env = _rt.env.values")
+            self.write("if _env:")
+            for py_name, name in self.names.items():
+                self.write(f"    if {name!r} in _env: {py_name} = _env[{name!r}]")
+        if self.counted:
+            self.write("_steps, _allow = 0, _limits.allowance()")
+        self.write("try:")
+        self.lines += body
+        self.line_map += body_map
+        if self.counted:
+            self.write("    _limits.tick(_steps)")
+        self.write("finally:")
+        self.write("    _rt.capture(locals())")
+        return PythonSource("\n".join(self.lines) + "\n", self.line_map, self.names, self.ropes)
+
+    # Helpers
+    def write(self, text):
+        self.lines.append("    " * self.indent + text)
+        self.line_map.append(self.current_line)
+
+    def mangle(self, name):
+        if name.isascii() and name.isidentifier():
+            py = f"v_{name}"
+        else:
+            py = "u_" + name.encode("utf-8").hex()
+        self.names[py] = name
+        return py
+
+    def block(self, stmts):
+        if not stmts:
+            self.write("pass")
+        for s in stmts:
+            self.current_line = s.line
+            if self.tallied:
+                self.write("_limits.statements += 1")
+            s.accept(self)
+
+    def nested_block(self, stmts):
+        # Declarations inside a branch or loop body are not definite afterwards.
+        saved = set(self.defined)
+        self.indent += 1
+        self.block(stmts)
+        self.indent -= 1
+        defined, self.defined = self.defined, saved
+        return defined
+
+    def expr(self, node):
+        return node.accept(self)
+
+    def value(self, name, node):
+        """Code for the value assigned to ``name``; appending chains become _add() calls.
+
+        Only chains of at least two '+' starting at ``name`` that add a
+        string literal, so arithmetic like ``n + 1`` stays a native '+'.
+        """
+        pieces = []
+        first = node
+        while isinstance(first, Binary) and first.op.type == TokenType.PLUS:
+            pieces.append(first.right)
+            first = first.left
+        if (self.checked or not (isinstance(first, Var) and first.name == name) or len(pieces) < 2
+                or not any(isinstance(p, Literal) and isinstance(p.value, str) for p in pieces)):
+            return self.expr(node)
+        code = self.expr(first)
+        for piece in reversed(pieces):
+            code = f"_add({code}, {self.expr(piece)})"
+        self.ropes = True
+        return code
+
+    # Statements
+    def visit_VarDecl(self, node: VarDecl):
+        self.write(f"{self.mangle(node.name)} = {self.value(node.name, node.expr)}")
+        self.defined.add(node.name)
+
+    def visit_Assign(self, node: Assign):
+        target = self.mangle(node.name)
+        value = self.value(node.name, node.expr)
+        if node.name in self.defined:
+            self.write(f"{target} = {value}")
+            return
+        self.temps += 1
+        temp = f"_t{self.temps}"
+        self.write(f"{temp} = {value}")
+        self.write(target)
+        self.write(f"{target} = {temp}")
+        self.defined.add(node.name)
+
+    def visit_Print(self, node: Print):
+        self.write(f"_say({self.expr(node.expr)})")
+
+    def visit_If(self, node: If):
+        self.write(f"if {self.expr(node.condition)}:")
+        then_defined = self.nested_block(node.then_block)
+        if node.else_block is None:
+            return
+        self.current_line = node.line
+        self.write("else:")
+        else_defined = self.nested_block(node.else_block)
+        self.defined |= then_defined & else_defined
+
+    def visit_While(self, node: While):
+        self.write(f"while {self.expr(node.condition)}:")
+        self.nested_block(node.body)
+        self.back_edge(node)
+
+    def visit_Repeat(self, node: Repeat):
+        self.write(f"for _ in range(_repeat_count({self.expr(node.count_expr)})):")
+        self.nested_block(node.body)
+        self.back_edge(node)
+
+    def back_edge(self, node):
+        if not self.counted:
+            return
+        self.current_line = node.line
+        self.indent += 1
+        self.write(f"_steps += {max(1, len(node.body))}")
+        self.write("if _steps >= _allow:")
+        self.write("    _allow = _limits.tick(_steps)")
+        self.write("    _steps = 0")
+        self.indent -= 1
+
+    # Expressions
+    def visit_Comparison(self, node: Comparison):
+        template = COMPARATORS.get(node.op.type)
+        if template is None:
+            raise TranspileError(f"Unknown comparator {node.op.type}")
+        return template.format(self.expr(node.left), self.expr(node.right))
+
+    def visit_Binary(self, node: Binary):
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if node.op.type == TokenType.SLASH:
+            return f"_div({left}, {right})"
+        if self.checked and node.op.type in CHECKED_OPS:
+            return f"{CHECKED_OPS[node.op.type]}({left}, {right})"
+        op = BINARY_OPS.get(node.op.type)
+        if op is None:
+            raise TranspileError(f"Unknown binary operator {node.op.type}")
+        return f"({left} {op} {right})"
+
+    def visit_Unary(self, node: Unary):
+        right = self.expr(node.right)
+        if node.op.type == TokenType.MINUS:
+            return f"(-{right})"
+        if node.op.type == TokenType.NOT:
+            return f"(not {right})"
+        raise TranspileError(f"Unknown unary operator {node.op.type}")
+
+    def visit_Literal(self, node: Literal):
+        return repr(node.value)
+
+    def visit_Var(self, node: Var):
+        return self.mangle(node.name)
+
+def transpile(program: Program, limits=None) -> PythonSource:
+    return Transpiler(limits).transpile(program)
+
+class PyInterpreter:
+    """Engine that runs a program as compiled Python bytecode.
+
+    The program is transpiled, compile()d and executed; Python errors are
+    mapped back to DeepuLang semantics (undefined variables raise
+    RuntimeErrorDPL) and tagged with the DeepuLang line they came from.
+    Programs CPython refuses to compile (e.g. nesting beyond its static
+    block limits) fall back to the tree-walking Interpreter.
+    """
+    def __init__(self, output=None, limits=None):
+        self.env = Environment()
+        self.output = output if output is not None else PrintOutput()
+        self.limits = limits
+        self.generated = None
+
+    def interpret(self, program: Program):
+        generated = transpile(program, self.limits)
+        try:
+            code = compile(generated.source, FILENAME, "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            fallback = Interpreter(self.output, self.limits)
+            fallback.env = self.env
+            fallback.interpret(program)
+            return
+        self.generated = generated
+        say = self.output.say
+        if generated.ropes:
+            say = lambda value, say=say: say(plain(value))
+        namespace = {"_div": divide, "_repeat_count": repeat_count, "_say": say,
+                     "_limits": self.limits, "_add": add}
+        exec(code, namespace)
+        try:
+            self.run_entry(namespace[ENTRY])
+        finally:
+            self.output.flush()
+
+    def run_entry(self, entry):
+        try:
+            entry(self)
+        except NameError as e:
+            name = self.variable_name(e)
+            err = RuntimeErrorDPL(f"Undefined variable '{name}'")
+            err.line = self.error_line(e)
+            raise err from None
+        except RuntimeErrorDPL as e:
+            e.line = self.error_line(e)
+            raise
+        except Exception as e:
+            line = self.error_line(e)
+            if line is not None and hasattr(e, "add_note"):
+                e.add_note(f"at DeepuLang line {line}")
+            raise
+
+    def capture(self, local_vars):
+        names = self.generated.names
+        for py_name, value in local_vars.items():
+            name = names.get(py_name)
+            if name is not None:
+                self.env.define(name, value)
+
+    def variable_name(self, error):
+        py_name = getattr(error, "name", None)
+        if py_name is None:
+            m = NAME_IN_MESSAGE.search(str(error))
+            py_name = m.group(1) if m else ""
+        return self.generated.names.get(py_name, py_name)
+
+    def error_line(self, error):
+        line = None
+        tb = error.__traceback__
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == FILENAME:
+                line = self.generated.dpl_line(tb.tb_lineno)
+            tb = tb.tb_next
+        return line
@@ -0,0 +1,169 @@
+from .compiler import *
+from .interpreter import UNDEFINED, Environment, RuntimeErrorDPL
+from .output import PrintOutput
+from .rope import Rope, concat
+
+class VM:
+    """Stack machine executing bytecode produced by compiler.Compiler.
+
+    Same interpret(program) contract as Interpreter. Programs are compiled
+    against ``env`` and run directly on its slot list; run() also accepts
+    Code compiled on its own, mirroring its variables into ``env``.
+    """
+    def __init__(self, output=None, limits=None):
+        self.env = Environment()
+        self.output = output if output is not None else PrintOutput()
+        self.limits = limits
+
+    def interpret(self, program: Program):
+        code = Compiler(self.env, self.limits).compile(program)
+        try:
+            self.execute(code, self.env.slots)
+        finally:
+            self.output.flush()
+
+    def run(self, code: Code):
+        values = self.env.values
+        slots = [values.get(name, UNDEFINED) for name in code.names]
+        try:
+            self.execute(code, slots)
+        finally:
+            self.output.flush()
+            for name, value in zip(code.names, slots):
+                if value is not UNDEFINED:
+                    self.env.define(name, value)
+
+    def execute(self, code, slots):
+        ops = code.ops
+        consts = code.consts
+        names = code.names
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        say = self.output.say
+        pc = 0
+        # Bind opcodes as locals: comparing against fast locals is much
+        # cheaper than a global lookup per test.
+        (load, load_const, store, define, add, sub, mul, div, neg, not_,
+         print_, jump, repeat_init, repeat_next, halt) = (
+            LOAD, LOAD_CONST, STORE, DEFINE, ADD, SUB, MUL, DIV, NEG, NOT,
+            PRINT, JUMP, REPEAT_INIT, REPEAT_NEXT, HALT)
+        (not_gt, not_lt, not_eq, not_ne, not_ngt, not_nlt) = (
+            JUMP_IF_NOT_GT, JUMP_IF_NOT_LT, JUMP_IF_NOT_EQ, JUMP_IF_NOT_NE,
+            JUMP_IF_NOT_NGT, JUMP_IF_NOT_NLT)
+        add_const, sub_const, mul_const = ADD_CONST, SUB_CONST, MUL_CONST
+        tick = TICK
+        text, rope = str, Rope
+        limits = self.limits
+        steps = 0
+        allowance = limits.allowance() if limits is not None else 0
+        # Opcodes are tested roughly in order of how often they run in loops.
+        while True:
+            op = ops[pc]
+            arg = ops[pc + 1]
+            pc += 2
+            if op == load:
+                value = slots[arg]
+                if value is UNDEFINED:
+                    raise RuntimeErrorDPL(f"Undefined variable '{names[arg]}'")
+                push(value)
+            elif op == load_const:
+                push(consts[arg])
+            elif op == store:
+                if slots[arg] is UNDEFINED:
+                    raise RuntimeErrorDPL(f"Undefined variable '{names[arg]}'")
+                slots[arg] = pop()
+            elif op == add_const:
+                left = stack[-1]
+                if left.__class__ is text:
+                    stack[-1] = concat(left, consts[arg])
+                else:
+                    stack[-1] = left + consts[arg]
+            elif op == sub_const:
+                stack[-1] = stack[-1] - consts[arg]
+            elif op == mul_const:
+                stack[-1] = stack[-1] * consts[arg]
+            elif op == add:
+                right = pop()
+                left = stack[-1]
+                if left.__class__ is text:
+                    stack[-1] = concat(left, right)
+                else:
+                    stack[-1] = left + right
+            elif op == sub:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == mul:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == jump:
+                pc = arg
+            elif op == tick:
+                steps += arg
+                if steps >= allowance:
+                    allowance = limits.tick(steps)
+                    steps = 0
+            elif op == not_lt:
+                right = pop()
+                if not pop() < right:
+                    pc = arg
+            elif op == not_gt:
+                right = pop()
+                if not pop() > right:
+                    pc = arg
+            elif op == repeat_next:
+                remaining = stack[-1]
+                if remaining > 0:
+                    stack[-1] = remaining - 1
+                else:
+                    pop()
+                    pc = arg
+            elif op == not_eq:
+                right = pop()
+                if not pop() == right:
+                    pc = arg
+            elif op == not_ne:
+                right = pop()
+                if not pop() != right:
+                    pc = arg
+            elif op == not_ngt:
+                right = pop()
+                if pop() > right:
+                    pc = arg
+            elif op == not_nlt:
+                right = pop()
+                if pop() < right:
+                    pc = arg
+            elif op == div:
+                right = pop()
+                left = stack[-1]
+                stack[-1] = left // right if isinstance(left, int) and isinstance(right, int) else left / right
+            elif op == define:
+                slots[arg] = pop()
+            elif op == neg:
+                stack[-1] = -stack[-1]
+            elif op == not_:
+                stack[-1] = not stack[-1]
+            elif op == print_:
+                value = pop()
+                say(value.flat() if value.__class__ is rope else value)
+            elif op == repeat_init:
+                if not isinstance(stack[-1], int):
+                    raise RuntimeErrorDPL("Repeat count must be integer")
+            elif op == CHECKED_ADD:
+                right = pop()
+                stack[-1] = limits.add(stack[-1], right)
+            elif op == CHECKED_SUB:
+                right = pop()
+                stack[-1] = limits.sub(stack[-1], right)
+            elif op == CHECKED_MUL:
+                right = pop()
+                stack[-1] = limits.mul(stack[-1], right)
+            elif op == STATEMENT:
+                limits.statements += 1
+            elif op == halt:
+                if steps:
+                    limits.tick(steps)
+                return
+            else:
+                raise RuntimeErrorDPL(f"Unknown opcode {op}")
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from deepulang import parse_source
+from deepulang.aio import AsyncCaptureOutput, AsyncInterpreter, AsyncStreamOutput
+from deepulang.limits import LimitExceeded, Limits
+from deepulang.output import CaptureOutput
+
+COUNTER = (
+    'let i be 0\n'
+    'while i is less than {n} do\n'
+    '  say label\n'
+    '  set i to i + 1\n'
+    'end\n'
+)
+
+
+def start(source, output, **kwargs):
+    interp = AsyncInterpreter(output, **kwargs)
+    return interp, interp.run(parse_source(source))
+
+
+def test_run_is_a_coroutine_with_async_output():
+    out = AsyncCaptureOutput()
+    interp, coro = start('let x be 2\nrepeat 3 times\n  set x to x * x\nend\nsay x\n', out)
+    asyncio.run(coro)
+    assert out.lines == ["256"]
+    assert interp.env.values == {"x": 256}
+
+
+def test_programs_interleave_every_quantum():
+    shared = CaptureOutput()
+    programs = []
+    for label in "ab":
+        interp = AsyncInterpreter(shared, quantum=4)
+        interp.env.define("label", label)
+        programs.append(interp.run(parse_source(COUNTER.format(n=6))))
+
+    async def main():
+        await asyncio.gather(*programs)
+    asyncio.run(main())
+    # Two steps per iteration, so each program suspends after two 'say's.
+    assert "".join(shared.lines) == "aabbaabbaabb"
+
+
+def test_only_loops_and_async_say_suspend():
+    out = CaptureOutput()
+    interp = AsyncInterpreter(out)
+    assert not interp.can_suspend(parse_source('if 1 is equal to 1 then\n  say 1\nend\n').statements[0])
+    assert AsyncInterpreter(AsyncCaptureOutput()).can_suspend(parse_source('say 1\n').statements[0])
+
+
+def test_other_tasks_run_while_a_program_spins():
+    ticks = []
+
+    async def ticker():
+        for _ in range(3):
+            ticks.append(len(ticks))
+            await asyncio.sleep(0)
+
+    async def main():
+        _, coro = start(COUNTER.format(n=5000).replace("say label", "say i"), CaptureOutput(),
+                        quantum=100)
+        task = asyncio.ensure_future(coro)
+        await ticker()
+        assert not task.done()
+        await task
+    asyncio.run(main())
+    assert ticks == [0, 1, 2]
+
+
+def test_errors_and_limits_propagate():
+    with pytest.raises(LimitExceeded, match="Step limit of 50 exceeded"):
+        asyncio.run(start('while 1 is less than 2 do\n  say 1\nend\n', AsyncCaptureOutput(),
+                          limits=Limits(max_steps=50))[1])
+    out = AsyncCaptureOutput()
+    with pytest.raises(Exception, match="Undefined variable 'nope'"):
+        asyncio.run(start('repeat 3 times\n  say 1\nend\nsay nope\n', out, quantum=1)[1])
+    assert out.lines == ["1", "1", "1"]
+
+
+def test_stream_output_writes_to_writer():
+    class Writer:
+        def __init__(self):
+            self.data = b""
+            self.drains = 0
+
+        def write(self, data):
+            self.data += data
+
+        async def drain(self):
+            self.drains += 1
+
+    writer = Writer()
+    asyncio.run(start('repeat 3 times\n  say "héllo"\nend\n', AsyncStreamOutput(writer, high_water=8))[1])
+    assert writer.data == "héllo\n".encode() * 3
+    assert writer.drains == 2  # once past the high-water mark, once on flush
@@ -0,0 +1,51 @@
+import json
+
+from deepulang.batch import expand, run_batch
+from deepulang.cli import main
+
+
+def write_jobs(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for i in range(4):
+        (tmp_path / f"job{i}.dpl").write_text(f'let x be {i}\nsay x * 10\n', encoding="utf-8")
+    (tmp_path / "sub" / "bad.dpl").write_text('let a be 1\n\nsay missing\n', encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("not a program", encoding="utf-8")
+
+
+def test_expand_directories_and_globs(tmp_path):
+    write_jobs(tmp_path)
+    names = [p.rsplit("/", 1)[-1] for p in expand([str(tmp_path)])]
+    assert names == ["job0.dpl", "job1.dpl", "job2.dpl", "job3.dpl", "bad.dpl"]
+    assert len(expand([str(tmp_path / "**" / "*.dpl")])) == 5
+    assert len(expand([str(tmp_path / "job[12].dpl")])) == 2
+
+
+def test_each_program_is_isolated_and_reported_in_order(tmp_path):
+    write_jobs(tmp_path)
+    files = expand([str(tmp_path)])
+    for jobs in (1, 2):
+        results = list(run_batch(files, jobs=jobs, engine="closure"))
+        assert [r["file"] for r in results] == files
+        assert [r["output"] for r in results[:4]] == ["0\n", "10\n", "20\n", "30\n"]
+        assert [r["variables"] for r in results[:4]] == [{"x": i} for i in range(4)]
+        bad = results[4]
+        assert bad["ok"] is False
+        assert bad["error"] == "RuntimeErrorDPL: Undefined variable 'missing'"
+        assert all(r["seconds"] >= 0 for r in results)
+
+
+def test_batch_command_writes_report_and_exit_status(tmp_path, capsys):
+    write_jobs(tmp_path)
+    report = tmp_path / "report.jsonl"
+    status = main(["batch", str(tmp_path / "job*.dpl"), "-j", "1", "--no-cache",
+                   "--no-output", "--report", str(report)])
+    assert status == 0
+    lines = [json.loads(line) for line in report.read_text(encoding="utf-8").splitlines()]
+    assert [r["ok"] for r in lines] == [True] * 4
+    assert "output" not in lines[0]
+    assert "4 files, 0 failed" in capsys.readouterr().err
+    assert main(["batch", str(tmp_path), "-j", "1", "--no-cache"]) == 1
+    capsys.readouterr()
+    for flag in ("-O", "-O2"):
+        assert main(["batch", flag, str(tmp_path / "job1.dpl"), "-j", "1", "--no-cache"]) == 0
+        assert json.loads(capsys.readouterr().out)["output"] == "10\n"
@@ -0,0 +1,80 @@
+import os
+
+from deepulang import parse_source, run_file
+from deepulang.cache import ProgramCache, SUFFIX
+from deepulang.cli import main
+
+SOURCE = 'let x be 2\nrepeat 3 times\n  set x to x * 2\nend\nsay x\n'
+
+
+def entries(directory):
+    return sorted(p for p in os.listdir(directory) if p.endswith(SUFFIX))
+
+
+def test_round_trip_preserves_tree_and_lines(tmp_path):
+    cache = ProgramCache(tmp_path)
+    assert cache.load(SOURCE) is None
+    program = parse_source(SOURCE)
+    assert cache.store(SOURCE, program)
+    loaded = cache.load(SOURCE)
+    assert repr(loaded) == repr(program)
+    assert [s.line for s in loaded.statements] == [1, 2, 5]
+    body = loaded.statements[1].body[0]
+    assert (body.line, body.col, body.expr.col, body.expr.right.col) == (3, 3, 14, 16)
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+
+def test_get_or_parse_only_parses_on_miss(tmp_path):
+    cache = ProgramCache(tmp_path)
+    calls = []
+    def parse(source):
+        calls.append(source)
+        return parse_source(source)
+    first = cache.get_or_parse(SOURCE, parse)
+    second = cache.get_or_parse(SOURCE, parse)
+    assert repr(first) == repr(second)
+    assert len(calls) == 1
+    cache.get_or_parse(SOURCE + "say 1\n", parse)
+    assert len(calls) == 2
+
+
+def test_key_depends_on_version(tmp_path, monkeypatch):
+    cache = ProgramCache(tmp_path)
+    key = cache.key(SOURCE)
+    monkeypatch.setattr("deepulang.cache.__version__", "999")
+    assert cache.key(SOURCE) != key
+
+
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path):
+    cache = ProgramCache(tmp_path)
+    cache.path_for(SOURCE).write_bytes(b"garbage")
+    assert cache.load(SOURCE) is None
+    assert entries(tmp_path) == []
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    sources = [f"say {i}\n" for i in range(3)]
+    cache = ProgramCache(tmp_path)
+    for i, src in enumerate(sources):
+        cache.store(src, parse_source(src))
+        os.utime(cache.path_for(src), (1000 + i, 1000 + i))
+    size = cache.path_for(sources[0]).stat().st_size
+    assert cache.load(sources[0]) is not None  # refreshes its mtime
+    cache.max_bytes = size * 3
+    src = "say 3\n"
+    cache.store(src, parse_source(src))
+    assert cache.load(sources[1]) is None
+    assert cache.load(sources[0]) is not None
+    assert cache.load(src) is not None
+
+
+def test_run_file_and_cli_use_cache(tmp_path, capsys):
+    path = tmp_path / "prog.dpl"
+    path.write_text(SOURCE, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    run_file(str(path), cache_dir=cache_dir)
+    assert len(entries(cache_dir)) == 1
+    assert main([str(path), "--cache-dir", str(cache_dir), "--engine", "vm"]) == 0
+    assert main([str(path), "--no-cache"]) == 0
+    assert capsys.readouterr().out == "16\n16\n16\n"
+    assert len(entries(cache_dir)) == 1
@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import deepulang
+from deepulang import parse_source
+from deepulang.columnar import run_columns
+from deepulang.interpreter import RuntimeErrorDPL
+from deepulang.output import CaptureOutput
+
+from test_engines import random_block
+
+
+def test_columns_in_columns_out():
+    program = deepulang.compile(
+        'let total be price * qty - discount\n'
+        'if total is greater than 10 then\n  let big be total\n  say "big"\nend\n'
+        'let i be 0\nwhile i is less than qty do\n  set i to i + 1\nend\n'
+    )
+    output = CaptureOutput()
+    prices = np.array([3, 5, 4], dtype=np.int32)
+    result = program.run_columns({"price": prices, "qty": [4, 1, 3], "discount": 1, "id": "x"}, output)
+    assert result["total"].dtype == np.int64 and result["total"].tolist() == [11, 4, 11]
+    assert result["i"].tolist() == [4, 1, 3]
+    assert result["big"].tolist() == [11, None, 11]  # masked where never defined
+    assert result["id"] == "x"  # not mentioned: returned as given
+    assert output.lines == ["big", "big"]
+
+
+def test_first_failing_row_raises_after_earlier_output():
+    output = CaptureOutput()
+    with pytest.raises(ZeroDivisionError) as error:
+        run_columns(parse_source('say 10 / n\nsay "next"\n'), {"n": np.array([5, 2, 0, 0, 1])}, output)
+    assert error.value.row == 2
+    assert output.lines == ["2", "next", "5", "next"]
+    with pytest.raises(RuntimeErrorDPL, match="Undefined variable 'x'") as error:
+        run_columns(parse_source('if n is less than 0 then\n  let x be 1\nend\nsay x\n'),
+                    {"n": np.array([-1, 1])})
+    assert error.value.row == 1
+
+
+def test_values_that_do_not_fit_int64_stay_exact():
+    result = run_columns(parse_source('let y be x * x + 1\nlet s be t * 2\nlet z be -x\n'),
+                         {"x": np.array([3, 2 ** 62, -2 ** 63]), "t": np.array(["a", "bc", ""])})
+    assert result["y"].tolist() == [10, 2 ** 124 + 1, 2 ** 126 + 1]
+    assert result["z"].tolist() == [-3, -2 ** 62, 2 ** 63]
+    assert result["s"].tolist() == ["aa", "bcbc", ""]
+
+
+def test_optimizer_temporaries_are_not_returned():
+    program = deepulang.compile('let m be 2\nlet t be n\nrepeat 3 times\n'
+                                '  set t to t + m * m\n  say t\nend\n', opt_level=2)
+    assert any(s.name.startswith("$inv") for s in program.program.statements
+               if hasattr(s, "name"))
+    result = program.run_columns({"n": np.array([1, 2])}, CaptureOutput())
+    assert set(result) == {"n", "m", "t"} and result["t"].tolist() == [13, 14]
+    assert set(program.run({"n": 2})) == set(result)
+
+
+def test_rejects_ragged_columns():
+    with pytest.raises(ValueError):
+        run_columns(parse_source('say a\n'), {"a": [1, 2], "b": [1, 2, 3]})
+
+
+COLUMNS = [
+    lambda rng, n: np.array([rng.randint(-3, 9) for _ in range(n)]),
+    lambda rng, n: np.array([rng.random() < 0.5 for _ in range(n)]),
+    lambda rng, n: np.array([rng.choice([0.0, -0.0, 0.5, 2.0, -3.25, 1e300, float("nan")]) for _ in range(n)]),
+    lambda rng, n: np.array([rng.choice(["", "s", "xy"]) for _ in range(n)]),
+    lambda rng, n: np.array([rng.choice([2 ** 62, -2 ** 63, 2 ** 63 - 1, 2 ** 53 + 1, 7]) for _ in range(n)]),
+    lambda rng, n: np.array([rng.choice([2 ** 70, -3, "z", True]) for _ in range(n)], dtype=object),
+]
+
+
+def python_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def row_by_row(program, columns, rows):
+    """What running ``program`` once per row gives: output, and variables or (row, error)."""
+    output = CaptureOutput()
+    results = []
+    for row in range(rows):
+        inputs = {name: python_value(column[row]) for name, column in columns.items()}
+        try:
+            results.append(program.run(inputs, output))
+        except Exception as e:
+            return output.lines, (row, type(e), str(e))
+    return output.lines, results
+
+
+def all_at_once(program, columns, rows):
+    output = CaptureOutput()
+    try:
+        result = program.run_columns(columns, output)
+    except Exception as e:
+        return output.lines, (e.row, type(e), str(e))
+    values = []
+    for row in range(rows):
+        variables = {}
+        for name, column in result.items():
+            value = column.tolist()[row]
+            if value is not None:
+                variables[name] = value
+        values.append(variables)
+    return output.lines, values
+
+
+def typed(outcome):
+    lines, results = outcome
+    if isinstance(results, tuple):
+        return lines, results
+    return lines, [{name: (type(v), repr(v)) for name, v in row.items()} for row in results]
+
+
+def test_random_programs_match_row_by_row():
+    for seed in range(400):
+        rng = random.Random(seed)
+        source = "\n".join(random_block(rng, 0, [0])) + "\n"
+        program = deepulang.compile(source)
+        rows = 12
+        names = "abcq" if rng.random() < 0.5 else "abc"
+        columns = {name: rng.choice(COLUMNS)(rng, rows) for name in names}
+        assert typed(all_at_once(program, columns, rows)) == typed(row_by_row(program, columns, rows)), source
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+import deepulang
+from deepulang.interpreter import RuntimeErrorDPL
+from deepulang.output import CaptureOutput
+
+SOURCE = (
+    'let total be 0\n'
+    'repeat count times\n'
+    '  set total to total + step\n'
+    'end\n'
+    'say label + ": done"\n'
+)
+
+
+def test_compile_once_run_with_inputs():
+    program = deepulang.compile(SOURCE)
+    out = CaptureOutput()
+    result = program.run({"count": 3, "step": 5, "label": "a", "unused": 1}, output=out)
+    assert result == {"count": 3, "step": 5, "label": "a", "unused": 1, "total": 15}
+    assert out.lines == ["a: done"]
+    # Runs do not leak variables into each other.
+    assert program.run({"count": 1, "step": 2, "label": "b"}, output=CaptureOutput())["total"] == 2
+    with pytest.raises(RuntimeErrorDPL, match="Undefined variable 'step'"):
+        program.run({"count": 1, "label": "c"}, output=CaptureOutput())
+
+
+def test_optimizer_temporaries_are_not_returned():
+    program = deepulang.compile(SOURCE, opt_level=2)
+    result = program.run({"count": 5, "step": 3, "label": "a"}, output=CaptureOutput())
+    assert result == {"count": 5, "step": 3, "label": "a", "total": 15}
+
+
+def test_default_output_prints(capsys):
+    deepulang.compile('say x * 2\n', opt_level=2).run({"x": 21})
+    assert capsys.readouterr().out == "42\n"
+
+
+def test_concurrent_runs_are_isolated():
+    program = deepulang.compile(SOURCE)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(200):
+                out = CaptureOutput()
+                result = program.run({"count": i % 7, "step": n, "label": str(n)}, output=out)
+                assert result["total"] == (i % 7) * n
+                assert out.lines == [f"{n}: done"]
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
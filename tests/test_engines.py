@@ -0,0 +1,200 @@
+import random
+
+import pytest
+
+from deepulang import Lexer, Parser, Interpreter, run_stream
+from deepulang.engines import ENGINES, create_engine
+from deepulang.interpreter import RuntimeErrorDPL
+
+
+PROGRAMS = [
+    'let x be 5\nsay x\n',
+    'let x be 0\nrepeat 3 times\n  set x to x + 1\nend\nsay x\n',
+    'let n be 3\nwhile n is greater than 0 do\n  say n\n  set n to n - 1\nend\nsay "Lift off!"\n',
+    'let age be 20\nif age is greater than 17 then\n  say "adult"\notherwise\n  say "minor"\nend\n',
+    'let a be 7 / 2\nlet b be -a * 3\nlet c be not 0\nlet d be not "x"\nsay a\nsay b\nsay c\nsay d\n',
+    'let s be "ab" * 3\nsay s + "!"\nif s is not equal to "x" then\n  say "ne"\nend\n',
+    'let i be 0\nwhile i is not greater than 4 do\n  if i is not less than 2 then\n    say i\n  end\n  set i to i + 1\nend\n',
+    'repeat -2 times\n  say "never"\nend\nrepeat not 0 times\n  say "once"\nend\n',
+    'let x be 1\nrepeat 2 times\n  repeat 3 times\n    set x to x * 2\n  end\nend\nsay x\n',
+]
+
+ERROR_PROGRAMS = [
+    ('say y\n', "Undefined variable 'y'"),
+    ('set y to 1\n', "Undefined variable 'y'"),
+    ('repeat "3" times\n  say 1\nend\n', "Repeat count must be integer"),
+]
+
+
+def parse(src):
+    return Parser(Lexer(src).tokenize()).parse()
+
+
+def run(engine, src):
+    interp = create_engine(engine)
+    interp.interpret(parse(src))
+    return interp.env.values
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("src", PROGRAMS)
+def test_engine_matches_tree_walker(engine, src, capsys):
+    expected_env = run("tree", src)
+    expected_out = capsys.readouterr().out
+    env = run(engine, src)
+    assert capsys.readouterr().out == expected_out
+    assert env == expected_env
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("src,message", ERROR_PROGRAMS)
+def test_engine_runtime_errors(engine, src, message):
+    with pytest.raises(RuntimeErrorDPL, match=message):
+        run(engine, src)
+
+
+def random_expr(rng, depth=0):
+    roll = rng.random()
+    if depth > 2 or roll < 0.3:
+        return str(rng.randint(0, 9))
+    if roll < 0.6:
+        return rng.choice(['a', 'b', 'c', 'a', 'b', 'c', 'q'])
+    if roll < 0.65:
+        return rng.choice(['"s"', '"xy"'])
+    if roll < 0.75:
+        return f"{rng.choice(['-', 'not '])}{random_expr(rng, depth + 1)}"
+    if roll < 0.8:
+        return f"{random_expr(rng, depth + 1)} * {rng.randint(0, 3)}"
+    op = rng.choice(['+', '-', '/'])
+    return f"({random_expr(rng, depth + 1)} {op} {random_expr(rng, depth + 1)})"
+
+
+def random_condition(rng):
+    comparator = rng.choice([
+        'is greater than', 'is less than', 'is equal to', 'is not equal to',
+        'is not greater than', 'is not less than',
+    ])
+    return f"{random_expr(rng)} {comparator} {random_expr(rng)}"
+
+
+def random_block(rng, depth, counter):
+    lines = []
+    for _ in range(rng.randint(1, 4)):
+        roll = rng.random()
+        if depth < 2 and roll < 0.15:
+            lines.append(f"if {random_condition(rng)} then")
+            lines += random_block(rng, depth + 1, counter)
+            if rng.random() < 0.5:
+                lines.append("otherwise")
+                lines += random_block(rng, depth + 1, counter)
+            lines.append("end")
+        elif depth < 2 and roll < 0.25:
+            lines.append(f"repeat {rng.randint(-1, 3)} times")
+            lines += random_block(rng, depth + 1, counter)
+            lines.append("end")
+        elif depth < 2 and roll < 0.35:
+            counter[0] += 1
+            w = f"w{counter[0]}"
+            lines.append(f"let {w} be 0")
+            lines.append(f"while {w} is less than {rng.randint(0, 3)} do")
+            lines += random_block(rng, depth + 1, counter)
+            lines.append(f"set {w} to {w} + 1")
+            lines.append("end")
+        elif roll < 0.6:
+            lines.append(f"say {random_expr(rng)}")
+        else:
+            lines.append(f"set {rng.choice('abc')} to {random_expr(rng)}")
+    return lines
+
+
+def random_program(seed):
+    rng = random.Random(seed)
+    lines = [f"let {name} be {rng.randint(-3, 9)}" for name in 'abc']
+    lines += random_block(rng, 0, [0])
+    return "\n".join(lines) + "\n"
+
+
+def outcome(engine, src, capsys):
+    interp = create_engine(engine)
+    try:
+        interp.interpret(parse(src))
+        error = None
+    except Exception as e:
+        error = (type(e), str(e))
+    return capsys.readouterr().out, interp.env.values, error
+
+
+@pytest.mark.parametrize("engine", [e for e in ENGINES if e != "tree"])
+def test_random_programs_match_tree_walker(engine, capsys):
+    for seed in range(200):
+        src = random_program(seed)
+        assert outcome(engine, src, capsys) == outcome("tree", src, capsys), src
+
+
+def test_vm_keeps_variables_after_error(capsys):
+    interp = create_engine("vm")
+    with pytest.raises(RuntimeErrorDPL):
+        interp.interpret(parse('let x be 1\nsay x\nsay y\n'))
+    assert interp.env.values == {'x': 1}
+    assert capsys.readouterr().out == '1\n'
+
+
+def test_default_engine_is_tree_walker():
+    assert isinstance(create_engine(), Interpreter)
+
+
+def test_py_engine_maps_errors_to_source_lines():
+    interp = create_engine("py")
+    with pytest.raises(RuntimeErrorDPL, match="Undefined variable 'missing'") as info:
+        interp.interpret(parse('let x be 1\n\nif x is equal to 1 then\n  say missing\nend\n'))
+    assert info.value.line == 4
+    with pytest.raises(RuntimeErrorDPL, match="Repeat count must be integer") as info:
+        interp.interpret(parse('repeat "2" times\n  say 1\nend\n'))
+    assert info.value.line == 1
+
+
+def test_py_engine_handles_unicode_names_and_deep_nesting(capsys):
+    run("py", 'let größe be 3\nsay größe\n')
+    assert capsys.readouterr().out == '3\n'
+    # Deeper than CPython's static block limit: falls back to the tree walker.
+    depth = 25
+    src = 'let x be 0\n' + 'repeat 1 times\n' * depth + 'set x to x + 1\n' + 'end\n' * depth
+    assert run("py", src) == {'x': 1}
+
+
+class LineFeeder:
+    """Text stream that records what had been printed before each read."""
+    def __init__(self, lines, capsys):
+        self.lines = list(lines)
+        self.capsys = capsys
+        self.seen = []
+
+    def readline(self, size=-1):
+        self.seen.append(self.capsys.readouterr().out)
+        return self.lines.pop(0) if self.lines else ""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_stream_executes_statements_as_they_arrive(engine, capsys):
+    feeder = LineFeeder([
+        'say "first"\n',
+        'let x be 2\n',
+        'repeat 2 times\n',
+        '  set x to x * 3\n',
+        'end\n',
+        'say x\n',
+    ], capsys)
+    interp = run_stream(feeder, engine)
+    # Output of each statement is visible before the next line is read.
+    assert feeder.seen[1] == 'first\n'
+    assert feeder.seen[4] == ''  # the repeat block waits for its 'end'
+    assert feeder.seen[6] == '18\n'
+    assert interp.env.values == {'x': 18}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_keep_variables_across_interpret_calls(engine, capsys):
+    interp = create_engine(engine)
+    interp.interpret(parse('let x be 2\n'))
+    interp.interpret(parse('set x to x + 1\nsay x\n'))
+    assert capsys.readouterr().out == '3\n'
@@ -0,0 +1,188 @@
+import copy
+import random
+
+import pytest
+
+from deepulang import cli, incremental
+from deepulang.incremental import Document, split_lines
+from deepulang.lexer import Lexer, LexError
+from deepulang.parser import Parser, ParseError
+
+SOURCE = (
+    "let total be 0\n"
+    "set total to total + 12 * 3\n"
+    "if total is greater than 10 then\n"
+    "  say total\n"
+    "otherwise\n"
+    "  say 0\n"
+    "end\n"
+    "\n"
+    "# a comment\n"
+    "repeat 3 times\n"
+    "  set total to total - 1\n"
+    "end\n"
+    "say \"done\"\n"
+)
+
+
+def full_parse(text):
+    """What parsing ``text`` in one go gives, or its error."""
+    try:
+        program = Parser(Lexer(text).tokenize()).parse()
+    except (LexError, ParseError) as e:
+        return f"{type(e).__name__}: {e}"
+    return positions(program)
+
+
+def incremental_parse(document):
+    try:
+        program = document.program
+    except (LexError, ParseError) as e:
+        return f"{type(e).__name__}: {e}"
+    return positions(program)
+
+
+def positions(program):
+    """Every node with its position, and every other field's repr."""
+    out = []
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif hasattr(node, "__slots__") and hasattr(node, "line"):
+            out.append((type(node).__name__, node.line, node.col))
+            stack.extend(getattr(node, name) for name in node.__slots__)
+        else:
+            out.append(repr(node))
+    return out
+
+
+def test_split_lines_keeps_endings():
+    assert split_lines("a\nb") == ["a\n", "b"]
+    assert split_lines("a\n") == ["a\n"]
+    assert split_lines("") == []
+    assert "".join(split_lines(SOURCE)) == SOURCE
+
+
+def test_edits_match_a_full_parse():
+    document = Document(SOURCE)
+    assert incremental_parse(document) == full_parse(SOURCE)
+    document.edit((2, 22), (2, 24), "7")
+    document.edit((1, 1), (1, 1), "say 1\nsay 2\n")  # every later node moves down
+    document.edit((12, 5), (13, 1), "")              # joins two lines
+    assert incremental_parse(document) == full_parse(document.text)
+
+
+def test_only_the_edited_statement_is_reparsed():
+    document = Document(SOURCE * 50)
+    document.program
+    assert document.reparsed_lines == 13 * 50
+    document.edit((2, 22), (2, 24), "99")
+    assert document.program.statements[1].expr.right.left.value == 99
+    assert document.reparsed_lines == 1
+
+
+def test_error_is_kept_until_fixed():
+    document = Document(SOURCE)
+    document.program
+    document.edit((2, 1), (2, 4), "sat")
+    with pytest.raises(ParseError) as error:
+        document.program
+    assert str(error.value) == full_parse(document.text).split(": ", 1)[1]
+    # An edit elsewhere does not parse the broken line again...
+    document.edit((13, 6), (13, 10), "over")
+    with pytest.raises(ParseError):
+        document.program
+    assert document.reparsed_lines == 1
+    # ...and fixing it brings the program back.
+    document.edit((2, 1), (2, 4), "set")
+    assert incremental_parse(document) == full_parse(document.text)
+
+
+def test_unfinished_block_absorbs_the_lines_below():
+    document = Document(SOURCE)
+    document.program
+    document.edit((7, 1), (8, 1), "")  # drop the if's 'end'
+    assert incremental_parse(document) == full_parse(document.text)
+    document.edit((7, 1), (7, 1), "end\n")
+    assert incremental_parse(document) == full_parse(SOURCE)
+
+    document.edit((4, 7), (4, 7), '"')  # a string left open
+    assert incremental_parse(document) == full_parse(document.text)
+    assert incremental_parse(document).startswith("LexError: Unterminated string")
+
+
+def test_deleting_whole_segments():
+    document = Document(SOURCE * 2)
+    edits = [((9, 8), (15, 5), "end"), ((3, 2), (7, 5), "end\n"), ((2, 4), (10, 12), "end"),
+             ((3, 8), (4, 11), "  "), ((1, 1), (3, 10), "7"), ((1, 1), (2, 10), ""),
+             ((1, 1), (2, 1), '"'), ((1, 1), (2, 1), "#")]
+    for n, (start, end, text) in enumerate(edits, 1):
+        document.edit(start, end, text)
+        if n in (1, 4, 8):
+            assert incremental_parse(document) == full_parse(document.text)
+    assert all(line.endswith("\n") for line in document.lines[:-1])
+
+    document = Document(SOURCE)
+    document.program
+    lines = split_lines(SOURCE)
+    document.update("".join(lines[:9] + lines[12:]))  # the whole repeat block
+    document.edit((1, 1), (1, 1), "say 0\n")
+    assert incremental_parse(document) == full_parse(document.text)
+
+
+def test_a_copied_program_survives_later_edits():
+    document = Document("say 1\nsay 2\n")
+    kept = copy.deepcopy(document.program)
+    document.edit((1, 1), (1, 1), "say 0\n")
+    assert [stmt.line for stmt in kept.statements] == [1, 2]
+    assert [stmt.line for stmt in document.program.statements] == [1, 2, 3]
+
+
+def test_update_diffs_lines():
+    document = Document(SOURCE)
+    document.program
+    text = SOURCE.replace("say 0", "say 1 + 1")
+    document.update(text)
+    assert document.text == text
+    assert incremental_parse(document) == full_parse(text)
+    assert document.reparsed_lines < 13
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_random_edits_match_a_full_parse(seed):
+    rng = random.Random(seed)
+    pieces = ["", "\n", "end\n", "say 1\n", "x", " + ", '"', "#", "if a is 1 then\n", "(", ")", "7"]
+    document = Document(SOURCE * 2)
+    for _ in range(300):
+        if len(document.lines) < 10:
+            document.edit((len(document.lines) + 1, 1), (len(document.lines) + 1, 1), SOURCE)
+        lines = len(document.lines) + 1
+        start, end = sorted((rng.randint(1, lines), rng.randint(1, 16)) for _ in range(2))
+        text = rng.choice(pieces)
+        if rng.random() < 0.3:
+            # Delete whole lines, or up to a column of the last one (99 is
+            # past its end).
+            end = (start[0] + rng.randint(1, 6), rng.choice((1, 10, 99)))
+            start, text = (start[0], 1), ""
+        start, end = (min(start, (lines, 1)), min(end, (lines, 1)))
+        document.edit(start, end, text)
+        if rng.random() < 0.5:
+            assert incremental_parse(document) == full_parse(document.text)
+    assert incremental_parse(document) == full_parse(document.text)
+
+
+def test_watch_reruns_on_change(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "prog.dpl"
+    script.write_text("say 6 * 7\n")
+    watch = incremental.watch
+    monkeypatch.setattr(incremental, "watch", lambda *a, **kw: watch(*a, interval=0, rounds=1))
+    assert cli.main(["--watch", "--no-cache", str(script)]) == 0
+    out, err = capsys.readouterr()
+    assert out == "42\n"
+    assert "1 lines, re-parsed 1" in err
+
+    script.write_text("say )\n")
+    assert cli.main(["--watch", "--no-cache", str(script)]) == 0
+    assert "error: ParseError" in capsys.readouterr().err
@@ -0,0 +1,144 @@
+import tracemalloc
+
+import pytest
+
+from deepulang import run_file
+from deepulang.cli import main
+from deepulang.engines import ENGINES
+from deepulang.instrument import Observer, Stats, counting_limits
+from deepulang.limits import Limits
+from deepulang.output import CaptureOutput
+
+SOURCE = (
+    'let total be 0\n'
+    'repeat 4 times\n'
+    '  set total to total + 1\n'
+    '  say total\n'
+    'end\n'
+    'let done be 1\n'
+)
+
+
+class Recorder(Observer):
+    def __init__(self):
+        self.events = []
+
+    def phase_started(self, phase):
+        self.events.append(("start", phase))
+
+    def phase_finished(self, phase, seconds, counts):
+        assert seconds >= 0
+        self.events.append(("end", phase, dict(counts)))
+
+
+def finished(recorder):
+    return [e[1:] for e in recorder.events if e[0] == "end"]
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm", "py"])
+def test_run_file_reports_every_phase(tmp_path, engine):
+    path = tmp_path / "prog.dpl"
+    path.write_text(SOURCE, encoding="utf-8")
+    recorder = Recorder()
+    run_file(str(path), engine=engine, opt_level=1, output=CaptureOutput(), observer=recorder)
+    assert finished(recorder) == [
+        ("read", {"chars": len(SOURCE)}),
+        ("lex", {"tokens": 27}),
+        ("parse", {"nodes": 13}),
+        ("optimize", {"nodes": 13}),
+        # 3 top-level statements, 4 iterations of a 2-statement body.
+        ("run", {"statements": 11, "steps": 8, "variables": 2}),
+    ]
+
+
+def test_cache_phase_wraps_lex_and_parse_on_a_miss(tmp_path):
+    path = tmp_path / "prog.dpl"
+    path.write_text(SOURCE, encoding="utf-8")
+    phases = []
+    for _ in range(2):
+        recorder = Recorder()
+        run_file(str(path), cache_dir=tmp_path / "cache", output=CaptureOutput(), observer=recorder)
+        phases.append([e[:2] for e in recorder.events])
+    assert phases[0] == [("start", "read"), ("end", "read"), ("start", "cache"),
+                         ("start", "lex"), ("end", "lex"), ("start", "parse"), ("end", "parse"),
+                         ("end", "cache"), ("start", "run"), ("end", "run")]
+    assert phases[1] == [("start", "read"), ("end", "read"), ("start", "cache"), ("end", "cache"),
+                         ("start", "run"), ("end", "run")]
+
+
+def test_run_phase_is_reported_when_the_program_fails(tmp_path):
+    path = tmp_path / "bad.dpl"
+    path.write_text('let x be 1\nsay y\n', encoding="utf-8")
+    recorder = Recorder()
+    with pytest.raises(Exception, match="Undefined variable 'y'"):
+        run_file(str(path), output=CaptureOutput(), observer=recorder)
+    assert finished(recorder)[-1] == ("run", {"statements": 2, "steps": 0, "variables": 1})
+
+
+def test_stats_report(tmp_path, capsys):
+    path = tmp_path / "prog.dpl"
+    path.write_text(SOURCE, encoding="utf-8")
+    assert main([str(path), "--stats", "--no-cache", "--engine", "closure"]) == 0
+    captured = capsys.readouterr()
+    assert captured.out == "1\n2\n3\n4\n"
+    lines = captured.err.splitlines()
+    assert [line.split()[0] for line in lines] == ["phase", "read", "lex", "parse", "run", "total"]
+    assert lines[4].endswith("statements=11 steps=8 variables=2")
+
+    stats = Stats()
+    run_file(str(path), output=CaptureOutput(), observer=stats)
+    assert stats.as_dict()["lex"]["tokens"] == 27
+    assert set(stats.as_dict()["run"]) == {"seconds", "peak_rss_growth_kb", "statements", "steps",
+                                             "variables"}
+
+
+def test_stream_keeps_no_statements(tmp_path, capsys):
+    path = tmp_path / "long.dpl"
+    path.write_text("let x be 0\n" + "set x to x + 1\n" * 40000, encoding="utf-8")
+    tracemalloc.start()
+    try:
+        assert main(["--stream", "--no-cache", str(path)]) == 0
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 8 * 1024 * 1024
+
+    path.write_text(SOURCE, encoding="utf-8")
+    assert main(["--stream", "--stats", "--no-cache", str(path)]) == 0
+    assert "statements=11 steps=8 variables=2" in capsys.readouterr().err
+
+
+def test_counting_limits_leaves_the_callers_limits_alone():
+    limits = Limits(max_string_length=10)
+    counting = counting_limits(limits)
+    assert counting is not limits and counting.counts_steps
+    assert limits.max_steps is None and not limits.counts_steps
+    stepped = Limits(max_steps=5)
+    assert counting_limits(stepped).max_steps == 5 and not stepped.counts_statements
+
+
+BRANCHES = (
+    'let n be 0\n'
+    'repeat 3 times\n'
+    '  if n is less than 2 then\n'
+    '    set n to n + 1\n'
+    '    say n\n'
+    '  otherwise\n'
+    '    say "done"\n'
+    '  end\n'
+    'end\n'
+    'if n is equal to 2 then\n'
+    '  say "two"\n'
+    'end\n'
+)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_statements_executed_count_every_branch(tmp_path, engine):
+    path = tmp_path / "branches.dpl"
+    path.write_text(BRANCHES, encoding="utf-8")
+    recorder = Recorder()
+    run_file(str(path), engine=engine, output=CaptureOutput(), observer=recorder)
+    # let, repeat, if: 3; each iteration's if: 3, its branches 2 + 2 + 1;
+    # the last if's say: 1.
+    assert finished(recorder)[-1] == ("run", {"statements": 12, "steps": 3, "variables": 1})
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from deepulang import Parser
+from deepulang.lexer import Lexer, LexError
+
+
+def lex(src):
+    return [(t.type.name, t.lexeme, t.value, t.line, t.col) for t in Lexer(src).tokenize()]
+
+
+def test_token_stream_and_positions():
+    assert lex('let x be 5\nsay x\n') == [
+        ('LET', 'let', 'let', 1, 1), ('IDENT', 'x', 'x', 1, 5), ('BE', 'be', 'be', 1, 7),
+        ('NUMBER', '5', 5, 1, 10), ('NEWLINE', '\\n', None, 2, 1), ('SAY', 'say', 'say', 2, 1),
+        ('IDENT', 'x', 'x', 2, 5), ('NEWLINE', '\\n', None, 3, 1), ('EOF', '', None, 3, 1),
+    ]
+
+
+def test_comparators_strings_and_escapes():
+    assert lex('if a IS Not Greater Than 3 then say "a\\tb\\"c"\nend') == [
+        ('IF', 'if', 'if', 1, 1), ('IDENT', 'a', 'a', 1, 4),
+        ('IS_NOT_GT', 'is not greater than', None, 1, 25), ('NUMBER', '3', 3, 1, 26),
+        ('THEN', 'then', 'then', 1, 28), ('SAY', 'say', 'say', 1, 33),
+        ('STRING', 'a\tb"c', 'a\tb"c', 1, 38), ('NEWLINE', '\\n', None, 2, 1),
+        ('END', 'end', 'end', 2, 1), ('EOF', '', None, 2, 4),
+    ]
+
+
+def test_word_boundaries_comments_and_multiline_strings():
+    assert lex('is greater thanx is equal to5\n#c\n  say "x\ny" + 1') == [
+        ('IDENT', 'is', 'is', 1, 1), ('IDENT', 'greater', 'greater', 1, 4),
+        ('IDENT', 'thanx', 'thanx', 1, 12), ('IS_EQ', 'is equal to', None, 1, 29),
+        ('NUMBER', '5', 5, 1, 29), ('NEWLINE', '\\n', None, 2, 1), ('NEWLINE', '\\n', None, 3, 1),
+        ('SAY', 'say', 'say', 3, 3), ('STRING', 'x\ny', 'x\ny', 3, 8), ('PLUS', '+', None, 4, 4),
+        ('NUMBER', '1', 1, 4, 6), ('EOF', '', None, 4, 7),
+    ]
+
+
+def test_nul_ends_input():
+    assert lex('x\0 say') == [('IDENT', 'x', 'x', 1, 1), ('EOF', '', None, 1, 2)]
+
+
+@pytest.mark.parametrize("src,message", [
+    ('say "abc', "Unterminated string at 1:6"),
+    ('let x be 1\n  ! ', "Unexpected character '!' at 2:3"),
+    ('say ½', "Unexpected character '½' at 1:5"),
+])
+def test_errors(src, message):
+    with pytest.raises(LexError, match=message):
+        Lexer(src).tokenize()
+
+
+class ReadOnlyStream:
+    def __init__(self, text):
+        self.f = io.StringIO(text)
+
+    def read(self, size):
+        return self.f.read(size)
+
+
+STREAM_SOURCES = [
+    'let x be 5\nsay x\n',
+    'if a IS Not Greater Than 3 then say "a\\tb\\"c"\nend',
+    'is greater thanx is equal to5\n#c\n  say "x\ny" + 1',
+    'while index is less than 10 do # long comment here\n  set index to index + 1\nend\n',
+]
+
+
+@pytest.mark.parametrize("src", STREAM_SOURCES)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_streaming_matches_string_lexing(src, chunk_size):
+    expected = lex(src)
+    for stream in (io.StringIO(src), ReadOnlyStream(src)):
+        tokens = Lexer(stream, chunk_size=chunk_size).iter_tokens()
+        assert [(t.type.name, t.lexeme, t.value, t.line, t.col) for t in tokens] == expected
+
+
+def test_streaming_errors_match():
+    with pytest.raises(LexError, match="Unterminated string at 2:6"):
+        list(Lexer(io.StringIO('say 1\nsay "abc'), chunk_size=2).iter_tokens())
+
+
+def test_parser_pulls_tokens_lazily():
+    src = 'let x be 1\nrepeat 2 times\n  set x to x * 3\nend\n'
+    expected = Parser(Lexer(src).tokenize()).parse()
+    assert repr(Parser(Lexer(io.StringIO(src), chunk_size=4).iter_tokens()).parse()) == repr(expected)
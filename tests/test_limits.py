@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from deepulang import parse_source
+from deepulang.cli import main
+from deepulang.engines import ENGINES, create_engine
+from deepulang.interpreter import RuntimeErrorDPL
+from deepulang.limits import LimitExceeded, Limits
+from deepulang.optimizer import optimize
+from deepulang.output import CaptureOutput
+
+
+def run(source, engine, **limits):
+    return run_program(parse_source(source), engine, **limits)
+
+
+def run_program(program, engine, **limits):
+    interp = create_engine(engine, CaptureOutput(), Limits(**limits))
+    interp.interpret(program)
+    return interp
+
+
+def test_limit_exceeded_is_runtime_error():
+    assert issubclass(LimitExceeded, RuntimeErrorDPL)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_step_limit_stops_infinite_while(engine):
+    with pytest.raises(LimitExceeded, match="Step limit of 1000 exceeded"):
+        run('let i be 0\nwhile 1 is less than 2 do\n  set i to i + 1\nend\n', engine,
+            max_steps=1000)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_step_limit_stops_huge_repeat(engine):
+    with pytest.raises(LimitExceeded, match="Step limit"):
+        run('let n be 0\nrepeat 1000000000000 times\n  set n to n + 1\n  say n\nend\n', engine,
+            max_steps=50)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_steps_within_limit_run_to_completion(engine):
+    # 10 iterations of a two-statement body cost exactly 20 steps.
+    source = 'let i be 0\nwhile i is less than 10 do\n  set i to i + 1\n  say i\nend\n'
+    interp = run(source, engine, max_steps=20)
+    assert interp.env.get("i") == 10
+    with pytest.raises(LimitExceeded):
+        run(source, engine, max_steps=19)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_timeout(engine):
+    start = time.monotonic()
+    with pytest.raises(LimitExceeded, match="Time limit of 0.05s exceeded"):
+        run('let i be 0\nwhile 1 is less than 2 do\n  set i to i + 1\nend\n', engine,
+            timeout=0.05)
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_string_repeat_is_refused_before_building(engine):
+    with pytest.raises(LimitExceeded, match="String longer than 100 characters"):
+        run('let s be "ab" * 1000000000000\n', engine, max_string_length=100)
+    with pytest.raises(LimitExceeded, match="String longer than 5 characters"):
+        run('let s be "abc"\nset s to s + s\n', engine, max_string_length=5)
+    assert run('let s be "ab" * 2 + "c"\n', engine, max_string_length=5).env.get("s") == "ababc"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_int_bits(engine):
+    source = 'let n be 2\nrepeat 10 times\n  set n to n * n\nend\n'
+    with pytest.raises(LimitExceeded, match="Integer larger than 64 bits"):
+        run(source, engine, max_int_bits=64)
+    assert run('let n be 7 - 3 * 2\n', engine, max_int_bits=8).env.get("n") == 1
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_do_not_change_results(engine):
+    source = ('let total be 0\nlet i be 0\nwhile i is less than 50 do\n'
+              '  repeat 3 times\n    set total to total + i\n  end\n'
+              '  set i to i + 1\nend\nsay total\nsay total / 4\nsay "x" * 3 + "y"\n')
+    plain = create_engine(engine, CaptureOutput())
+    plain.interpret(parse_source(source))
+    limited = run(source, engine, max_steps=10 ** 6, timeout=60,
+                  max_string_length=100, max_int_bits=64)
+    assert limited.output.lines == plain.output.lines
+    assert limited.env.values == plain.env.values
+
+
+@pytest.mark.parametrize("level", [1, 2])
+@pytest.mark.parametrize("engine", ENGINES)
+def test_optimizer_does_not_fold_past_limits(engine, level):
+    for source, limits, message in (
+        ('let s be "abcdefghij" * 50\n', {"max_string_length": 20}, "String longer than 20"),
+        ('let n be 99999999999 * 99999999999 * 99999999999\n', {"max_int_bits": 16},
+         "Integer larger than 16 bits"),
+    ):
+        program = optimize(parse_source(source), level, Limits(**limits))
+        with pytest.raises(LimitExceeded, match=message):
+            run_program(program, engine, **limits)
+
+
+def test_cli_flags(tmp_path):
+    path = tmp_path / "spin.dpl"
+    path.write_text('while 1 is less than 2 do\n  say 1\nend\n', encoding="utf-8")
+    with pytest.raises(LimitExceeded):
+        main([str(path), "--no-cache", "--engine", "vm", "--buffer-output", "--max-steps", "10"])
+    path.write_text('let s be "abcdefghij" * 50\n', encoding="utf-8")
+    with pytest.raises(LimitExceeded):
+        main([str(path), "--no-cache", "-O1", "--max-string-length", "20"])
+
+
+def test_batch_job_gets_its_own_budget(tmp_path):
+    from deepulang.batch import run_job
+    path = tmp_path / "loop.dpl"
+    path.write_text('let i be 0\nwhile i is less than 30 do\n  set i to i + 1\nend\n',
+                    encoding="utf-8")
+    # Each job starts a fresh budget, so the second run is not charged for the first.
+    for _ in range(2):
+        assert run_job(str(path), limits={"max_steps": 30})["ok"]
+    result = run_job(str(path), limits={"max_steps": 29})
+    assert not result["ok"] and "LimitExceeded" in result["error"]
@@ -0,0 +1,238 @@
+import random
+
+import pytest
+
+from deepulang import parse_source
+from deepulang.cli import main
+from deepulang.ast_nodes import If, Repeat, VarDecl, While
+from deepulang.engines import ENGINES, create_engine
+from deepulang.interpreter import RuntimeErrorDPL
+from deepulang.limits import Limits
+from deepulang.optimizer import optimize
+
+from test_engines import random_program
+
+
+def statements(src, level=1):
+    return optimize(parse_source(src), level).statements
+
+
+def test_folds_literal_arithmetic_with_floor_division():
+    (decl,) = statements('let day be (60 * 60) * 24 / 7\n')
+    assert repr(decl.expr) == "Literal(value=12342)"
+    (decl,) = statements('let s be "ab" * 2 + "!"\n')
+    assert decl.expr.value == "abab!"
+    (decl,) = statements('let b be not (1 - 1)\n')
+    assert decl.expr.value is True
+
+
+def test_leaves_failing_and_oversized_expressions_for_runtime():
+    for src in ('say 1 / 0\n', 'say "a" + 1\n', 'say -"a"\n', 'say "x" * 100000\n',
+                f'say {10 ** 12} * "x"\n', 'say "a" * 600 + "b" * 600\n'):
+        (stmt,) = statements(src)
+        assert type(stmt.expr).__name__ in ("Binary", "Unary")
+    (decl,) = statements('let s be "a" * 512 + "b" * 512\n')
+    assert type(decl.expr.value) is str and len(decl.expr.value) == 1024
+    with pytest.raises(ZeroDivisionError):
+        create_engine().interpret(optimize(parse_source('say 1 / 0\n')))
+
+
+def test_removes_dead_branches_and_loops():
+    src = (
+        'if 1 is equal to 1 then\n  say "yes"\notherwise\n  say "no"\nend\n'
+        'if "a" is greater than "b" then\n  say "never"\nend\n'
+        'while 2 is less than 1 do\n  say "never"\nend\n'
+        'repeat 5 - 5 times\n  say "never"\nend\n'
+        'say "done"\n'
+    )
+    out = statements(src)
+    assert [repr(s.expr) for s in out] == ["Literal(value='yes')", "Literal(value='done')"]
+    assert [s.line for s in out] == [2, 15]
+
+
+def test_hoists_integer_invariants_out_of_loops(capsys):
+    src = (
+        'let n be 10\nlet total be 0\nlet i be 0\n'
+        'while i is less than n * 2 do\n'
+        '  set total to total + n * 3\n'
+        '  set i to i + 1\n'
+        '  let last be i\n'  # not a closed-form loop
+        'end\nsay total\n'
+    )
+    out = statements(src, level=2)
+    hoisted = [s for s in out if isinstance(s, VarDecl) and s.name.startswith("$inv")]
+    assert len(hoisted) == 2
+    loop = out[-2]
+    assert repr(loop.condition.right) == "Var(name='$inv1')"
+    assert repr(loop.body[0].expr.right) == "Var(name='$inv2')"
+    # i changes inside the loop, so 'i + 1' stays put.
+    assert "Var(name='i')" in repr(loop.body[1].expr)
+    create_engine().interpret(optimize(parse_source(src), 2))
+    assert capsys.readouterr().out == "600\n"
+
+
+def test_does_not_hoist_what_might_fail():
+    src = (
+        'let s be "a"\nlet n be 2\n'
+        'repeat 0 times\n  say s * n\n  say missing + 1\n  say n / 0\nend\n'
+    )
+    assert repr(statements(src, level=2)) == repr(statements(src, level=1))
+
+
+def outcome(engine, program, capsys, limits=None):
+    interp = create_engine(engine, None, limits)
+    try:
+        interp.interpret(program)
+        error = None
+    except Exception as e:
+        error = (type(e), str(e))
+    return capsys.readouterr().out, interp.env.variables, error
+
+
+@pytest.mark.parametrize("level", [1, 2])
+@pytest.mark.parametrize("engine", ["tree", "py"])
+def test_optimized_random_programs_behave_the_same(engine, level, capsys):
+    for seed in range(200):
+        program = parse_source(random_program(seed))
+        expected = outcome("tree", program, capsys)
+        assert outcome(engine, optimize(program, level), capsys) == expected, seed
+
+
+def test_closed_form_loops():
+    src = (
+        'let total be 0\nrepeat 5 times\n  set total to total + 2\nend\n'
+        'let n be 10\nlet sum be 0\n'
+        'while n is greater than 0 do\n  set sum to sum + n\n  set n to n - 1\nend\n'
+    )
+    out = statements(src, level=2)
+    assert not any(isinstance(s, (While, Repeat)) for s in out)
+    interp = create_engine()
+    interp.interpret(optimize(parse_source(src), 2))
+    assert interp.env.variables == {"total": 10, "n": 0, "sum": 55}
+    # What would take forever one iteration at a time:
+    interp.interpret(optimize(parse_source(
+        'let i be 0\nlet t be 0\n'
+        'while i is less than 10000000000 do\n  set i to i + 3\n  set t to t + i\nend\n'), 2))
+    assert interp.env.values["i"] == 10000000002
+    assert interp.env.values["t"] == 3 * 3333333334 * 3333333335 // 2  # 3 + 6 + ... + i
+
+
+def test_closed_form_only_for_plain_integer_updates():
+    for body in ('  set x to x + 1\n  say x\n',           # output
+                 '  set x to x * 2\n',                     # not a sum
+                 '  set x to x + 1\n  set x to x + 1\n',  # set twice
+                 '  set x to x + y\n  set y to y + x\n',  # sums of sums
+                 '  set s to s + "!"\n'):                  # not an int
+        src = f'let x be 0\nlet y be 0\nlet s be ""\nrepeat 3 times\n{body}end\n'
+        assert isinstance(statements(src, level=2)[-1], Repeat), body
+    # The step of the compared variable must be a literal moving it towards the bound.
+    for loop in ('while x is less than 9 do\n  set x to x + y\nend\n',
+                 'while 9 is greater than x do\n  set x to x + 0\nend\n',
+                 'while x is equal to 0 do\n  set x to x + 1\nend\n'):
+        assert isinstance(statements(f'let x be 0\nlet y be 1\n{loop}', level=2)[-1], While), loop
+    # An inner loop can still be replaced when the outer one cannot.
+    out = statements('let t be 0\nlet u be 0\nrepeat 3 times\n'
+                     '  repeat 4 times\n    set t to t + 1\n  end\n  set u to u + t\nend\n', level=2)
+    assert isinstance(out[-1], Repeat) and isinstance(out[-1].body[1], If)
+
+
+COMPARATORS = {1: ("is less than", "is not greater than"), -1: ("is greater than", "is not less than")}
+FLIPPED = {"is less than": "is greater than", "is greater than": "is less than",
+           "is not greater than": "is not less than", "is not less than": "is not greater than"}
+
+
+def random_loop(seed):
+    """Accumulation loops of the closed-form shapes, and near misses."""
+    rng = random.Random(seed)
+    names = ["i", "j", "k", "m"]
+    lines = [f"let {name} be {rng.choice(['0', '3', '-2', 'not 0', 'not 1', '7 / 2'])}"
+             for name in names]
+    lines += ['let n be 4', 'let s be "s"']
+    for _ in range(rng.randint(1, 3)):
+        updated = rng.sample(names, rng.randint(1, 4))
+        body = []
+        for name in updated:
+            other = rng.choice(names)
+            body.append(f"set {name} to " + rng.choice([
+                f"{name} + {rng.randint(-3, 3)}", f"{name} - {rng.randint(-3, 3)}",
+                f"{rng.randint(-3, 3)} + {name}", f"{name} + n * 2", f"{name} - -n",
+                f"{name} + {other}", f"{name} - {other} + 1", f"{rng.randint(-3, 3)}",
+                f"{name} * 2", f"{other}", f"-{name} + 1", f"{name} + not n",
+            ]))
+        if rng.random() < 0.1:
+            body.append(rng.choice([f"say {updated[0]}", f"set {updated[0]} to {updated[0]} + s"]))
+        rng.shuffle(body)
+        if rng.random() < 0.5:
+            lines.append(f"repeat {rng.choice(['-1', '0', '1', '5', 'n', 'n - 6', 'not n'])} times")
+        else:
+            # Only loops that end: the compared variable steps towards the bound.
+            var = rng.choice(names)
+            step = rng.choice([-3, -1, 1, 2])
+            body = [line for line in body if not line.startswith(f"set {var} ")]
+            body.insert(rng.randint(0, len(body)), f"set {var} to {var} + {step}")
+            comparator = rng.choice(COMPARATORS[1 if step > 0 else -1])
+            bound = rng.randint(-6, 12)
+            if rng.random() < 0.5:
+                lines.append(f"while {var} {comparator} {bound} do")
+            else:
+                lines.append(f"while {bound} {FLIPPED[comparator]} {var} do")
+        lines += [f"  {line}" for line in body]
+        lines.append("end")
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_closed_form_loops_behave_the_same(engine, capsys):
+    for seed in range(300):
+        src = random_loop(seed)
+        expected = outcome("tree", parse_source(src), capsys)
+        assert outcome(engine, optimize(parse_source(src), 2), capsys) == expected, src
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_optimized_loops_behave_the_same_under_limits(engine, capsys):
+    src = ('let i be 0\nlet t be 0\n'
+           'while i is less than 60000 do\n  set i to i + 1\n  set t to t + i\nend\nsay t\n')
+    program = parse_source(src)
+    assert outcome(engine, optimize(program, 2, Limits(max_int_bits=31)), capsys,
+                   Limits(max_int_bits=31))[0] == "1800030000\n"
+    for limits in ({"max_int_bits": 6}, {"max_steps": 20}):
+        for seed in range(150):
+            program = parse_source(random_loop(seed))
+            expected = outcome("tree", program, capsys, Limits(**limits))
+            optimized = optimize(program, 2, Limits(**limits))
+            assert outcome(engine, optimized, capsys, Limits(**limits)) == expected, (limits, seed)
+    # A decided if, a dead loop or hoisted temporaries must not change how
+    # many statements a loop body has, which is what an iteration costs.
+    # Engines may stop at different points within an iteration, so each is
+    # compared with itself unoptimized.
+    sources = ['let n be 0\nrepeat 10 times\n  if 1 is equal to 1 then\n'
+               '    set n to n + 1\n    set n to n + 1\n    set n to n + 1\n  end\nend\n',
+               'let i be 0\nlet n be 0\nrepeat 5 times\n  set i to i + 1\n  repeat 2 times\n'
+               '    set n to n + i * i\n  end\nend\n']
+    sources += [random_program(seed) for seed in range(150)]
+    for src in sources:
+        program = parse_source(src)
+        for max_steps in (3, 15):
+            expected = outcome(engine, program, capsys, Limits(max_steps=max_steps))
+            for level in (1, 2):
+                optimized = optimize(program, level, Limits(max_steps=max_steps))
+                assert outcome(engine, optimized, capsys, Limits(max_steps=max_steps)) == expected, \
+                    (level, max_steps, src)
+
+
+def test_rejects_unknown_level():
+    with pytest.raises(ValueError):
+        optimize(parse_source('say 1\n'), 3)
+
+
+@pytest.mark.parametrize("flag, level", [("-O", 1), ("-O1", 1), ("-O2", 2), ("-O0", 0)])
+def test_cli_levels(tmp_path, capsys, flag, level):
+    path = tmp_path / "prog.dpl"
+    path.write_text("let n be 0\nrepeat 10 times\n  set n to n + 1\nend\nsay 2 * 3\n", encoding="utf-8")
+    assert main([flag, str(path), "--no-cache"]) == 0
+    assert capsys.readouterr().out == "6\n"
+    main([flag, "--ast", str(path), "--no-cache"])
+    tree = capsys.readouterr().out
+    assert ("Literal(value=6)" in tree) == (level > 0)
+    assert ("Repeat(" in tree) == (level < 2)
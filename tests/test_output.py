@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from deepulang import parse_source
+from deepulang.engines import ENGINES, create_engine
+from deepulang.interpreter import RuntimeErrorDPL
+from deepulang.output import BufferedOutput, CaptureOutput
+
+SOURCE = 'let i be 0\nrepeat 3 times\n  say i\n  set i to i + 1\nend\nsay "done"\n'
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_write_to_injected_output(engine, capsys):
+    out = CaptureOutput()
+    create_engine(engine, out).interpret(parse_source(SOURCE))
+    assert out.lines == ["0", "1", "2", "done"]
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_buffered_output_is_flushed_on_error(engine):
+    stream = io.StringIO()
+    interp = create_engine(engine, BufferedOutput(stream, buffer_size=1 << 20))
+    with pytest.raises(RuntimeErrorDPL):
+        interp.interpret(parse_source('say 1\nsay "two"\nsay missing\n'))
+    assert stream.getvalue() == "1\ntwo\n"
+
+
+def test_buffered_output_writes_in_chunks():
+    class Recorder(io.StringIO):
+        writes = 0
+        def write(self, data):
+            self.writes += 1
+            return super().write(data)
+
+    stream = Recorder()
+    out = BufferedOutput(stream, buffer_size=10)
+    for i in range(6):
+        out.say(f"line{i}")
+    assert stream.writes == 3
+    out.flush()
+    assert stream.getvalue() == "".join(f"line{i}\n" for i in range(6))
+
+
+def test_binary_fast_path_keeps_order_with_text_writes():
+    raw = io.BytesIO()
+    stream = io.TextIOWrapper(raw, encoding="utf-8")
+    stream.write("before\n")
+    out = BufferedOutput(stream, binary=True)
+    out.say("größe")
+    out.say(True)
+    out.flush()
+    assert raw.getvalue() == "before\ngröße\nTrue\n".encode("utf-8")
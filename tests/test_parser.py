@@ -0,0 +1,55 @@
+import pytest
+
+from deepulang.ast_nodes import Binary, Unary
+from deepulang.lexer import Lexer
+from deepulang.parser import Parser, ParseError
+
+
+def expr(src):
+    return Parser(Lexer(f"say {src}\n").tokenize()).parse().statements[0].expr
+
+
+def shape(node):
+    """Fully parenthesized form of an expression, with operator positions."""
+    if isinstance(node, Binary):
+        return f"({shape(node.left)} {node.op.lexeme}@{node.col} {shape(node.right)})"
+    if isinstance(node, Unary):
+        return f"({node.op.lexeme}@{node.col} {shape(node.right)})"
+    return repr(getattr(node, "value", getattr(node, "name", None)))
+
+
+@pytest.mark.parametrize("src, expected", [
+    ("1 + 2 * 3", "(1 +@7 (2 *@11 3))"),
+    ("1 - 2 - 3", "((1 -@7 2) -@11 3)"),
+    ("8 / 4 / 2", "((8 /@7 4) /@11 2)"),
+    ("(1 + 2) * 3", "((1 +@8 2) *@13 3)"),
+    ("-a * b", "((-@5 'a') *@8 'b')"),
+    ("a - -b", "('a' -@7 (-@9 'b'))"),
+    ("not - (x)", "(not@5 (-@9 'x'))"),
+    ("2 * (3 + (4 - 5)) / -6", "((2 *@7 (3 +@12 (4 -@17 5))) /@23 (-@25 6))"),
+])
+def test_precedence_associativity_and_positions(src, expected):
+    assert shape(expr(src)) == expected
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 20000
+    node = expr("(" * depth + "x" + ")" * depth)
+    assert node.name == "x" and node.col == 5 + depth
+    node = expr("- " * depth + "1")
+    for _ in range(depth):
+        node = node.right
+    assert node.value == 1
+
+
+@pytest.mark.parametrize("src, message", [
+    ("say (1 + 2\n", "Expected ')' at line 2:1"),
+    ("say 1 +\n", "Unexpected token in expression"),
+    ("say )\n", "Unexpected token in expression"),
+    ("then\n", "Unexpected token"),
+    ("if 1 then\nend\n", "Expected comparator in condition"),
+    ("let x 1\n", "Expected 'be' at line 1:7"),
+])
+def test_errors(src, message):
+    with pytest.raises(ParseError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        Parser(Lexer(src).tokenize()).parse()
@@ -0,0 +1,97 @@
+import itertools
+import json
+
+import pytest
+
+from deepulang import parse_source
+from deepulang.cli import main
+from deepulang.optimizer import optimize
+from deepulang.output import CaptureOutput
+from deepulang.profiler import ProfilingInterpreter
+from deepulang.resolver import resolve
+from deepulang.interpreter import Environment
+
+SOURCE = (
+    'let i be 0\n'
+    'while i is less than 3 do\n'
+    '  if i is equal to 1 then\n'
+    '    say i * 10\n'
+    '  end\n'
+    '  set i to i + 1\n'
+    'end\n'
+)
+
+
+def positions(node):
+    return (node.line, node.col)
+
+
+def test_parser_records_positions_on_every_node():
+    program = parse_source(SOURCE)
+    loop = program.statements[1]
+    assert positions(loop) == (2, 1)
+    assert positions(loop.condition) == positions(loop.condition.left) == (2, 7)
+    say = loop.body[0].then_block[0]
+    assert positions(say) == (4, 5)
+    assert positions(say.expr) == (4, 11)  # the '*'
+    assert positions(say.expr.left) == (4, 9)
+    assert positions(parse_source('say -x\n').statements[0].expr) == (1, 5)
+
+
+def test_positions_survive_resolve_and_optimize():
+    # The 'say' keeps the loop a loop (see test_optimizer's closed-form tests).
+    program = optimize(parse_source('let x be 1\nrepeat 2 times\n  set x to x + 2 * 3\n  say x\nend\n'), 2)
+    resolved = resolve(program, Environment())
+    assign = resolved.statements[1].body[0]
+    assert positions(assign) == (3, 3)
+    assert positions(assign.expr) == (3, 14)
+    assert positions(assign.expr.left) == (3, 12)
+
+
+def run_profiled(source):
+    ticks = itertools.count()
+    interp = ProfilingInterpreter(CaptureOutput(), clock=lambda: next(ticks))
+    interp.interpret(parse_source(source))
+    return interp
+
+
+def test_profile_counts_lines_and_node_types():
+    interp = run_profiled(SOURCE)
+    assert interp.output.lines == ["10"]
+    profile = interp.profile
+    counts = {line: (s.kind, s.count) for line, s in profile.lines.items()}
+    assert counts == {1: ("let", 1), 2: ("while", 1), 3: ("if", 3), 4: ("say", 1), 6: ("set", 3)}
+    assert profile.node_counts["Comparison"] == 7
+    assert profile.node_counts["Binary"] == 4
+    # Every statement reads the clock twice; total includes nested statements.
+    assert profile.lines[4].total == profile.lines[4].self_time == 1
+    assert profile.lines[3].total == 3 * 1 + 2
+    loop = profile.lines[2]
+    assert loop.total - loop.self_time == sum(profile.lines[n].total for n in (3, 6))
+
+
+def test_collapsed_stacks_and_json():
+    profile = run_profiled(SOURCE).profile
+    stacks = dict(line.rsplit(" ", 1) for line in profile.collapsed().splitlines())
+    assert stacks["line 2 while;line 3 if;line 4 say"] == "1000000"
+    assert set(stacks) == {"line 1 let", "line 2 while", "line 2 while;line 3 if",
+                           "line 2 while;line 3 if;line 4 say", "line 2 while;line 6 set"}
+    data = json.loads(profile.json())
+    assert [entry["line"] for entry in data["lines"]] == [1, 2, 3, 4, 6]
+    assert data["node_counts"]["If"] == 3
+    with pytest.raises(ValueError):
+        profile.render("xml")
+
+
+def test_cli_profile(tmp_path, capsys):
+    path = tmp_path / "prog.dpl"
+    path.write_text(SOURCE + 'say nope\n', encoding="utf-8")
+    report = tmp_path / "profile.txt"
+    with pytest.raises(Exception, match="Undefined variable 'nope'"):
+        main([str(path), "--no-cache", "--profile", "--profile-file", str(report)])
+    # The report is written even though the program failed.
+    text = report.read_text(encoding="utf-8")
+    assert "while" in text and "Comparison" in text
+    assert capsys.readouterr().out == "10\n"
+    with pytest.raises(SystemExit):
+        main([str(path), "--profile", "--engine", "vm"])
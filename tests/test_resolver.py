@@ -0,0 +1,57 @@
+import pytest
+
+from deepulang import parse_source
+from deepulang.ast_nodes import SlotAssign, SlotDecl, SlotVar
+from deepulang.interpreter import Environment, Interpreter, RuntimeErrorDPL
+from deepulang.resolver import check, resolve
+
+
+def test_rewrites_variables_to_shared_slots():
+    env = Environment()
+    program = resolve(parse_source('let x be 1\nlet y be x\nset x to y + 1\n'), env)
+    decl_x, decl_y, assign = program.statements
+    assert isinstance(decl_x, SlotDecl) and isinstance(assign, SlotAssign)
+    assert isinstance(decl_y.expr, SlotVar)
+    assert decl_x.slot == assign.slot == decl_y.expr.slot == env.index["x"]
+    assert [s.line for s in program.statements] == [1, 2, 3]
+    # A later program reuses the slots already allocated in the environment.
+    again = resolve(parse_source('say y\n'), env)
+    assert again.statements[0].expr.slot == env.index["y"]
+
+
+def test_environment_slots_and_values_snapshot():
+    env = Environment()
+    env.slot("later")
+    env.define("x", 1)
+    assert env.values == {"x": 1}
+    assert env.get("x") == 1
+    with pytest.raises(RuntimeErrorDPL, match="Undefined variable 'later'"):
+        env.get("later")
+    with pytest.raises(RuntimeErrorDPL, match="Undefined variable 'nope'"):
+        env.assign("nope", 2)
+
+
+def test_static_undefined_variable_diagnostics():
+    src = (
+        'say x\n'
+        'let x be 1\n'
+        'if x is equal to 1 then\n  let y be 2\nend\n'
+        'say y\n'
+        'set z to 3\n'
+        'while x is less than 3 do\n'
+        '  if x is greater than 1 then\n    say w\n  end\n'
+        '  let w be x\n'
+        '  set x to x + 1\n'
+        'end\n'
+    )
+    assert check(parse_source(src)) == [
+        "line 1: variable 'x' is used before it is declared",
+        "line 7: variable 'z' is never declared",
+    ]
+
+
+def test_diagnostics_know_variables_from_earlier_runs():
+    interp = Interpreter()
+    interp.interpret(parse_source('let x be 1\n'))
+    assert check(parse_source('say x\n'), interp.env) == []
+    assert check(parse_source('say x\n')) == ["line 1: variable 'x' is never declared"]
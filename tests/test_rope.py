@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+import deepulang
+from deepulang import parse_source, rope
+from deepulang.engines import ENGINES, create_engine
+from deepulang.limits import LimitExceeded, Limits
+from deepulang.output import CaptureOutput
+from deepulang.rope import concat
+from deepulang.transpiler import transpile
+
+from test_engines import random_block
+
+
+def test_appends_to_an_older_rope_do_not_leak(monkeypatch):
+    monkeypatch.setattr(rope, "CHUNK_PIECES", 4)
+    base = concat("a" * 600, "b" * 600)
+    built = [base]
+    for i in range(10):
+        built.append(built[-1] + str(i))
+    branch = built[3] + "x"
+    assert str(built[5]) == "a" * 600 + "b" * 600 + "01234"
+    assert str(branch) == "a" * 600 + "b" * 600 + "012x"
+    assert str(built[-1] + "!" + branch) == str(built[-1]) + "!" + str(branch)
+    assert len(branch) == 1204 and branch == str(branch) and hash(branch) == hash(str(branch))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_long_strings_come_back_as_str(engine):
+    output = CaptureOutput()
+    interp = create_engine(engine, output)
+    interp.interpret(parse_source(
+        'let s be ""\nrepeat 3000 times\n  set s to s + "ab"\nend\n'
+        'say s\nif s is equal to "ab" * 3000 then\n  say "same"\nend\n'))
+    assert type(interp.env.values["s"]) is str and interp.env.values["s"] == "ab" * 3000
+    assert output.lines == ["ab" * 3000, "same"]
+    result = deepulang.compile('set s to s + "cd"\n').run({"s": "x" * 5000})
+    assert type(result["s"]) is str
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_string_length_limit_counts_ropes(engine):
+    interp = create_engine(engine, CaptureOutput(), Limits(max_string_length=5000))
+    with pytest.raises(LimitExceeded, match="String longer than 5000"):
+        interp.interpret(parse_source('let s be ""\nwhile 1 is less than 2 do\n  set s to s + "abc"\nend\n'))
+    with pytest.raises(LimitExceeded):
+        interp.interpret(parse_source('let t be "x" * 2000 + "y"\nset t to t * 3\n'))
+
+
+def test_py_engine_builds_ropes_only_for_appending_chains():
+    source = transpile(parse_source(
+        'let s be "a"\nlet n be 0\nset s to s + n + ","\nset s to s + "x"\nset n to n + n + 1\n')).source
+    assert "v_s = _add(_add(v_s, v_n), ',')" in source
+    assert "v_s = (v_s + 'x')" in source and "v_n = ((v_n + v_n) + 1)" in source
+
+
+def string_program(seed):
+    rng = random.Random(seed)
+    lines = ['let a be "s"', 'let b be "xy"', f'let c be {rng.randint(-3, 9)}',
+             f'repeat {rng.randint(0, 3)} times', '  set a to a + b', '  set b to b + "z"', 'end']
+    lines += random_block(rng, 0, [0])
+    return "\n".join(lines) + "\n"
+
+
+def outcome(engine, source, limits=None):
+    interp = create_engine(engine, CaptureOutput(), limits)
+    try:
+        interp.interpret(parse_source(source))
+        error = None
+    except Exception as e:
+        error = (type(e), str(e))
+    values = {name: (type(value), value) for name, value in interp.env.values.items()}
+    return interp.output.lines, values, error
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_ropes_are_invisible_in_random_programs(engine, monkeypatch):
+    sources = [string_program(seed) for seed in range(150)]
+    expected = [outcome("tree", source) for source in sources]
+    monkeypatch.setattr(rope, "ROPE_THRESHOLD", 0)
+    for source, want in zip(sources, expected):
+        assert outcome(engine, source) == want, source
+        assert outcome(engine, source, Limits(max_string_length=10 ** 6)) == want, source
@@ -0,0 +1,133 @@
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+from deepulang import cli
+from deepulang.client import run_remote
+from deepulang.server import Server, make_socket_server, merge_limits, serve_stream
+
+LOOP = "let i be 0\nwhile i is less than 100 do\n  set i to i + 1\nend\nsay i\n"
+
+
+def handle(server, request):
+    replies = []
+    server.handle(request, replies.append)
+    return replies
+
+
+def test_output_then_result():
+    server = Server()
+    replies = handle(server, {"id": 7, "source": 'let x be 6 * 7\nsay x\nsay "done"\n'})
+    assert replies[0] == {"id": 7, "output": "42\ndone\n"}
+    result = replies[-1]
+    assert result["ok"] and result["id"] == 7
+    assert result["variables"] == {"x": 42}
+    assert result["cached"] is False
+
+
+def test_programs_are_cached_and_runs_isolated():
+    server = Server()
+    first = handle(server, {"source": "let x be 1\n"})[-1]
+    second = handle(server, {"source": "let x be 1\n", "variables": False})[-1]
+    assert first["variables"] == {"x": 1}
+    assert second["cached"] is True and "variables" not in second
+    # Each request gets its own environment.
+    assert handle(server, {"source": "say x\n"})[-1]["error"].endswith("Undefined variable 'x'")
+
+
+def test_cache_size():
+    server = Server(cache_size=2)
+    for n in range(3):
+        handle(server, {"source": f"say {n}\n"})
+    assert [source for *_, source in server.programs] == ["say 1\n", "say 2\n"]
+
+
+def test_errors():
+    server = Server()
+    result = handle(server, {"id": 1, "source": "say (1\n"})[-1]
+    assert not result["ok"] and result["error"].startswith("ParseError")
+    assert "source" in handle(server, {"id": 2})[-1]["error"]
+    assert "Unknown engine" in handle(server, {"source": "say 1\n", "engine": "x"})[-1]["error"]
+
+
+def test_limits_are_a_ceiling():
+    assert merge_limits({"max_steps": 10}, {"max_steps": 1000, "timeout": 2}) == \
+        {"max_steps": 10, "timeout": 2}
+    assert merge_limits({"max_steps": 10}, {"max_steps": 5}) == {"max_steps": 5}
+    with pytest.raises(ValueError):
+        merge_limits({}, {"max_memory": 1})
+    server = Server({"max_steps": 50})
+    result = handle(server, {"source": LOOP, "limits": {"max_steps": 10 ** 6}})[-1]
+    assert result["error"].startswith("LimitExceeded")
+    assert handle(Server(), {"source": LOOP})[-1]["variables"] == {"i": 100}
+
+
+@pytest.mark.parametrize("opt_level", [1, 2])
+def test_opt_level_does_not_get_past_limits(opt_level):
+    server = Server({"max_string_length": 20, "max_steps": 1000})
+    folded = handle(server, {"source": 'let s be "x" * 50\n', "opt_level": opt_level})[-1]
+    assert folded["error"].startswith("LimitExceeded")
+    summed = 'let t be 0\nlet i be 0\nwhile i is less than 5000 do\n' \
+             '  set t to t + i\n  set i to i + 1\nend\n'
+    looped = handle(server, {"source": summed, "opt_level": opt_level})[-1]
+    assert looped["error"].startswith("LimitExceeded")
+    dead = 'if 1 is greater than 2 then\n  say "x" * 400000000\nend\nsay "ok"\n'
+    assert handle(server, {"source": dead, "opt_level": opt_level})[-2]["output"] == "ok\n"
+    assert handle(Server(), {"source": summed, "opt_level": opt_level})[-1]["ok"]
+
+
+def test_optimizer_temporaries_are_not_reported():
+    result = handle(Server(), {"source": LOOP, "opt_level": 2})[-1]
+    assert result["variables"] == {"i": 100}
+
+
+def test_serve_stream():
+    requests = io.BytesIO(b'{"id": 1, "source": "say 1\\n"}\n\nnot json\n{"id": 2, "source": "say 2\\n"}\n')
+    replies = io.BytesIO()
+    serve_stream(Server(), requests, replies)
+    messages = [json.loads(line) for line in replies.getvalue().splitlines()]
+    assert [m.get("output") for m in messages if "output" in m] == ["1\n", "2\n"]
+    assert [m["ok"] for m in messages if "ok" in m] == [True, False, True]
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    if not hasattr(socket, "AF_UNIX"):
+        pytest.skip("Unix sockets are not available")
+    path = str(tmp_path / "dpl.sock")
+    unix = make_socket_server(Server(), path)
+    thread = threading.Thread(target=unix.serve_forever)
+    thread.start()
+    yield path
+    unix.shutdown()
+    unix.server_close()
+    thread.join()
+
+
+def test_socket_round_trip(socket_path):
+    chunks = []
+    result = run_remote({"source": LOOP}, socket_path, chunks.append)
+    assert result["ok"] and chunks == ["100\n"]
+    with pytest.raises(OSError, match="already listening"):
+        make_socket_server(Server(), socket_path)
+
+
+def test_cli_run_server(socket_path, tmp_path, capsys):
+    script = tmp_path / "prog.dpl"
+    script.write_text('say "hi"\n', encoding="utf-8")
+    assert cli.main(["run", "--server", "--socket", socket_path, str(script)]) == 0
+    assert capsys.readouterr().out == "hi\n"
+    script.write_text("say nothing\n", encoding="utf-8")
+    assert cli.main(["run", "--server", "--socket", socket_path, str(script)]) == 1
+    assert "Undefined variable" in capsys.readouterr().err
+
+
+def test_cli_server_unreachable(tmp_path, capsys):
+    script = tmp_path / "prog.dpl"
+    script.write_text('say "hi"\n', encoding="utf-8")
+    missing = str(tmp_path / "none.sock")
+    assert cli.main(["--server", "--socket", missing, str(script)]) == 1
+    assert "cannot reach" in capsys.readouterr().err
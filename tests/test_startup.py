@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import deepulang
+from deepulang import lexer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def loaded_modules(code):
+    """deepulang modules imported by ``code`` run in a fresh interpreter."""
+    script = code + "\nimport sys\nprint(' '.join(sorted(m for m in sys.modules if m.startswith('deepulang'))))"
+    proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+    return proc.stdout.splitlines()[-1].split()
+
+
+def test_import_loads_nothing_else():
+    assert loaded_modules("import deepulang") == ["deepulang"]
+
+
+def test_version_skips_the_pipeline():
+    modules = loaded_modules("import deepulang.cli; deepulang.cli.main(['--version'])")
+    assert modules == ["deepulang", "deepulang.cli"]
+
+
+def test_lazy_exports():
+    assert deepulang.Lexer is lexer.Lexer
+    assert {"Lexer", "Parser", "Interpreter", "CompiledProgram"} <= set(dir(deepulang))
+    for name in deepulang.__all__:
+        assert getattr(deepulang, name) is not None
+    with pytest.raises(AttributeError):
+        deepulang.Nope
+
+
+def test_cli_levels_match_optimizer():
+    from deepulang import cli, optimizer
+    with pytest.raises(SystemExit):
+        cli.main([f"-O{max(optimizer.LEVELS) + 1}", "x.dpl"])
+    assert cli.OPT_LEVELS == optimizer.LEVELS
+    assert cli.main([f"-O{max(optimizer.LEVELS)}", "--no-cache", "missing.dpl"]) == 1